@@ -0,0 +1,221 @@
+"""
+Replays a trace of workflows and standalone operations through the scheduler against stub stations,
+once first come, first served and once with reservations and backfilling, and compares how long
+the workflows and the operations took.
+
+A trace is a JSON list of submissions, each with its arrival time in seconds and the steps it
+consists of. A step names its station, method and duration in seconds and lists the indices of the
+steps it depends on; a submission with a single step is queued as a standalone operation, larger
+ones are submitted as a workflow:
+
+    [{"arrival": 0.0, "steps": [{"station": "prep-0", "method": "prepare", "duration": 5.0},
+                                {"station": "analyzer", "method": "measure", "duration": 1.0, "depends_on": [0]}]},
+     {"arrival": 0.5, "steps": [{"station": "analyzer", "method": "scan", "duration": 8.0}]}]
+
+Every station runs one operation at a time on a single device of the class given by the station
+name without its index. Without --trace a seeded synthetic trace is replayed, in which workflows
+prepare samples on one of several preparation stations and then measure them on a shared analyzer,
+which also takes long scans and short checks submitted on their own.
+
+Usage:
+    python benchmarks/backfill_replay.py [--trace trace.json] [--save trace.json] [--scale 0.1] [--seed 0] [--mongo HOST:PORT]
+
+Times are scaled by --scale, i.e. a step of 5 s in the trace runs for 0.5 s by default. Durations
+are known to the scheduler from the start, as after a warm-up. Runs against an in-memory mongomock
+database unless a MongoDB server is given.
+"""
+
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+from time import sleep, time
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.stub_lab import StubStation, add_station, make_operation, percentile, use_database  # noqa: E402
+from ochra.common.connections.api_models import WorkflowRequest, WorkflowStep  # noqa: E402
+from ochra.common.utils.enum import OperationStatus  # noqa: E402
+from ochra.manager.lab.utils.scheduler import Scheduler  # noqa: E402
+from ochra.manager.lab.utils.workflow_engine import WorkflowEngine  # noqa: E402
+
+
+def synthetic_trace(
+    workflows: int, standalone: int, prep_stations: int, seed: int
+) -> List[Dict[str, Any]]:
+    """
+    Generates a trace of workflows measuring on a shared analyzer, mixed with long scans and short
+    checks submitted to the analyzer on their own.
+
+    Args:
+        workflows (int): Number of workflows.
+        standalone (int): Number of standalone operations.
+        prep_stations (int): Number of preparation stations.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        List[Dict[str, Any]]: The submissions, by arrival time.
+    """
+    rng = random.Random(seed)
+    horizon = 6.0 * workflows / prep_stations
+    trace = []
+    for _ in range(workflows):
+        trace.append(
+            {
+                "arrival": rng.uniform(0.0, horizon),
+                "steps": [
+                    {
+                        "station": f"prep-{rng.randrange(prep_stations)}",
+                        "method": "prepare",
+                        "duration": rng.uniform(4.0, 6.0),
+                    },
+                    {"station": "analyzer", "method": "measure", "duration": 1.0, "depends_on": [0]},
+                ],
+            }
+        )
+    for _ in range(standalone):
+        long = rng.random() < 0.3
+        trace.append(
+            {
+                "arrival": rng.uniform(0.0, horizon),
+                "steps": [
+                    {
+                        "station": "analyzer",
+                        "method": "scan" if long else "check",
+                        "duration": 8.0 if long else 0.5,
+                    }
+                ],
+            }
+        )
+    trace.sort(key=lambda submission: submission["arrival"])
+    return trace
+
+
+def replay(db_conn, trace: List[Dict[str, Any]], scale: float, backfill: bool) -> Dict[str, Any]:
+    """
+    Replays a trace through a scheduler and its workflow engine.
+
+    Args:
+        db_conn (DbConnection): The database connection.
+        trace (List[Dict[str, Any]]): The submissions, by arrival time.
+        scale (float): Factor applied to the arrival times and durations of the trace.
+        backfill (bool): Whether the scheduler reserves stations and backfills them.
+
+    Returns:
+        Dict[str, Any]: Turnaround of the workflows and waits of the standalone operations in
+            trace seconds, and the makespan of the trace.
+    """
+    scheduler = Scheduler(idle_timeout=1.0, batch_size=1, backfill=backfill)
+    engine = WorkflowEngine(scheduler)
+
+    # one single-device station per name, and the durations known up front
+    devices: Dict[str, str] = {}
+    stubs: List[StubStation] = []
+    for name in sorted({step["station"] for submission in trace for step in submission["steps"]}):
+        station = add_station(db_conn, devices=1, device_class=name.split("-")[0])
+        # operations carry their duration, workflow steps may be dispatched before submit returns
+        stub = StubStation(db_conn, station, duration=lambda op: op.args["duration"])
+        scheduler._station_conns[station["id"]] = stub
+        devices[name] = station["devices"][0]
+        stubs.append(stub)
+    for step in (step for submission in trace for step in submission["steps"]):
+        scheduler._durations.observe(step["station"].split("-")[0], step["method"], step["duration"] * scale)
+    scheduler.run()
+
+    durations: Dict[str, float] = {}
+    workflows: Dict[str, float] = {}
+    standalone: Dict[str, float] = {}
+    start = time()
+    try:
+        for submission in trace:
+            sleep(max(0.0, start + submission["arrival"] * scale - time()))
+            steps = submission["steps"]
+            if len(steps) == 1:
+                op = make_operation(devices[steps[0]["station"]], method=steps[0]["method"])
+                op.args["duration"] = durations[str(op.id)] = steps[0]["duration"] * scale
+                scheduler.add_operations([op])
+                standalone[str(op.id)] = time()
+                continue
+
+            names = [f"step-{i}" for i in range(len(steps))]
+            workflow = engine.submit(
+                WorkflowRequest(
+                    caller_id="benchmark",
+                    steps=[
+                        WorkflowStep(
+                            name=names[i],
+                            entity_type="device",
+                            entity_id=devices[step["station"]],
+                            method=step["method"],
+                            args={"duration": step["duration"] * scale},
+                            depends_on=[names[j] for j in step.get("depends_on", [])],
+                        )
+                        for i, step in enumerate(steps)
+                    ],
+                )
+            )
+            for name, step in zip(names, steps):
+                durations[workflow["operations"][name]] = step["duration"] * scale
+            workflows[workflow["id"]] = time()
+
+        submitted = list(durations)
+        while db_conn.count(
+            {"_collection": "operations"},
+            {"id": {"$in": submitted}, "status": {"$ne": OperationStatus.COMPLETED}},
+        ):
+            sleep(0.05)
+        makespan = time() - start
+    finally:
+        scheduler.stop()
+
+    received = {op_id: at for stub in stubs for op_id, at in stub.received.items()}
+    ends: Dict[str, float] = {}
+    for op in db_conn.find_all({"_collection": "operations"}, {"id": {"$in": submitted}}):
+        if op.get("workflow_id") is not None:
+            finished = received[op["id"]] + durations[op["id"]]
+            ends[op["workflow_id"]] = max(ends.get(op["workflow_id"], 0.0), finished)
+    turnarounds = [(ends[workflow_id] - at) / scale for workflow_id, at in workflows.items()]
+    waits = [(received[op_id] - at) / scale for op_id, at in standalone.items()]
+    return {
+        "turnaround_mean": sum(turnarounds) / len(turnarounds) if turnarounds else 0.0,
+        "turnaround_p95": percentile(turnarounds, 95) or 0.0,
+        "wait_mean": sum(waits) / len(waits) if waits else 0.0,
+        "wait_p95": percentile(waits, 95) or 0.0,
+        "makespan": makespan / scale,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trace", default=None, help="JSON trace to replay, synthetic if omitted")
+    parser.add_argument("--save", default=None, help="file to write the replayed trace to")
+    parser.add_argument("--workflows", type=int, default=20)
+    parser.add_argument("--standalone", type=int, default=30)
+    parser.add_argument("--prep-stations", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=float, default=0.1, help="real seconds per trace second")
+    parser.add_argument("--mongo", default=None, help="MongoDB address, in-memory if omitted")
+    args = parser.parse_args()
+
+    if args.trace is not None:
+        trace = json.loads(Path(args.trace).read_text())
+    else:
+        trace = synthetic_trace(args.workflows, args.standalone, args.prep_stations, args.seed)
+    if args.save is not None:
+        Path(args.save).write_text(json.dumps(trace, indent=1))
+
+    db_conn = use_database(args.mongo)
+    print("times in trace seconds")
+    for name, backfill in [("first come, first served", False), ("reservations + backfill", True)]:
+        stats = replay(db_conn, trace, args.scale, backfill)
+        print(
+            f"{name:>24}: workflow turnaround mean {stats['turnaround_mean']:.1f} s, "
+            f"p95 {stats['turnaround_p95']:.1f} s; standalone wait mean {stats['wait_mean']:.1f} s, "
+            f"p95 {stats['wait_p95']:.1f} s; makespan {stats['makespan']:.1f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
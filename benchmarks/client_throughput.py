@@ -0,0 +1,135 @@
+"""
+Measures how fast experiment code reads device properties from the lab server with N reads in
+flight at a time, through LabConnection from N threads and through AsyncLabConnection from one
+event loop, and one read at a time as a baseline.
+
+Usage:
+    python benchmarks/client_throughput.py [--reads 2000] [--concurrency 1 8 32 128] [--lab HOST:PORT --device ID] [--mongo HOST:PORT]
+
+Without --lab a single-worker lab server is started in a separate process on an in-memory mongomock
+database, or on the MongoDB server given with --mongo. Against a running lab server, --device names
+the device whose status is read.
+"""
+
+import argparse
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.stub_lab import LabServerProcess, percentile  # noqa: E402
+from ochra.common.connections.async_lab_connection import AsyncLabConnection  # noqa: E402
+from ochra.common.connections.lab_connection import LabConnection  # noqa: E402
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """
+    Summarizes the latencies of a run.
+
+    Args:
+        latencies (List[float]): Latency of every read in seconds.
+        elapsed (float): Duration of the run in seconds.
+
+    Returns:
+        Dict[str, float]: Reads per second, and median and 95th percentile latency in milliseconds.
+    """
+    return {
+        "per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000.0,
+        "p95_ms": percentile(latencies, 95) * 1000.0,
+    }
+
+
+def run_sync(address: str, device_id: str, reads: int, concurrency: int) -> Dict[str, float]:
+    """
+    Reads the status of a device through LabConnection from a pool of threads.
+
+    Args:
+        address (str): Host and port of the lab server.
+        device_id (str): The ID of the device.
+        reads (int): Number of reads.
+        concurrency (int): Number of threads.
+
+    Returns:
+        Dict[str, float]: See summarize.
+    """
+    lab_conn = LabConnection(address)
+
+    def read(_: int) -> float:
+        started = perf_counter()
+        lab_conn.get_property("devices", device_id, "status")
+        return perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # open the connections of every thread first
+        list(executor.map(read, range(concurrency)))
+        started = perf_counter()
+        latencies = list(executor.map(read, range(reads)))
+        return summarize(latencies, perf_counter() - started)
+
+
+async def run_async(address: str, device_id: str, reads: int, concurrency: int) -> Dict[str, float]:
+    """
+    Reads the status of a device through AsyncLabConnection with a bounded number of reads in flight.
+
+    Args:
+        address (str): Host and port of the lab server.
+        device_id (str): The ID of the device.
+        reads (int): Number of reads.
+        concurrency (int): Number of reads in flight.
+
+    Returns:
+        Dict[str, float]: See summarize.
+    """
+    async with AsyncLabConnection(address, pool_size=concurrency) as lab_conn:
+        slots = asyncio.Semaphore(concurrency)
+
+        async def read() -> float:
+            async with slots:
+                started = perf_counter()
+                await lab_conn.get_property("devices", device_id, "status")
+                return perf_counter() - started
+
+        # open the connections of the pool first
+        await asyncio.gather(*(read() for _ in range(concurrency)))
+        started = perf_counter()
+        latencies = await asyncio.gather(*(read() for _ in range(reads)))
+        return summarize(list(latencies), perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--lab", default=None, help="lab server address, started in the background if omitted")
+    parser.add_argument("--device", default=None, help="ID of a device of the lab server given with --lab")
+    parser.add_argument("--mongo", default=None, help="MongoDB address, in-memory if omitted")
+    args = parser.parse_args()
+
+    if args.lab is None:
+        server = LabServerProcess(args.mongo).__enter__()
+        address, device_id = server.address, server.device_id
+    else:
+        server, address, device_id = None, args.lab, args.device
+
+    try:
+        for concurrency in args.concurrency:
+            for name, stats in [
+                ("sync, threads", run_sync(address, device_id, args.reads, concurrency)),
+                ("async", asyncio.run(run_async(address, device_id, args.reads, concurrency))),
+            ]:
+                print(
+                    f"{concurrency:>4} in flight, {name:>13}: {stats['per_second']:7.0f} reads/s, "
+                    f"p50 {stats['p50_ms']:6.1f} ms, p95 {stats['p95_ms']:6.1f} ms"
+                )
+    finally:
+        if server is not None:
+            server.__exit__(None, None, None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Measures the dispatch latency of the scheduler, the time from an operation being queued to it
+reaching its station, against stub stations that complete operations right away.
+
+The event-driven scheduler is compared with polling, where submissions do not wake the scheduling
+loop up and queued operations are only picked up by the sweep every poll interval.
+
+Usage:
+    python benchmarks/dispatch_latency.py [--stations 4] [--operations 200] [--rate 100] [--mongo HOST:PORT]
+
+Runs against an in-memory mongomock database unless a MongoDB server is given.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from time import sleep, time
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.stub_lab import StubStation, add_station, make_operation, percentile, use_database  # noqa: E402
+from ochra.common.utils.enum import OperationStatus  # noqa: E402
+from ochra.manager.lab.utils.scheduler import Scheduler  # noqa: E402
+
+
+def run(db_conn, stations: int, operations: int, rate: float, poll_interval: float = None) -> Dict[str, float]:
+    """
+    Submits operations round-robin to the stations at a fixed rate and measures their dispatch latency.
+
+    Args:
+        db_conn (DbConnection): The database connection.
+        stations (int): Number of stations.
+        operations (int): Number of operations submitted.
+        rate (float): Submissions per second.
+        poll_interval (float, optional): If given, submissions do not wake the scheduler up and it
+            sweeps the queue at this interval instead. Defaults to None.
+
+    Returns:
+        Dict[str, float]: Mean, median, 95th percentile and maximum latency in milliseconds.
+    """
+    scheduler = Scheduler(idle_timeout=poll_interval or 5.0, max_workers=stations)
+    stubs: List[Tuple[Dict, StubStation]] = []
+    for _ in range(stations):
+        station = add_station(db_conn)
+        stub = StubStation(db_conn, station)
+        scheduler._station_conns[station["id"]] = stub
+        stubs.append((station, stub))
+    if poll_interval is not None:
+        scheduler.notify = lambda station_id=None: None
+    scheduler.run()
+
+    submitted = []
+    try:
+        for i in range(operations):
+            station, _ = stubs[i % stations]
+            op = make_operation(station["id"], entity_type="station")
+            scheduler.add_operations([op])
+            submitted.append(str(op.id))
+            sleep(1.0 / rate)
+
+        deadline = time() + 30.0 + (poll_interval or 0.0)
+        while time() < deadline:
+            if db_conn.count(
+                {"_collection": "operations"},
+                {"id": {"$in": submitted}, "status": {"$ne": OperationStatus.COMPLETED}},
+            ) == 0:
+                break
+            sleep(0.05)
+    finally:
+        scheduler.stop()
+
+    queued_at = {
+        op["id"]: op["queued_at"]
+        for op in db_conn.find_all({"_collection": "operations"}, {"id": {"$in": submitted}})
+    }
+    latencies = [
+        (stub.received[op_id] - queued_at[op_id]) * 1000.0
+        for _, stub in stubs
+        for op_id in stub.received
+    ]
+    return {
+        "dispatched": len(latencies),
+        "mean_ms": sum(latencies) / len(latencies) if latencies else None,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "max_ms": max(latencies, default=None),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=4)
+    parser.add_argument("--operations", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=100.0, help="submissions per second")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--mongo", default=None, help="MongoDB address, in-memory if omitted")
+    args = parser.parse_args()
+
+    db_conn = use_database(args.mongo)
+    for name, poll_interval in [("event-driven", None), (f"polling every {args.poll_interval}s", args.poll_interval)]:
+        stats = run(db_conn, args.stations, args.operations, args.rate, poll_interval)
+        print(
+            f"{name:>24}: {stats['dispatched']} dispatched, mean {stats['mean_ms']:.1f} ms, "
+            f"p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms, max {stats['max_ms']:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Measures how many property reads and writes a single lab server worker handles with N requests in
+flight at a time, once with its request handlers awaiting the database through AsyncDbConnection
+and once with them calling the database on the event loop, which serializes the requests of a
+worker on the round-trips to MongoDB.
+
+Half of the requests read the status of a device, the other half set one of its properties. They
+are sent through LabConnection from N threads.
+
+Usage:
+    python benchmarks/handler_concurrency.py --mongo HOST:PORT [--requests 2000] [--concurrency 1 8 32 128]
+
+The lab servers are started in separate processes on the MongoDB server given with --mongo, e.g.
+a local mongod. Without --mongo an in-memory mongomock database is used, whose calls never wait
+on the network, so that both modes perform the same.
+"""
+
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter
+from typing import Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.stub_lab import LabServerProcess, percentile  # noqa: E402
+from ochra.common.connections.lab_connection import LabConnection  # noqa: E402
+
+
+def run(address: str, device_id: str, requests: int, concurrency: int) -> Dict[str, float]:
+    """
+    Reads and writes properties of a device from a pool of threads.
+
+    Args:
+        address (str): Host and port of the lab server.
+        device_id (str): The ID of the device.
+        requests (int): Number of requests, half of them reads and half writes.
+        concurrency (int): Number of threads.
+
+    Returns:
+        Dict[str, float]: Requests per second, and median and 95th percentile latency in milliseconds.
+    """
+    lab_conn = LabConnection(address)
+
+    def request(i: int) -> float:
+        started = perf_counter()
+        if i % 2:
+            lab_conn.set_property("devices", device_id, "counter", i)
+        else:
+            lab_conn.get_property("devices", device_id, "status")
+        return perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # open the connections of every thread first
+        list(executor.map(request, range(concurrency)))
+        started = perf_counter()
+        latencies = list(executor.map(request, range(requests)))
+        elapsed = perf_counter() - started
+    return {
+        "per_second": requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000.0,
+        "p95_ms": percentile(latencies, 95) * 1000.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--mongo", default=None, help="MongoDB address, in-memory if omitted")
+    args = parser.parse_args()
+
+    for name, blocking in [("blocking", True), ("awaited", False)]:
+        with LabServerProcess(args.mongo, blocking=blocking) as server:
+            for concurrency in args.concurrency:
+                stats = run(server.address, server.device_id, args.requests, concurrency)
+                print(
+                    f"{concurrency:>4} in flight, {name:>8}: {stats['per_second']:7.0f} requests/s, "
+                    f"p50 {stats['p50_ms']:6.1f} ms, p95 {stats['p95_ms']:6.1f} ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Measures the latency of the lookups the lab server makes on every request as the history of
+operations grows: reading an operation by id, finding one by its result as LabService.get_file
+does, finding the operations of a device and counting queued operations. With the indexes created
+by DbConnection.ensure_indexes the latency stays flat, without them every lookup scans the whole
+collection and its latency grows with the number of operations.
+
+Usage:
+    python benchmarks/lookup_latency.py --mongo HOST:PORT [--sizes 10000 100000 1000000] [--lookups 200] [--unindexed]
+
+With --unindexed the indexes of the operations are dropped after each measurement, the lookups
+are measured again and the indexes created anew. Without --mongo an in-memory mongomock database
+is used, which never uses indexes and so only checks that the benchmark runs; use small sizes.
+"""
+
+import argparse
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.stub_lab import percentile, use_database  # noqa: E402
+from ochra.common.utils.enum import OperationStatus  # noqa: E402
+
+OPERATIONS = {"_collection": "operations"}
+BATCH = 10000
+
+
+def populate(db_conn, start: int, stop: int, devices: List[str], rng: random.Random) -> List[Dict[str, Any]]:
+    """
+    Stores finished operations, each with a result, as they pile up in the history of a lab.
+
+    Args:
+        db_conn (DbConnection): The database connection.
+        start (int): Number of operations already stored.
+        stop (int): Number of operations stored afterwards.
+        devices (List[str]): IDs of the devices the operations ran on.
+        rng (random.Random): Random generator.
+
+    Returns:
+        List[Dict[str, Any]]: The ids and results of a sample of the stored operations.
+    """
+    sample = []
+    epoch = datetime(2024, 1, 1)
+    for batch_start in range(start, stop, BATCH):
+        docs = []
+        for i in range(batch_start, min(stop, batch_start + BATCH)):
+            ended = epoch + timedelta(seconds=i)
+            docs.append(
+                {
+                    "id": str(uuid.uuid4()),
+                    "caller_id": f"caller-{i % 16}",
+                    "entity_id": rng.choice(devices),
+                    "method": "measure",
+                    "args": {},
+                    "status": OperationStatus.COMPLETED,
+                    "result": str(uuid.uuid4()),
+                    "start_timestamp": ended - timedelta(seconds=1),
+                    "end_timestamp": ended,
+                }
+            )
+        db_conn.create_many(OPERATIONS, docs)
+        sample += rng.sample(docs, min(len(docs), 100))
+    return [{"id": doc["id"], "result": doc["result"]} for doc in sample]
+
+
+def measure(lookup: Callable[[Dict[str, Any]], Any], targets: List[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Times a lookup once per target.
+
+    Args:
+        lookup (Callable[[Dict[str, Any]], Any]): The lookup, given the id and result of an operation.
+        targets (List[Dict[str, Any]]): The ids and results of the operations looked up.
+
+    Returns:
+        Dict[str, float]: Median and 95th percentile latency in milliseconds.
+    """
+    latencies = []
+    for target in targets:
+        started = perf_counter()
+        lookup(target)
+        latencies.append(perf_counter() - started)
+    return {"p50_ms": percentile(latencies, 50) * 1000.0, "p95_ms": percentile(latencies, 95) * 1000.0}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=None, help="numbers of operations measured at")
+    parser.add_argument("--lookups", type=int, default=200, help="lookups of each kind per size")
+    parser.add_argument("--unindexed", action="store_true", help="also measure without the indexes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mongo", default=None, help="MongoDB address, in-memory if omitted")
+    args = parser.parse_args()
+    sizes = args.sizes or ([10000, 100000, 1000000] if args.mongo else [1000, 2000, 5000])
+
+    rng = random.Random(args.seed)
+    db_conn = use_database(args.mongo)
+    collection = db_conn.db_adapter._db_client[db_conn.db_adapter._db_name]["operations"]
+    devices = [str(uuid.uuid4()) for _ in range(50)]
+
+    lookups = {
+        "read by id": lambda op: db_conn.read({**OPERATIONS, "id": op["id"]}, "status"),
+        "find by result": lambda op: db_conn.find(OPERATIONS, {"result": op["result"]}),
+        "find by device": lambda op: db_conn.find(
+            OPERATIONS, {"entity_id": rng.choice(devices), "status": OperationStatus.IN_PROGRESS}
+        ),
+        "count queued": lambda op: db_conn.count(
+            OPERATIONS, {"caller_id": "caller-0", "status": OperationStatus.CREATED}
+        ),
+    }
+
+    stored, sample = 0, []
+    for size in sorted(sizes):
+        started = perf_counter()
+        sample += populate(db_conn, stored, size, devices, rng)
+        print(f"{size:>9} operations, stored {size - stored} in {perf_counter() - started:.1f} s")
+        stored = size
+
+        targets = rng.sample(sample, min(args.lookups, len(sample)))
+        runs = [("indexed", None)]
+        if args.unindexed:
+            runs.append(("unindexed", collection.drop_indexes))
+        for name, prepare in runs:
+            if prepare is not None:
+                prepare()
+            for kind, lookup in lookups.items():
+                stats = measure(lookup, targets)
+                print(f"{'':>9} {name:>9} {kind:>14}: p50 {stats['p50_ms']:8.3f} ms, p95 {stats['p95_ms']:8.3f} ms")
+        if args.unindexed:
+            db_conn.ensure_indexes()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Measures the database time of patching the status of a station, as the lab server does on every
+PATCH of a property: the former read of the whole document to check that it exists followed by an
+update_many, against the single update_one of LabService.patch_object, with and without the
+updated value returned.
+
+Stations grow large as their inventory fills up, so the patched station carries an inventory of
+--inventory containers, which the former read transfers on every patch.
+
+Usage:
+    python benchmarks/patch_latency.py --mongo HOST:PORT [--patches 2000] [--inventory 0 100 1000]
+
+Without --mongo an in-memory mongomock database is used, where a call does not make a network
+round-trip and only the cost of the work done per call is measured.
+"""
+
+import argparse
+import sys
+import uuid
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.stub_lab import add_station, percentile, use_database  # noqa: E402
+from ochra.common.connections.api_models import ObjectPropertyPatchRequest  # noqa: E402
+from ochra.common.utils.enum import ActivityStatus  # noqa: E402
+
+
+def measure(patch: Callable[[int], None], patches: int) -> Dict[str, float]:
+    """
+    Times a number of patches.
+
+    Args:
+        patch (Callable[[int], None]): Patches the station, given the index of the patch.
+        patches (int): Number of patches.
+
+    Returns:
+        Dict[str, float]: Mean, median and 95th percentile latency in milliseconds.
+    """
+    latencies = []
+    for i in range(patches):
+        started = perf_counter()
+        patch(i)
+        latencies.append(perf_counter() - started)
+    return {
+        "mean_ms": sum(latencies) / len(latencies) * 1000.0,
+        "p50_ms": percentile(latencies, 50) * 1000.0,
+        "p95_ms": percentile(latencies, 95) * 1000.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patches", type=int, default=2000)
+    parser.add_argument("--inventory", type=int, nargs="+", default=[0, 100, 1000], help="containers per station")
+    parser.add_argument("--mongo", default=None, help="MongoDB address, in-memory if omitted")
+    args = parser.parse_args()
+
+    db_conn = use_database(args.mongo)
+    collection = db_conn.db_adapter._db_client[db_conn.db_adapter._db_name]["stations"]
+    statuses = [ActivityStatus.BUSY, ActivityStatus.IDLE]
+
+    for containers in args.inventory:
+        station_id = add_station(db_conn)["id"]
+        inventory = {"containers": [{"id": str(uuid.uuid4()), "name": f"vial-{i}"} for i in range(containers)]}
+        db_conn.find_and_update({"_collection": "stations"}, {"id": station_id}, {"inventory": inventory})
+        db_data = {"id": station_id, "_collection": "stations"}
+
+        def patch(i: int, return_document: bool = False) -> Dict:
+            return ObjectPropertyPatchRequest(
+                property="status", property_value=statuses[i % 2], return_document=return_document
+            ).model_dump()
+
+        def read_then_update(i: int) -> None:
+            if db_conn.read(db_data) is None:
+                raise LookupError(station_id)
+            collection.update_many({"id": station_id}, {"$set": {"status": statuses[i % 2]}})
+
+        def update_one(i: int) -> None:
+            if db_conn.update(db_data, patch(i)).matched_count == 0:
+                raise LookupError(station_id)
+
+        def update_returning(i: int) -> None:
+            if db_conn.update(db_data, patch(i, True), return_document=True) is None:
+                raise LookupError(station_id)
+
+        for name, run in [
+            ("read + update_many", read_then_update),
+            ("update_one", update_one),
+            ("update_one, returned", update_returning),
+        ]:
+            stats = measure(run, args.patches)
+            print(
+                f"{containers:>5} containers, {name:>20}: mean {stats['mean_ms']:7.3f} ms, "
+                f"p50 {stats['p50_ms']:7.3f} ms, p95 {stats['p95_ms']:7.3f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+Helpers shared by the benchmarks: a lab database, in memory unless a MongoDB server is given,
+and stub stations completing the operations dispatched to them the way a station server does,
+without any hardware attached.
+"""
+
+from multiprocessing import Process, Queue
+from threading import Lock
+from time import perf_counter, sleep, time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import json
+import socket
+import uuid
+
+from ochra.common.connections.rest_adapter import Result
+from ochra.common.equipment.operation import Operation
+from ochra.common.equipment.operation_result import OperationResult
+from ochra.common.utils.enum import ActivityStatus, OperationStatus
+from ochra.manager.connections.db_connection import DbConnection
+
+
+def use_database(mongo: Optional[str] = None) -> DbConnection:
+    """
+    Connects the lab server code to an empty database.
+
+    Args:
+        mongo (Optional[str], optional): Address of a MongoDB server, an in-memory mongomock
+            database is used if None. Defaults to None.
+
+    Returns:
+        DbConnection: The connection shared by the lab server code.
+    """
+    if mongo is None:
+        import mongomock
+        import ochra.manager.connections.mongo_adapter as mongo_adapter
+
+        client = mongomock.MongoClient()
+        mongo_adapter.connect = lambda db, host, alias: client
+        mongo_adapter.gridfs.GridFS = lambda db: None
+        db_conn = DbConnection()
+    else:
+        db_conn = DbConnection(hostname=mongo, db_name="ochra_benchmark")
+        db_conn.db_adapter.delete_database()
+    db_conn.ensure_indexes()
+    return db_conn
+
+
+class LabServerProcess(Process):
+    """
+    Serves the property and method endpoints of devices and stations of the lab server from a
+    single uvicorn worker in a separate process, so that it does not compete with the benchmark
+    for the GIL. The server process stores a station with one device in an empty database, in
+    memory unless a MongoDB server is given. The scheduler is not started, submitted operations
+    stay queued.
+
+    With blocking set, the request handlers call the database on the event loop instead of awaiting
+    it on the thread pool of AsyncDbConnection, as they did before they were made to await it.
+
+    Attributes:
+        address (str): Host and port the server listens on.
+        device_id (str): ID of the device, set once the server started.
+    """
+
+    def __init__(
+        self, mongo: Optional[str] = None, host: str = "127.0.0.1", port: int = 8765, blocking: bool = False
+    ):
+        """
+        Initialize the LabServerProcess.
+
+        Args:
+            mongo (Optional[str], optional): Address of a MongoDB server, see use_database. Defaults to None.
+            host (str, optional): Address to listen on. Defaults to "127.0.0.1".
+            port (int, optional): Port to listen on. Defaults to 8765.
+            blocking (bool, optional): Block the event loop on every database call. Defaults to False.
+        """
+        super().__init__(daemon=True)
+        self._mongo = mongo
+        self._blocking = blocking
+        self._host = host
+        self._port = port
+        self._device_ids = Queue()
+        self.address = f"{host}:{port}"
+        self.device_id = None
+
+    def run(self) -> None:
+        import uvicorn
+        from fastapi import FastAPI
+        from ochra.manager.lab.routers.device_router import DeviceRouter
+        from ochra.manager.lab.routers.station_router import StationRouter
+        from ochra.manager.connections.async_db_connection import AsyncDbConnection
+        from ochra.manager.lab.utils.scheduler import Scheduler
+
+        if self._blocking:
+
+            async def run_on_loop(async_db_conn, method, *args):
+                return method(*args)
+
+            AsyncDbConnection._run = run_on_loop
+        db_conn = use_database(self._mongo)
+        self._device_ids.put(add_station(db_conn, devices=1)["devices"][0])
+        scheduler = Scheduler()
+        app = FastAPI()
+        app.include_router(DeviceRouter(scheduler))
+        app.include_router(StationRouter(scheduler))
+        uvicorn.run(app, host=self._host, port=self._port, log_level="warning")
+
+    def __enter__(self) -> "LabServerProcess":
+        self.start()
+        self.device_id = self._device_ids.get(timeout=30.0)
+        deadline = time() + 30.0
+        while time() < deadline:
+            try:
+                socket.create_connection((self._host, self._port), timeout=1.0).close()
+                return self
+            except OSError:
+                sleep(0.05)
+        raise TimeoutError(f"Lab server did not start on {self.address}")
+
+    def __exit__(self, *exc_info) -> None:
+        self.terminate()
+        self.join()
+
+
+def add_station(
+    db_conn: DbConnection,
+    devices: int = 0,
+    max_concurrent_ops: int = 1,
+    device_class: str = "StubDevice",
+) -> Dict[str, Any]:
+    """
+    Stores an idle station and its idle devices.
+
+    Args:
+        db_conn (DbConnection): The database connection.
+        devices (int, optional): Number of devices of the station. Defaults to 0.
+        max_concurrent_ops (int, optional): Number of operations the station runs at the same time. Defaults to 1.
+        device_class (str, optional): Class of the devices. Defaults to "StubDevice".
+
+    Returns:
+        Dict[str, Any]: The station document, with the IDs of its devices under "devices".
+    """
+    station = {
+        "id": str(uuid.uuid4()),
+        "name": f"station-{uuid.uuid4().hex[:8]}",
+        "cls": "Station",
+        "status": ActivityStatus.IDLE,
+        "locked": None,
+        "max_concurrent_ops": max_concurrent_ops,
+        "running_ops": 0,
+        "station_ip": "127.0.0.1",
+        "port": 0,
+    }
+    db_conn.create({"_collection": "stations"}, dict(station))
+    station["devices"] = []
+    for _ in range(devices):
+        device = {
+            "id": str(uuid.uuid4()),
+            "name": f"device-{uuid.uuid4().hex[:8]}",
+            "cls": device_class,
+            "module_path": "benchmarks.stub_lab",
+            "owner_station": station["id"],
+            "status": ActivityStatus.IDLE,
+        }
+        db_conn.create({"_collection": "devices"}, device)
+        station["devices"].append(device["id"])
+    return station
+
+
+def make_operation(
+    entity_id: str, entity_type: str = "device", method: str = "run", caller_id: str = "benchmark", **kwargs
+) -> Operation:
+    """
+    Builds an operation as the lab service does on submission.
+
+    Args:
+        entity_id (str): The ID of the target device or station.
+        entity_type (str, optional): The type of the target. Defaults to "device".
+        method (str, optional): The method called. Defaults to "run".
+        caller_id (str, optional): The ID of the caller. Defaults to "benchmark".
+        **kwargs: Further fields of the operation.
+
+    Returns:
+        Operation: The operation.
+    """
+    return Operation(
+        caller_id=caller_id,
+        entity_id=entity_id,
+        entity_type=entity_type,
+        method=method,
+        args={},
+        collection="operations",
+        module_path="ochra.common.equipment.operation",
+        **kwargs,
+    )
+
+
+class StubStation:
+    """
+    Stands in for the connection to a station server. Every operation is reported in progress,
+    runs for the duration given by a callback and is then completed successfully, freeing its
+    device and, unless the station runs several operations at the same time, the station.
+
+    Attributes:
+        received (Dict[str, float]): Time each operation reached the station, by operation ID.
+        runs (Dict[str, int]): Number of times each operation was run, by operation ID.
+    """
+
+    def __init__(
+        self,
+        db_conn: DbConnection,
+        station: Dict[str, Any],
+        duration: Optional[Callable[[Operation], float]] = None,
+    ):
+        """
+        Initialize the StubStation.
+
+        Args:
+            db_conn (DbConnection): The database connection.
+            station (Dict[str, Any]): The station document.
+            duration (Optional[Callable[[Operation], float]], optional): Returns how long an operation
+                runs in seconds, operations return right away if None. Defaults to None.
+        """
+        self._db_conn = db_conn
+        self._station = station
+        self._duration = duration or (lambda op: 0.0)
+        self._lock = Lock()
+        self.received: Dict[str, float] = {}
+        self.runs: Dict[str, int] = {}
+
+    def execute_op(self, op: Operation, endpoint: str) -> Result:
+        """
+        Runs an operation.
+
+        Args:
+            op (Operation): The operation.
+            endpoint (str): Ignored.
+
+        Returns:
+            Result: An empty result, the operation is completed in the database.
+        """
+        self._run(op, release_station=True)
+        return Result(200)
+
+    def execute_ops(self, ops: List[Operation], endpoint: str) -> Result:
+        """
+        Runs several operations one after the other.
+
+        Args:
+            ops (List[Operation]): The operations.
+            endpoint (str): Ignored.
+
+        Returns:
+            Result: The report of every operation.
+        """
+        reports = []
+        for i, op in enumerate(ops):
+            started = perf_counter()
+            self._run(op, release_station=i == len(ops) - 1)
+            reports.append(
+                {"id": str(op.id), "status": OperationStatus.COMPLETED, "error": "", "duration": perf_counter() - started}
+            )
+        return Result(200, data=reports)
+
+    def cancel_op(self, op_id: str) -> Result:
+        """
+        Ignores a cancellation.
+
+        Args:
+            op_id (str): The ID of the operation.
+
+        Returns:
+            Result: An empty result.
+        """
+        return Result(200)
+
+    def _run(self, op: Operation, release_station: bool) -> None:
+        """
+        Runs an operation and completes it.
+
+        Args:
+            op (Operation): The operation.
+            release_station (bool): Whether to set the station idle afterwards.
+        """
+        op_id = str(op.id)
+        with self._lock:
+            self.received.setdefault(op_id, time())
+            self.runs[op_id] = self.runs.get(op_id, 0) + 1
+        self._set(op_id, status=OperationStatus.IN_PROGRESS, start_timestamp=datetime.now().isoformat())
+        sleep(self._duration(op))
+        result = OperationResult(
+            success=True,
+            collection="operation_results",
+            module_path="ochra.discovery.equipment.operation_result",
+        )
+        self._db_conn.create({"_collection": "operation_results"}, json.loads(result.model_dump_json()))
+        self._set(
+            op_id,
+            status=OperationStatus.COMPLETED,
+            result=str(result.id),
+            end_timestamp=datetime.now().isoformat(),
+        )
+
+        if op.entity_type != "station":
+            collection = "robots" if op.entity_type == "robot" else "devices"
+            self._db_conn.find_and_update(
+                {"_collection": collection}, {"id": str(op.entity_id)}, {"status": ActivityStatus.IDLE}
+            )
+        if release_station and self._station["max_concurrent_ops"] <= 1:
+            self._db_conn.find_and_update(
+                {"_collection": "stations"}, {"id": self._station["id"]}, {"status": ActivityStatus.IDLE}
+            )
+
+    def _set(self, op_id: str, **values: Any) -> None:
+        """
+        Sets properties of an operation.
+
+        Args:
+            op_id (str): The ID of the operation.
+            **values: The properties to set.
+        """
+        self._db_conn.find_and_update({"_collection": "operations"}, {"id": op_id}, values)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of a list of values.
+
+    Args:
+        values (List[float]): The values.
+        q (float): The percentile, between 0 and 100.
+
+    Returns:
+        Optional[float]: The percentile, or None if there are no values.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    return values[int(q / 100 * (len(values) - 1))]
@@ -1,6 +1,6 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
 from pydantic import BaseModel, Field
-from ..utils.enum import PatchType
+from ..utils.enum import OperationPriority, PatchType
 
 
 class ObjectCallRequest(BaseModel):
@@ -17,6 +17,15 @@ class ObjectCallRequest(BaseModel):
     args: Dict | None = None
     """The arguments to be passed to the method. Defaults to None."""
 
+    priority: OperationPriority = Field(default=OperationPriority.NORMAL)
+    """The priority class of the resulting operation. Defaults to OperationPriority.NORMAL."""
+
+    queue_timeout: float | None = Field(default=None)
+    """Maximum time in seconds the operation may wait in the queue before it expires. Defaults to None, unbounded."""
+
+    timeout: float | None = Field(default=None)
+    """Maximum time in seconds the operation may run before it is cancelled. Defaults to None, unbounded."""
+
 
 class ObjectCallResponse(BaseModel):
     """
@@ -47,6 +56,9 @@ class ObjectPropertyPatchRequest(BaseModel):
     patch_args: Dict[str, Any] | None = Field(default=None)
     """Additional arguments for the patch operation. Defaults to None."""
 
+    return_document: bool = Field(default=False)
+    """Whether to respond with the new value of the property instead of True. Defaults to False."""
+
 
 class ObjectPropertyGetRequest(BaseModel):
     """
@@ -64,3 +76,106 @@ class ObjectConstructionRequest(BaseModel):
 
     object_json: str
     """The JSON representation of the object to be constructed."""
+
+
+class BulkConstructionRequest(BaseModel):
+    """
+    Class that represents a request to construct many objects of the same type at once.
+    """
+
+    objects_json: List[str]
+    """The JSON representations of the objects to be constructed."""
+
+
+class OperationCall(BaseModel):
+    """
+    Class that represents a method call on an entity, or on any device of a class, submitted as part of a larger request.
+    """
+
+    entity_type: str
+    """The type of the target entity, one of 'device', 'robot' or 'station'."""
+
+    entity_id: str | None = Field(default=None)
+    """The ID or name of the target entity. Defaults to None, in which case device_class must be set."""
+
+    device_class: str | None = Field(default=None)
+    """The class of device, or of robot if entity_type is 'robot', to run the call on, any idle one of the class is used. Defaults to None."""
+
+    module_path: str | None = Field(default=None)
+    """The module path the device class must be defined in. Defaults to None."""
+
+    method: str
+    """The name of the method to be called."""
+
+    args: Dict | None = None
+    """The arguments to be passed to the method. Defaults to None."""
+
+    priority: OperationPriority = Field(default=OperationPriority.NORMAL)
+    """The priority class of the resulting operation. Defaults to OperationPriority.NORMAL."""
+
+    queue_timeout: float | None = Field(default=None)
+    """Maximum time in seconds the operation may wait in the queue before it expires. Defaults to None, unbounded."""
+
+    timeout: float | None = Field(default=None)
+    """Maximum time in seconds the operation may run before it is cancelled. Defaults to None, unbounded."""
+
+
+class BulkCallRequest(BaseModel):
+    """
+    Class that represents a request to submit many method calls at once, either as a list of
+    calls or as one call swept over a list or grid of argument sets.
+    """
+
+    caller_id: str
+    """The unique identifier of the caller."""
+
+    calls: List[OperationCall] = Field(default_factory=list)
+    """Calls submitted as they are."""
+
+    sweep: OperationCall | None = Field(default=None)
+    """Call submitted once per argument set, its own args are shared by every set. Defaults to None."""
+
+    args_list: List[Dict] = Field(default_factory=list)
+    """Argument sets the sweep is submitted with."""
+
+    args_grid: Dict[str, List[Any]] = Field(default_factory=dict)
+    """Values of every swept argument, the sweep is submitted with every combination of them."""
+
+
+class WorkflowStep(OperationCall):
+    """
+    Class that represents one step of a workflow, a method call that runs once the steps it depends on completed.
+    """
+
+    name: str
+    """The name of the step, unique within the workflow."""
+
+    depends_on: List[str] = Field(default_factory=list)
+    """The names of the steps that have to complete successfully before this one runs."""
+
+    arg_refs: Dict[str, str] = Field(default_factory=dict)
+    """Arguments taken from the results of other steps, mapping argument names to step names."""
+
+
+class WorkflowRequest(BaseModel):
+    """
+    Class that represents a request to run a workflow of dependent method calls on the lab server.
+    """
+
+    caller_id: str
+    """The unique identifier of the caller."""
+
+    steps: List[WorkflowStep]
+    """The steps of the workflow."""
+
+
+class LockRequest(BaseModel):
+    """
+    Class that represents a request to acquire, renew or release the lock of a station.
+    """
+
+    caller_id: str
+    """The unique identifier of the session taking or holding the lock."""
+
+    ttl: float = Field(default=60.0)
+    """Time in seconds the lock is held for unless renewed. Defaults to 60.0."""
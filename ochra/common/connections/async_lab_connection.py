@@ -0,0 +1,677 @@
+from ..base.data_model import DataModel
+from .async_rest_adapter import AsyncRestAdapter
+from .rest_adapter import (
+    Result,
+    LabEngineBusyException,
+    LabEngineException,
+)
+from .api_models import (
+    BulkCallRequest,
+    BulkConstructionRequest,
+    LockRequest,
+    ObjectConstructionRequest,
+    OperationCall,
+    ObjectCallRequest,
+    ObjectPropertyPatchRequest,
+    ObjectPropertyGetRequest,
+    WorkflowRequest,
+    WorkflowStep,
+)
+from .lab_connection import WAIT_TIMEOUT, POLL_INTERVAL
+from uuid import UUID, uuid4
+import logging
+from typing import Any, Dict, List
+from ..utils.enum import OperationPriority, OperationStatus, PatchType
+from ..utils.misc import is_data_model, convert_to_data_model
+import asyncio
+import random
+
+
+class AsyncLabConnection:
+    """
+    Class that provides the interface of LabConnection to asyncio code, utilizing AsyncRestAdapter
+    for communication. Calls do not block the event loop and share a pool of keep-alive connections,
+    so many of them can be in flight at once, e.g. with asyncio.gather.
+
+    Unlike LabConnection, objects are returned as their DataModel rather than as proxies, since the
+    properties of proxies are read with blocking requests. Use get_property to read them instead.
+    A connection is bound to the event loop it is used in, close it with aclose or use it as an
+    async context manager. It requires httpx, installed with the "async" extra of the package.
+    """
+
+    def __init__(
+        self,
+        hostname: str = "127.0.0.1:8000",
+        experiment_id: str = None,
+        api_key: str = "",
+        ssl_verify: bool = False,
+        max_submit_retries: int = 8,
+        pool_size: int = 100,
+    ):
+        """
+        Constructor for AsyncLabConnection class.
+
+        Args:
+            hostname (str): Address of lab API. Defaults to "127.0.0.1:8000".
+            experiment_id (str, optional): ID of the experiment associated with this connection.
+                If None, a new UUID will be generated. Defaults to None.
+            api_key (str, optional): API key if exists. Defaults to ''.
+            ssl_verify (bool, optional): If we need to verify SSL. Defaults to False.
+            max_submit_retries (int, optional): How many times a submission rejected because the lab engine's
+                queue is full is retried before giving up. Defaults to 8.
+            pool_size (int, optional): Maximum number of concurrent connections to the lab engine. Defaults to 100.
+        """
+        self._logger = logging.getLogger(__name__)
+        self.rest_adapter: AsyncRestAdapter = AsyncRestAdapter(
+            hostname, api_key, ssl_verify, self._logger, pool_size=pool_size
+        )
+        if experiment_id is None:
+            self._session_id = str(uuid4())
+        else:
+            self._session_id = experiment_id
+
+        # delay before every submission, grows while the lab engine rejects them and shrinks again after
+        self._max_submit_retries = max_submit_retries
+        self._submit_delay = 0.0
+
+    async def __aenter__(self) -> "AsyncLabConnection":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """
+        Closes the connections to the lab engine.
+        """
+        await self.rest_adapter.aclose()
+
+    async def construct_object(self, type: str, object: DataModel) -> UUID:
+        """
+        Constructs an object on the lab engine.
+
+        Args:
+            type (str): The type of the object to construct.
+            object (DataModel): The data model instance representing the object to be constructed.
+
+        Raises:
+            LabEngineException: If there is an error during object construction or response parsing.
+
+        Returns:
+            UUID: The unique identifier of the constructed object.
+        """
+        req = ObjectConstructionRequest(object_json=object.model_dump_json())
+        result: Result = await self.rest_adapter.put(
+            f"/{type}/", data=req.model_dump(mode="json")
+        )
+        try:
+            return UUID(result.data)
+        except ValueError:
+            raise LabEngineException(f"Expected UUID, got {result.data}")
+        except Exception as e:
+            raise LabEngineException(f"Unexpected error: {e}")
+
+    async def construct_objects(self, type: str, objects: List[DataModel]) -> List[UUID]:
+        """
+        Constructs many objects of the same type on the lab engine with a single request.
+
+        Args:
+            type (str): The type of the objects to construct, e.g. "devices".
+            objects (List[DataModel]): The data model instances representing the objects to be constructed.
+
+        Raises:
+            LabEngineException: If there is an error during object construction or response parsing.
+
+        Returns:
+            List[UUID]: The unique identifiers of the constructed objects, in the order of the given ones.
+        """
+        req = BulkConstructionRequest(
+            objects_json=[object.model_dump_json() for object in objects]
+        )
+        result: Result = await self.rest_adapter.put(
+            f"/lab/{type}/bulk", data=req.model_dump(mode="json")
+        )
+        try:
+            return [UUID(id) for id in result.data]
+        except ValueError:
+            raise LabEngineException(f"Expected UUIDs, got {result.data}")
+        except Exception as e:
+            raise LabEngineException(f"Unexpected error: {e}")
+
+    async def get_object(self, type: str, identifier: str | UUID) -> DataModel:
+        """
+        Retrieve an object from the lab engine by its identifier.
+
+        Args:
+            type (str): The type of the object to retrieve.
+            identifier (str | UUID): The unique ID or name of the object.
+
+        Raises:
+            LabEngineException: If the object cannot be retrieved or parsed.
+
+        Returns:
+            DataModel: The data model of the object.
+        """
+        result: Result = await self.rest_adapter.get(
+            f"/{type}/", {"identifier": str(identifier)}
+        )
+        try:
+            return convert_to_data_model(result.data)
+        except Exception as e:
+            raise LabEngineException(f"Unexpected error: {e}")
+
+    async def get_all_objects(self, type: str) -> List[DataModel]:
+        """
+        Retrieve all objects of a specified type from the lab engine.
+
+        Args:
+            type (str): The type of objects to retrieve.
+
+        Raises:
+            LabEngineException: If retrieval or parsing fails.
+
+        Returns:
+            List[DataModel]: The data models of the objects.
+        """
+        result: Result = await self.rest_adapter.get(f"/{type}/all")
+        try:
+            return [convert_to_data_model(model_dict) for model_dict in result.data]
+        except Exception as e:
+            raise LabEngineException(f"Unexpected error: {e}")
+
+    async def delete_object(self, type: str, id: UUID):
+        """
+        Deletes an object from the lab engine.
+
+        Args:
+            type (str): The type of the object to delete.
+            id (UUID): The unique identifier of the object.
+
+        Raises:
+            LabEngineException: If deletion fails.
+
+        Returns:
+            Any: Response from the lab engine.
+        """
+        result: Result = await self.rest_adapter.delete(f"/{type}/{str(id)}/")
+        return result.data
+
+    async def call_on_object(
+        self,
+        type: str,
+        id: UUID,
+        method: str,
+        args: dict,
+        priority: OperationPriority = OperationPriority.NORMAL,
+        queue_timeout: float = None,
+        timeout: float = None,
+    ) -> DataModel:
+        """
+        Initiates a method call on a specified object within the lab engine and waits for it to complete.
+        Wrap the call in a task to run it alongside others.
+
+        Args:
+            type (str): The type of the object to invoke the method on.
+            id (UUID): The unique identifier of the target object.
+            method (str): The name of the method to execute.
+            args (dict): Arguments to pass to the method.
+            priority (OperationPriority, optional): Priority class of the operation. Defaults to OperationPriority.NORMAL.
+            queue_timeout (float, optional): Seconds the operation may wait in the queue before it fails. Defaults to None, unbounded.
+            timeout (float, optional): Seconds the operation may run before it is cancelled. Defaults to None, unbounded.
+
+        Raises:
+            LabEngineException: If the method invocation or the operation fails.
+
+        Returns:
+            DataModel: The data model of the completed operation.
+        """
+        req = ObjectCallRequest(
+            method=method,
+            args=args,
+            caller_id=self._session_id,
+            priority=priority,
+            queue_timeout=queue_timeout,
+            timeout=timeout,
+        )
+        result: Result = await self._submit(
+            f"/{type}/{str(id)}/method", data=req.model_dump(mode="json")
+        )
+        return await self._complete_operation(result)
+
+    async def call_on_device_class(
+        self,
+        device_class: str,
+        method: str,
+        args: dict,
+        module_path: str = None,
+        priority: OperationPriority = OperationPriority.NORMAL,
+        queue_timeout: float = None,
+        timeout: float = None,
+    ) -> DataModel:
+        """
+        Initiates a method call on whichever device of the given class becomes available first and waits for it to complete.
+
+        Args:
+            device_class (str): The class name of the devices.
+            method (str): The name of the method to execute.
+            args (dict): Arguments to pass to the method.
+            module_path (str, optional): The module of the devices, any if None. Defaults to None.
+            priority (OperationPriority, optional): Priority class of the operation. Defaults to OperationPriority.NORMAL.
+            queue_timeout (float, optional): Seconds the operation may wait in the queue before it fails. Defaults to None, unbounded.
+            timeout (float, optional): Seconds the operation may run before it is cancelled. Defaults to None, unbounded.
+
+        Raises:
+            LabEngineException: If the method invocation or the operation fails.
+
+        Returns:
+            DataModel: The data model of the completed operation.
+        """
+        req = ObjectCallRequest(
+            method=method,
+            args=args,
+            caller_id=self._session_id,
+            priority=priority,
+            queue_timeout=queue_timeout,
+            timeout=timeout,
+        )
+        result: Result = await self._submit(
+            f"/devices/classes/{device_class}/method",
+            ep_params={"module_path": module_path} if module_path else None,
+            data=req.model_dump(mode="json"),
+        )
+        return await self._complete_operation(result)
+
+    async def _submit(self, endpoint: str, ep_params: dict = None, data: dict = None) -> Result:
+        """
+        Posts a submission of operations, backing off while the lab engine's queue is full.
+        See LabConnection._submit for the backoff.
+
+        Args:
+            endpoint (str): The API endpoint to post to.
+            ep_params (dict, optional): Query parameters for the endpoint. Defaults to None.
+            data (dict, optional): JSON body of the request. Defaults to None.
+
+        Raises:
+            LabEngineBusyException: If the submission is still rejected after the maximum number of retries.
+            LabEngineException: If the request fails otherwise.
+
+        Returns:
+            Result: The response of the lab engine.
+        """
+        retries = 0
+        while True:
+            if self._submit_delay > 0:
+                await asyncio.sleep(random.uniform(1.0, 1.5) * self._submit_delay)
+            try:
+                result = await self.rest_adapter.post(endpoint, ep_params=ep_params, data=data)
+            except LabEngineBusyException as e:
+                self._submit_delay = min(60.0, max(e.retry_after, 2 * self._submit_delay))
+                retries += 1
+                if retries > self._max_submit_retries:
+                    raise
+                self._logger.warning(f"Lab engine is busy, retrying in about {self._submit_delay:.1f}s")
+                continue
+            self._submit_delay = self._submit_delay / 2 if self._submit_delay > 0.05 else 0.0
+            return result
+
+    async def _complete_operation(self, result: Result) -> DataModel:
+        """
+        Waits for the operation returned by a method call to complete.
+
+        Args:
+            result (Result): The response to the method call.
+
+        Raises:
+            LabEngineException: If the operation failed or the response cannot be parsed.
+
+        Returns:
+            DataModel: The data model of the completed operation.
+        """
+        try:
+            op = convert_to_data_model(result.data)
+        except Exception as e:
+            raise LabEngineException(f"Unexpected error: {e}")
+        await self.wait_for_operation(op.id)
+        result_id = await self.get_property("operations", op.id, "result")
+        if await self.get_property("operation_results", result_id, "success") is False:
+            raise LabEngineException(
+                await self.get_property("operation_results", result_id, "error")
+            )
+        return op
+
+    async def wait_for_operation(self, operation_id: UUID, timeout: float = None) -> bool:
+        """
+        Waits for an operation to complete, long-polling the lab engine like LabConnection.wait_for_operation.
+
+        Args:
+            operation_id (UUID): The unique identifier of the operation.
+            timeout (float, optional): Maximum time to wait in seconds. Waits indefinitely if None. Defaults to None.
+
+        Raises:
+            LabEngineException: If the status of the operation cannot be retrieved.
+
+        Returns:
+            bool: True if the operation completed, False if the timeout passed first.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            wait = WAIT_TIMEOUT
+            if deadline is not None:
+                wait = min(wait, deadline - loop.time())
+                if wait <= 0:
+                    return False
+            try:
+                result: Result = await self.rest_adapter.get(
+                    f"/operations/{str(operation_id)}/wait", {"timeout": wait}
+                )
+                if result.data["status"] == OperationStatus.COMPLETED:
+                    return True
+            except LabEngineException as e:
+                self._logger.warning(
+                    f"Could not wait for operation {operation_id}, polling its status instead: {e}"
+                )
+                await asyncio.sleep(min(POLL_INTERVAL, wait))
+                if await self.get_property("operations", operation_id, "status") == OperationStatus.COMPLETED:
+                    return True
+
+    async def lock_station(self, station_id: UUID, ttl: float = 60.0) -> float:
+        """
+        Acquires the lock of a station for this session, or renews it if the session already holds it.
+        The lock is released automatically once the lease runs out without being renewed.
+
+        Args:
+            station_id (UUID): The unique identifier of the station.
+            ttl (float, optional): Duration of the lease in seconds. Defaults to 60.0.
+
+        Raises:
+            LabEngineException: If the station does not exist or is locked by another session.
+
+        Returns:
+            float: The time the lease expires at, in seconds since the epoch.
+        """
+        req = LockRequest(caller_id=self._session_id, ttl=ttl)
+        result: Result = await self.rest_adapter.post(
+            f"/stations/{str(station_id)}/lock", data=req.model_dump(mode="json")
+        )
+        return result.data["lock_expires_at"]
+
+    async def unlock_station(self, station_id: UUID) -> bool:
+        """
+        Releases the lock of a station held by this session.
+
+        Args:
+            station_id (UUID): The unique identifier of the station.
+
+        Raises:
+            LabEngineException: If the station does not exist.
+
+        Returns:
+            bool: True if the lock was released, False if this session did not hold it.
+        """
+        req = LockRequest(caller_id=self._session_id)
+        result: Result = await self.rest_adapter.post(
+            f"/stations/{str(station_id)}/unlock", data=req.model_dump(mode="json")
+        )
+        return result.data
+
+    async def cancel_operation(self, op_id: UUID) -> bool:
+        """
+        Cancels an operation, whether it is still queued or already running on its station.
+
+        Args:
+            op_id (UUID): The unique identifier of the operation.
+
+        Raises:
+            LabEngineException: If the operation does not exist or its station cannot be reached.
+
+        Returns:
+            bool: True if the operation was cancelled or its station was asked to, False if it had already completed.
+        """
+        result: Result = await self.rest_adapter.post(f"/operations/{str(op_id)}/cancel")
+        return result.data
+
+    async def submit_operations(
+        self,
+        calls: List[OperationCall] = None,
+        sweep: OperationCall = None,
+        args_list: List[dict] = None,
+        args_grid: Dict[str, List[Any]] = None,
+    ) -> List[UUID]:
+        """
+        Submits many method calls in a single request, without waiting for them.
+        See LabConnection.submit_operations for how sweeps are expanded.
+
+        Args:
+            calls (List[OperationCall], optional): Calls submitted as they are. Defaults to None.
+            sweep (OperationCall, optional): Call submitted once per argument set, its own args are shared by every set. Defaults to None.
+            args_list (List[dict], optional): Argument sets of the sweep. Defaults to None.
+            args_grid (Dict[str, List[Any]], optional): Values of every swept argument. Defaults to None.
+
+        Raises:
+            LabEngineException: If the calls are rejected or the response cannot be parsed.
+
+        Returns:
+            List[UUID]: The IDs of the created operations, in submission order.
+        """
+        req = BulkCallRequest(
+            caller_id=self._session_id,
+            calls=calls or [],
+            sweep=sweep,
+            args_list=args_list or [],
+            args_grid=args_grid or {},
+        )
+        result: Result = await self._submit(
+            "/operations/bulk", data=req.model_dump(mode="json")
+        )
+        try:
+            return [UUID(op_id) for op_id in result.data]
+        except Exception as e:
+            raise LabEngineException(f"Unexpected error: {e}")
+
+    async def submit_workflow(self, steps: List[WorkflowStep]) -> Dict[str, Any]:
+        """
+        Submits a workflow to be run by the lab engine, without waiting for it.
+
+        Args:
+            steps (List[WorkflowStep]): The steps of the workflow.
+
+        Raises:
+            LabEngineException: If the workflow is rejected or the response cannot be parsed.
+
+        Returns:
+            Dict[str, Any]: The ID of the workflow under 'id' and the operation ID of every step under 'operations'.
+        """
+        req = WorkflowRequest(caller_id=self._session_id, steps=steps)
+        result: Result = await self._submit(
+            "/workflows/", data=req.model_dump(mode="json")
+        )
+        return result.data
+
+    async def get_workflow(self, workflow_id: str) -> Dict[str, Any]:
+        """
+        Retrieves a workflow and the status of its steps from the lab engine.
+
+        Args:
+            workflow_id (str): The ID of the workflow.
+
+        Raises:
+            LabEngineException: If the workflow does not exist.
+
+        Returns:
+            Dict[str, Any]: The workflow, with the status, success and result data of every step.
+        """
+        result: Result = await self.rest_adapter.get(f"/workflows/{workflow_id}")
+        return result.data
+
+    async def get_property(self, type: str, id: UUID, property: str) -> Any:
+        """
+        Retrieves the value of a specified property from an object on the lab engine.
+
+        Args:
+            type (str): The type of the object.
+            id (UUID): The unique identifier of the object.
+            property (str): The name of the property to retrieve.
+
+        Raises:
+            LabEngineException: If the property cannot be retrieved or parsed.
+
+        Returns:
+            Any: The value of the requested property, objects are returned as their DataModel.
+        """
+        req = ObjectPropertyGetRequest(property=property)
+        result: Result = await self.rest_adapter.get(
+            f"/{type}/{str(id)}/property", data=req.model_dump(mode="json")
+        )
+        try:
+            value = result.data
+            if is_data_model(value):
+                return convert_to_data_model(value)
+            elif isinstance(value, list):
+                return [
+                    convert_to_data_model(item) if is_data_model(item) else item
+                    for item in value
+                ]
+            elif isinstance(value, dict):
+                return {
+                    key: convert_to_data_model(val) if is_data_model(val) else val
+                    for key, val in value.items()
+                }
+            else:
+                return value
+        except Exception as e:
+            raise LabEngineException(f"Unexpected error: {e}")
+
+    async def set_property(self, type: str, id: UUID, property: str, value: Any):
+        """
+        Sets the value of a specified property on an object in the lab engine.
+
+        Args:
+            type (str): The type of the object to update.
+            id (UUID): The unique identifier of the object.
+            property (str): The name of the property to set.
+            value (Any): The value to assign to the property.
+
+        Returns:
+            Any: The response from the lab engine after setting the property.
+
+        Raises:
+            LabEngineException: If the property update fails.
+        """
+        if isinstance(value, DataModel):
+            value = value.get_base_model()
+        elif isinstance(value, list):
+            value = [
+                item.get_base_model() if isinstance(item, DataModel) else item
+                for item in value
+            ]
+        elif isinstance(value, dict):
+            value = {
+                key: val.get_base_model() if isinstance(val, DataModel) else val
+                for key, val in value.items()
+            }
+
+        req = ObjectPropertyPatchRequest(property=property, property_value=value)
+        result: Result = await self.rest_adapter.patch(
+            f"/{type}/{str(id)}/property", data=req.model_dump(mode="json")
+        )
+        return result.data
+
+    async def patch_property(
+        self,
+        type: str,
+        id: UUID,
+        property: str,
+        value: Any,
+        patch_type: PatchType,
+        patch_args: dict = None,
+    ) -> Any:
+        """
+        Applies a patch operation to a specified property of an object in the lab engine.
+
+        Args:
+            type (str): The type of the object whose property will be patched.
+            id (UUID): The unique identifier of the object.
+            property (str): The name of the property to patch.
+            value (Any): The value to apply in the patch operation.
+            patch_type (PatchType): The type of patch operation (e.g., ADD, REMOVE, REPLACE).
+            patch_args (dict, optional): Additional arguments for the patch operation. Defaults to None.
+
+        Returns:
+            Any: The response from the lab engine after applying the patch.
+
+        Raises:
+            LabEngineException: If the patch operation fails.
+        """
+        if isinstance(value, DataModel):
+            value = value.get_base_model()
+
+        req = ObjectPropertyPatchRequest(
+            property=property,
+            property_value=value,
+            patch_type=patch_type,
+            patch_args=patch_args,
+        )
+        result: Result = await self.rest_adapter.patch(
+            f"/{type}/{str(id)}/property", data=req.model_dump(mode="json")
+        )
+        return result.data
+
+    async def get_object_id(self, type: str, name: str) -> UUID:
+        """
+        Retrieves the unique identifier (UUID) of an object from the lab engine using its name.
+
+        Args:
+            type (str): The type of the object to retrieve.
+            name (str): The name of the object.
+
+        Raises:
+            LabEngineException: If the object cannot be found or the response is invalid.
+
+        Returns:
+            UUID: The unique identifier of the object.
+        """
+        result: Result = await self.rest_adapter.get(f"/{type}/", {"identifier": name})
+        try:
+            return UUID(result.data["id"])
+        except ValueError:
+            raise LabEngineException(f"Expected UUID, got {result.data}")
+        except Exception as e:
+            raise LabEngineException(f"Unexpected error: {e}")
+
+    async def put_data(self, type: str, id: str, result_data) -> UUID:
+        """
+        Uploads data to a OperationResult object in the lab engine.
+
+        Args:
+            type (str): The type of the object to upload data to.
+            id (str): The unique identifier of the object.
+            result_data (Any): The data to upload (e.g., file-like object, bytes, or dict).
+
+        Returns:
+            UUID: The unique identifier of the object after data upload.
+
+        Raises:
+            LabEngineException: If the upload fails or the response is invalid.
+        """
+        result: Result = await self.rest_adapter.patch(
+            f"/{type}/{str(id)}/data", files=result_data
+        )
+        return result.message
+
+    async def get_data(self, type: str, id: str) -> bytes:
+        """
+        Retrieves raw data from a results data object in the lab engine.
+
+        Args:
+            type (str): The type of the object to retrieve data from.
+            id (str): The unique identifier of the object.
+
+        Returns:
+            bytes: The raw bytes of the object's data.
+
+        Raises:
+            LabEngineException: If data retrieval fails.
+        """
+        result = await self.rest_adapter.get(f"/{type}/{str(id)}/data", jsonify=False)
+        return result.content
@@ -0,0 +1,221 @@
+import httpx
+from typing import Dict
+from json import JSONDecodeError
+import logging
+from .rest_adapter import LabEngineBusyException, LabEngineException, Result
+
+
+class AsyncRestAdapter:
+    """Adapter class for interacting with RESTful APIs from asyncio code, over a pool of keep-alive connections."""
+
+    def __init__(
+        self,
+        hostname: str,
+        api_key: str = "",
+        ssl_verify: bool = True,
+        logger: logging.Logger = None,
+        pool_size: int = 100,
+        timeout: float = 60.0,
+    ):
+        """
+        Initializes the AsyncRestAdapter for interacting with a RESTful API.
+
+        Args:
+            hostname (str): The hostname or IP address of the API server.
+            api_key (str, optional): API key for authentication. Defaults to ''.
+            ssl_verify (bool, optional): Whether to verify SSL certificates. Defaults to True.
+            logger (logging.Logger, optional): Custom logger instance. If None, a default logger is used.
+            pool_size (int, optional): Maximum number of concurrent connections, further requests wait for a free one. Defaults to 100.
+            timeout (float, optional): Timeout of a request in seconds, must exceed the long-poll timeout of the lab engine. Defaults to 60.0.
+        """
+        self.url = f"http://{hostname}/"
+        self._api_key = api_key
+        self._logger = logger or logging.getLogger(__name__)
+        self._client = httpx.AsyncClient(
+            verify=ssl_verify,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+        )
+
+    async def aclose(self) -> None:
+        """
+        Closes the connections of the pool.
+        """
+        await self._client.aclose()
+
+    async def _do(
+        self,
+        http_method: str,
+        endpoint: str,
+        ep_params: Dict = None,
+        data: Dict = None,
+        files=None,
+        jsonify=True,
+    ) -> Result | httpx.Response:
+        """
+        Executes an HTTP request using the specified method and parameters.
+
+        Args:
+            http_method (str): The HTTP method to use (e.g., 'GET', 'POST', 'PUT', 'PATCH', 'DELETE').
+            endpoint (str): The API endpoint to send the request to.
+            ep_params (Dict, optional): Query parameters for the endpoint. Defaults to None.
+            data (Dict, optional): JSON body to include in the request. Defaults to None.
+            files (Any, optional): Files to upload with the request. Defaults to None.
+            jsonify (bool, optional): If True, attempts to parse the response as JSON. If False, returns the raw response.
+
+        Raises:
+            LabEngineException: If the request fails, the response contains invalid JSON, or the response status code indicates an error.
+
+        Returns:
+            Result: An object containing the status code, message, and data from the response if successful.
+            httpx.Response: The raw response object if jsonify is False.
+        """
+        # unlike requests, httpx keeps the double slash of url + "/endpoint", which does not route
+        full_url = self.url + endpoint.lstrip("/")
+        headers = {"x-api-key": self._api_key}
+        log_line_pre = (
+            f"method={http_method}, "
+            + f"url={full_url}, params={str(ep_params).replace('{', '[').replace('}', ']')}"
+        )
+        log_line_post = ", ".join(
+            (log_line_pre, "success={}, status_code={}, message={}")
+        )
+
+        try:
+            self._logger.debug(msg=log_line_pre)
+            response = await self._client.request(
+                method=http_method,
+                url=full_url,
+                headers=headers,
+                params=ep_params,
+                json=data,
+                files=files,
+            )
+        except httpx.HTTPError as e:
+            self._logger.error(msg=str(e))
+            raise LabEngineException(f"Request Failed: {e}")
+
+        if not jsonify:
+            return response
+
+        try:
+            data_out = response.json()
+        except (ValueError, JSONDecodeError) as e:
+            self._logger.error(msg=log_line_post.format(False, None, e))
+            raise LabEngineException(f"Bad JSON in response: {e}")
+
+        is_success = 299 >= response.status_code >= 200
+        log_line = log_line_post.format(
+            is_success, response.status_code, response.reason_phrase
+        )
+        if is_success:
+            self._logger.debug(msg=log_line)
+            return Result(response.status_code, message=response.reason_phrase, data=data_out)
+        self._logger.error(msg=log_line)
+        if response.status_code == 429:
+            raise LabEngineBusyException(
+                f"{response.status_code}: {response.reason_phrase}, {response.text}",
+                retry_after=float(response.headers.get("Retry-After", 1)),
+            )
+        raise LabEngineException(
+            f"{response.status_code}: {response.reason_phrase}, {response.text}"
+        )
+
+    async def get(
+        self, endpoint: str, ep_params: Dict = None, data: Dict = None, jsonify=True
+    ) -> Result | httpx.Response:
+        """
+        Performs a GET request to the specified endpoint.
+
+        Args:
+            endpoint (str): The API endpoint to send the GET request to.
+            ep_params (Dict, optional): Query parameters for the endpoint. Defaults to None.
+            data (Dict, optional): JSON body to include in the request. Defaults to None.
+            jsonify (bool, optional): If True, parses the response as JSON. If False, returns the raw response.
+
+        Returns:
+            Result: An object containing the status code, message, and data from the response if successful.
+            httpx.Response: The raw response object if jsonify is False.
+        """
+        return await self._do(
+            http_method="GET",
+            endpoint=endpoint,
+            ep_params=ep_params,
+            data=data,
+            jsonify=jsonify,
+        )
+
+    async def put(self, endpoint: str, ep_params: Dict = None, data: Dict = None) -> Result:
+        """
+        Performs a PUT request to the specified endpoint.
+
+        Args:
+            endpoint (str): The API endpoint to send the PUT request to.
+            ep_params (Dict, optional): Query parameters for the endpoint. Defaults to None.
+            data (Dict, optional): JSON body to include in the request. Defaults to None.
+
+        Returns:
+            Result: An object containing the status code, message, and data from the response if successful.
+        """
+        return await self._do(
+            http_method="PUT", endpoint=endpoint, ep_params=ep_params, data=data
+        )
+
+    async def post(self, endpoint: str, ep_params: Dict = None, data: Dict = None) -> Result:
+        """
+        Performs a POST request to the specified endpoint.
+
+        Args:
+            endpoint (str): The API endpoint to send the POST request to.
+            ep_params (Dict, optional): Query parameters for the endpoint. Defaults to None.
+            data (Dict, optional): JSON body to include in the request. Defaults to None.
+
+        Returns:
+            Result: An object containing the status code, message, and data from the response if successful.
+        """
+        return await self._do(
+            http_method="POST", endpoint=endpoint, ep_params=ep_params, data=data
+        )
+
+    async def patch(
+        self, endpoint: str, ep_params: Dict = None, data: Dict = None, files=None
+    ) -> Result:
+        """
+        Performs a PATCH request to the specified endpoint.
+
+        Args:
+            endpoint (str): The API endpoint to send the PATCH request to.
+            ep_params (Dict, optional): Query parameters for the endpoint. Defaults to None.
+            data (Dict, optional): JSON body to include in the request. Defaults to None.
+            files (Any, optional): Files to upload with the request. Defaults to None.
+
+        Returns:
+            Result: An object containing the status code, message, and data from the response if successful.
+        """
+        return await self._do(
+            http_method="PATCH",
+            endpoint=endpoint,
+            ep_params=ep_params,
+            data=data,
+            files=files,
+        )
+
+    async def delete(
+        self, endpoint: str, ep_params: Dict = None, data: Dict = None
+    ) -> Result:
+        """
+        Performs a DELETE request to the specified endpoint.
+
+        Args:
+            endpoint (str): The API endpoint to send the DELETE request to.
+            ep_params (Dict, optional): Query parameters for the endpoint. Defaults to None.
+            data (Dict, optional): JSON body to include in the request. Defaults to None.
+
+        Returns:
+            Result: An object containing the status code, message, and data from the response if successful.
+        """
+        return await self._do(
+            http_method="DELETE", endpoint=endpoint, ep_params=ep_params, data=data
+        )
@@ -1,23 +1,44 @@
 from ..utils.singleton_meta import SingletonMeta
 from ..base.data_model import DataModel
-from .rest_adapter import RestAdapter, Result, LabEngineException
+from .rest_adapter import (
+    RestAdapter,
+    Result,
+    LabEngineBusyException,
+    LabEngineException,
+)
+from .operation_future import OperationFuture
 from .api_models import (
+    BulkCallRequest,
+    BulkConstructionRequest,
+    LockRequest,
     ObjectConstructionRequest,
+    OperationCall,
     ObjectCallRequest,
     ObjectPropertyPatchRequest,
     ObjectPropertyGetRequest,
+    WorkflowRequest,
+    WorkflowStep,
 )
 from uuid import UUID, uuid4
 import logging
-from typing import Any, Type, Union, List
+from typing import Any, Dict, Type, Union, List
+from concurrent.futures import Future, ThreadPoolExecutor
 import importlib
 from ..equipment.operation import Operation
-from ..utils.enum import OperationStatus, PatchType
+from ..utils.enum import OperationPriority, OperationStatus, PatchType
 from ..utils.misc import is_data_model, convert_to_data_model
 import time
+import random
 
 # TODO change the return types of get_property and get_all_objects to be more specific
 
+# how long the lab engine holds a request waiting for an operation before answering
+WAIT_TIMEOUT = 30.0
+# how long a watcher waits for an operation before turning to the next pending one
+WATCH_TURN = 2.0
+# interval between status checks when the lab engine cannot be waited on
+POLL_INTERVAL = 5.0
+
 
 class LabConnection(metaclass=SingletonMeta):
     """
@@ -31,6 +52,8 @@ class LabConnection(metaclass=SingletonMeta):
         experiment_id: str = None,
         api_key: str = "",
         ssl_verify: bool = False,
+        max_submit_retries: int = 8,
+        max_watchers: int = 32,
     ):
         """
         Constructor for LabConnection class.
@@ -41,6 +64,10 @@ class LabConnection(metaclass=SingletonMeta):
                 If None, a new UUID will be generated. Defaults to None.
             api_key (str, optional): API key if exists. Defaults to ''.
             ssl_verify (bool, optional): If we need to verify SSL. Defaults to False.
+            max_submit_retries (int, optional): How many times a submission rejected because the lab engine's
+                queue is full is retried before giving up. Defaults to 8.
+            max_watchers (int, optional): Number of threads waiting for submitted operations in the background.
+                More operations can be pending, they are waited for in turns of WATCH_TURN. Defaults to 32.
         """
         self._logger = logging.getLogger(__name__)
         self.rest_adapter: RestAdapter = RestAdapter(
@@ -51,6 +78,15 @@ class LabConnection(metaclass=SingletonMeta):
         else:
             self._session_id = experiment_id
 
+        # delay before every submission, grows while the lab engine rejects them and shrinks again after
+        self._max_submit_retries = max_submit_retries
+        self._submit_delay = 0.0
+
+        # waits for the operations returned as futures
+        self._watchers = ThreadPoolExecutor(
+            max_workers=max_watchers, thread_name_prefix="operation-watcher"
+        )
+
     def load_from_data_model(self, model: DataModel) -> Any:
         """
         Instantiates an object from a given DataModel.
@@ -98,6 +134,33 @@ class LabConnection(metaclass=SingletonMeta):
         except Exception as e:
             raise LabEngineException(f"Unexpected error: {e}")
 
+    def construct_objects(self, type: str, objects: List[DataModel]) -> List[UUID]:
+        """
+        Constructs many objects of the same type on the lab engine with a single request.
+
+        Args:
+            type (str): The type of the objects to construct, e.g. "devices".
+            objects (List[DataModel]): The data model instances representing the objects to be constructed.
+
+        Raises:
+            LabEngineException: If there is an error during object construction or response parsing.
+
+        Returns:
+            List[UUID]: The unique identifiers of the constructed objects, in the order of the given ones.
+        """
+        req = BulkConstructionRequest(
+            objects_json=[object.model_dump_json() for object in objects]
+        )
+        result: Result = self.rest_adapter.put(
+            f"/lab/{type}/bulk", data=req.model_dump(mode="json")
+        )
+        try:
+            return [UUID(id) for id in result.data]
+        except ValueError:
+            raise LabEngineException(f"Expected UUIDs, got {result.data}")
+        except Exception as e:
+            raise LabEngineException(f"Unexpected error: {e}")
+
     def get_object(self, type: str, identifier: str | UUID) -> Any:
         """
         Retrieve an object from the lab engine by its identifier.
@@ -164,37 +227,434 @@ class LabConnection(metaclass=SingletonMeta):
         result: Result = self.rest_adapter.delete(f"/{type}/{str(id)}/")
         return result.data
 
-    def call_on_object(self, type: str, id: UUID, method: str, args: dict) -> Operation:
+    def submit_on_object(
+        self,
+        type: str,
+        id: UUID,
+        method: str,
+        args: dict,
+        priority: OperationPriority = OperationPriority.NORMAL,
+        queue_timeout: float = None,
+        timeout: float = None,
+    ) -> OperationFuture:
         """
-        Initiates a method call on a specified object within the lab engine.
+        Initiates a method call on a specified object within the lab engine, without waiting for it to complete.
 
         Args:
             type (str): The type of the object to invoke the method on.
             id (UUID): The unique identifier of the target object.
             method (str): The name of the method to execute.
             args (dict): Arguments to pass to the method.
+            priority (OperationPriority, optional): Priority class of the operation. Defaults to OperationPriority.NORMAL.
+            queue_timeout (float, optional): Seconds the operation may wait in the queue before it fails. Defaults to None, unbounded.
+            timeout (float, optional): Seconds the operation may run before it is cancelled. Defaults to None, unbounded.
 
         Raises:
             LabEngineException: If the method invocation fails or the response cannot be parsed.
 
         Returns:
-            Operation: An Operation instance representing the status and result of the method call.
+            OperationFuture: A future resolved with the operation once it completed.
         """
-        req = ObjectCallRequest(method=method, args=args, caller_id=self._session_id)
-        result: Result = self.rest_adapter.post(
+        req = ObjectCallRequest(
+            method=method,
+            args=args,
+            caller_id=self._session_id,
+            priority=priority,
+            queue_timeout=queue_timeout,
+            timeout=timeout,
+        )
+        result: Result = self._submit(
             f"/{type}/{str(id)}/method", data=req.model_dump(mode="json")
         )
+        return self._watch(self._load_operation(result))
+
+    def call_on_object(
+        self,
+        type: str,
+        id: UUID,
+        method: str,
+        args: dict,
+        priority: OperationPriority = OperationPriority.NORMAL,
+        queue_timeout: float = None,
+        timeout: float = None,
+    ) -> Operation:
+        """
+        Initiates a method call on a specified object within the lab engine and waits for it to complete.
+
+        Args:
+            type (str): The type of the object to invoke the method on.
+            id (UUID): The unique identifier of the target object.
+            method (str): The name of the method to execute.
+            args (dict): Arguments to pass to the method.
+            priority (OperationPriority, optional): Priority class of the operation. Defaults to OperationPriority.NORMAL.
+            queue_timeout (float, optional): Seconds the operation may wait in the queue before it fails. Defaults to None, unbounded.
+            timeout (float, optional): Seconds the operation may run before it is cancelled. Defaults to None, unbounded.
+
+        Raises:
+            LabEngineException: If the method invocation fails or the response cannot be parsed.
+
+        Returns:
+            Operation: An Operation instance representing the status and result of the method call.
+        """
+        return self.submit_on_object(
+            type, id, method, args, priority, queue_timeout, timeout
+        ).result()
+
+    def submit_on_device_class(
+        self,
+        device_class: str,
+        method: str,
+        args: dict,
+        module_path: str = None,
+        priority: OperationPriority = OperationPriority.NORMAL,
+        queue_timeout: float = None,
+        timeout: float = None,
+    ) -> OperationFuture:
+        """
+        Initiates a method call on whichever device of the given class becomes available first, without waiting for it to complete.
+
+        Args:
+            device_class (str): The class name of the devices.
+            method (str): The name of the method to execute.
+            args (dict): Arguments to pass to the method.
+            module_path (str, optional): The module of the devices, any if None. Defaults to None.
+            priority (OperationPriority, optional): Priority class of the operation. Defaults to OperationPriority.NORMAL.
+            queue_timeout (float, optional): Seconds the operation may wait in the queue before it fails. Defaults to None, unbounded.
+            timeout (float, optional): Seconds the operation may run before it is cancelled. Defaults to None, unbounded.
+
+        Raises:
+            LabEngineException: If the method invocation fails or the response cannot be parsed.
+
+        Returns:
+            OperationFuture: A future resolved with the operation once it completed.
+        """
+        req = ObjectCallRequest(
+            method=method,
+            args=args,
+            caller_id=self._session_id,
+            priority=priority,
+            queue_timeout=queue_timeout,
+            timeout=timeout,
+        )
+        result: Result = self._submit(
+            f"/devices/classes/{device_class}/method",
+            ep_params={"module_path": module_path} if module_path else None,
+            data=req.model_dump(mode="json"),
+        )
+        return self._watch(self._load_operation(result))
+
+    def call_on_device_class(
+        self,
+        device_class: str,
+        method: str,
+        args: dict,
+        module_path: str = None,
+        priority: OperationPriority = OperationPriority.NORMAL,
+        queue_timeout: float = None,
+        timeout: float = None,
+    ) -> Operation:
+        """
+        Initiates a method call on whichever device of the given class becomes available first and waits for it to complete.
+
+        Args:
+            device_class (str): The class name of the devices.
+            method (str): The name of the method to execute.
+            args (dict): Arguments to pass to the method.
+            module_path (str, optional): The module of the devices, any if None. Defaults to None.
+            priority (OperationPriority, optional): Priority class of the operation. Defaults to OperationPriority.NORMAL.
+            queue_timeout (float, optional): Seconds the operation may wait in the queue before it fails. Defaults to None, unbounded.
+            timeout (float, optional): Seconds the operation may run before it is cancelled. Defaults to None, unbounded.
+
+        Raises:
+            LabEngineException: If the method invocation fails or the response cannot be parsed.
+
+        Returns:
+            Operation: An Operation instance representing the status and result of the method call.
+        """
+        return self.submit_on_device_class(
+            device_class, method, args, module_path, priority, queue_timeout, timeout
+        ).result()
+
+    def _submit(self, endpoint: str, ep_params: dict = None, data: dict = None) -> Result:
+        """
+        Posts a submission of operations, backing off while the lab engine's queue is full.
+
+        Every rejection doubles the delay applied before this connection's submissions, starting from
+        the Retry-After hint of the lab engine, and every accepted submission halves it again, so a
+        client submitting in a loop settles at the rate the lab drains its queue. Waits are randomized
+        so that rejected clients do not retry in lockstep.
+
+        Args:
+            endpoint (str): The API endpoint to post to.
+            ep_params (dict, optional): Query parameters for the endpoint. Defaults to None.
+            data (dict, optional): JSON body of the request. Defaults to None.
+
+        Raises:
+            LabEngineBusyException: If the submission is still rejected after the maximum number of retries.
+            LabEngineException: If the request fails otherwise.
+
+        Returns:
+            Result: The response of the lab engine.
+        """
+        retries = 0
+        while True:
+            if self._submit_delay > 0:
+                time.sleep(random.uniform(1.0, 1.5) * self._submit_delay)
+            try:
+                result = self.rest_adapter.post(endpoint, ep_params=ep_params, data=data)
+            except LabEngineBusyException as e:
+                self._submit_delay = min(60.0, max(e.retry_after, 2 * self._submit_delay))
+                retries += 1
+                if retries > self._max_submit_retries:
+                    raise
+                self._logger.warning(f"Lab engine is busy, retrying in about {self._submit_delay:.1f}s")
+                continue
+            self._submit_delay = self._submit_delay / 2 if self._submit_delay > 0.05 else 0.0
+            return result
+
+    def _load_operation(self, result: Result) -> Operation:
+        """
+        Loads the operation returned by a method call.
+
+        Args:
+            result (Result): The response to the method call.
+
+        Raises:
+            LabEngineException: If the response cannot be parsed.
+
+        Returns:
+            Operation: The submitted operation.
+        """
         try:
             base_model = convert_to_data_model(result.data)
-            op: Operation = self.load_from_data_model(base_model)
-            while op.status != OperationStatus.COMPLETED:
-                time.sleep(5)
-            if self.get_property("operation_results",op.result,"success") is False:
-                raise LabEngineException(self.get_property("operation_results",op.result,"error"))
-            return op
+            return self.load_from_data_model(base_model)
         except Exception as e:
             raise LabEngineException(f"Unexpected error: {e}")
 
+    def watch_operation(self, operation_id: UUID) -> OperationFuture:
+        """
+        Gets a future for an operation submitted earlier, e.g. through submit_operations or as a workflow step.
+
+        Args:
+            operation_id (UUID): The unique identifier of the operation.
+
+        Raises:
+            LabEngineException: If the operation cannot be retrieved.
+
+        Returns:
+            OperationFuture: A future resolved with the operation once it completed.
+        """
+        return self._watch(self.get_object("operations", operation_id))
+
+    def _watch(self, op: Operation) -> OperationFuture:
+        """
+        Waits for an operation in the background.
+
+        Args:
+            op (Operation): The operation to wait for.
+
+        Returns:
+            OperationFuture: A future resolved with the operation once it completed.
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+        self._watchers.submit(self._watch_operation, op, future)
+        return OperationFuture(op, future, self)
+
+    def _watch_operation(self, op: Operation, future: Future) -> None:
+        """
+        Waits for an operation for one turn of WATCH_TURN and resolves its future if it completed.
+        Otherwise the wait is queued again behind the other pending operations. Turns are kept short
+        because a watcher in a long-poll cannot be interrupted: with more operations pending than
+        watcher threads, a completed operation is noticed within about WATCH_TURN times the number
+        of pending operations per watcher, instead of after whole WAIT_TIMEOUT long-polls.
+
+        Args:
+            op (Operation): The operation to wait for.
+            future (Future): The future of the operation.
+        """
+        try:
+            if not self.wait_for_operation(op.id, timeout=WATCH_TURN):
+                self._watchers.submit(self._watch_operation, op, future)
+                return
+            if self.get_property("operation_results", op.result, "success") is False:
+                future.set_exception(
+                    LabEngineException(self.get_property("operation_results", op.result, "error"))
+                )
+            else:
+                future.set_result(op)
+        except Exception as e:
+            future.set_exception(LabEngineException(f"Unexpected error: {e}"))
+
+    def wait_for_operation(self, operation_id: UUID, timeout: float = None) -> bool:
+        """
+        Waits for an operation to complete. The lab engine holds every request until the operation
+        completed or WAIT_TIMEOUT passed, so the wait ends as soon as the operation completes.
+        If a request fails, e.g. because the lab engine does not support waiting, the status is polled instead.
+
+        Args:
+            operation_id (UUID): The unique identifier of the operation.
+            timeout (float, optional): Maximum time to wait in seconds. Waits indefinitely if None. Defaults to None.
+
+        Raises:
+            LabEngineException: If the status of the operation cannot be retrieved.
+
+        Returns:
+            bool: True if the operation completed, False if the timeout passed first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = WAIT_TIMEOUT
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    return False
+            try:
+                result: Result = self.rest_adapter.get(
+                    f"/operations/{str(operation_id)}/wait", {"timeout": wait}
+                )
+                if result.data["status"] == OperationStatus.COMPLETED:
+                    return True
+            except LabEngineException as e:
+                self._logger.warning(
+                    f"Could not wait for operation {operation_id}, polling its status instead: {e}"
+                )
+                time.sleep(min(POLL_INTERVAL, wait))
+                if self.get_property("operations", operation_id, "status") == OperationStatus.COMPLETED:
+                    return True
+
+    def lock_station(self, station_id: UUID, ttl: float = 60.0) -> float:
+        """
+        Acquires the lock of a station for this session, or renews it if the session already holds it.
+        The lock is released automatically once the lease runs out without being renewed.
+
+        Args:
+            station_id (UUID): The unique identifier of the station.
+            ttl (float, optional): Duration of the lease in seconds. Defaults to 60.0.
+
+        Raises:
+            LabEngineException: If the station does not exist or is locked by another session.
+
+        Returns:
+            float: The time the lease expires at, in seconds since the epoch.
+        """
+        req = LockRequest(caller_id=self._session_id, ttl=ttl)
+        result: Result = self.rest_adapter.post(
+            f"/stations/{str(station_id)}/lock", data=req.model_dump(mode="json")
+        )
+        return result.data["lock_expires_at"]
+
+    def unlock_station(self, station_id: UUID) -> bool:
+        """
+        Releases the lock of a station held by this session.
+
+        Args:
+            station_id (UUID): The unique identifier of the station.
+
+        Raises:
+            LabEngineException: If the station does not exist.
+
+        Returns:
+            bool: True if the lock was released, False if this session did not hold it.
+        """
+        req = LockRequest(caller_id=self._session_id)
+        result: Result = self.rest_adapter.post(
+            f"/stations/{str(station_id)}/unlock", data=req.model_dump(mode="json")
+        )
+        return result.data
+
+    def cancel_operation(self, op_id: UUID) -> bool:
+        """
+        Cancels an operation, whether it is still queued or already running. A running operation
+        is completed as failed once its method returned or its station gave up waiting for it.
+
+        Args:
+            op_id (UUID): The unique identifier of the operation.
+
+        Raises:
+            LabEngineException: If the operation does not exist or its station cannot be reached.
+
+        Returns:
+            bool: True if the operation was cancelled or its station was asked to, False if it had already completed.
+        """
+        result: Result = self.rest_adapter.post(f"/operations/{str(op_id)}/cancel")
+        return result.data
+
+    def submit_operations(
+        self,
+        calls: List[OperationCall] = None,
+        sweep: OperationCall = None,
+        args_list: List[dict] = None,
+        args_grid: Dict[str, List[Any]] = None,
+    ) -> List[UUID]:
+        """
+        Submits many method calls in a single request, without waiting for them. The sweep is
+        submitted once for every argument set of args_list and every combination of args_grid,
+        e.g. args_grid={"well": ["A1", "A2"], "volume": [10, 20]} results in four operations.
+
+        Args:
+            calls (List[OperationCall], optional): Calls submitted as they are. Defaults to None.
+            sweep (OperationCall, optional): Call submitted once per argument set, its own args are shared by every set. Defaults to None.
+            args_list (List[dict], optional): Argument sets of the sweep. Defaults to None.
+            args_grid (Dict[str, List[Any]], optional): Values of every swept argument. Defaults to None.
+
+        Raises:
+            LabEngineException: If the calls are rejected or the response cannot be parsed.
+
+        Returns:
+            List[UUID]: The IDs of the created operations, in submission order.
+        """
+        req = BulkCallRequest(
+            caller_id=self._session_id,
+            calls=calls or [],
+            sweep=sweep,
+            args_list=args_list or [],
+            args_grid=args_grid or {},
+        )
+        result: Result = self._submit(
+            "/operations/bulk", data=req.model_dump(mode="json")
+        )
+        try:
+            return [UUID(op_id) for op_id in result.data]
+        except Exception as e:
+            raise LabEngineException(f"Unexpected error: {e}")
+
+    def submit_workflow(self, steps: List[WorkflowStep]) -> Dict[str, Any]:
+        """
+        Submits a workflow to be run by the lab engine. Returns without waiting for it, steps
+        start as soon as the steps they depend on completed successfully.
+
+        Args:
+            steps (List[WorkflowStep]): The steps of the workflow.
+
+        Raises:
+            LabEngineException: If the workflow is rejected or the response cannot be parsed.
+
+        Returns:
+            Dict[str, Any]: The ID of the workflow under 'id' and the operation ID of every step under 'operations'.
+        """
+        req = WorkflowRequest(caller_id=self._session_id, steps=steps)
+        result: Result = self._submit(
+            "/workflows/", data=req.model_dump(mode="json")
+        )
+        return result.data
+
+    def get_workflow(self, workflow_id: str) -> Dict[str, Any]:
+        """
+        Retrieves a workflow and the status of its steps from the lab engine.
+
+        Args:
+            workflow_id (str): The ID of the workflow.
+
+        Raises:
+            LabEngineException: If the workflow does not exist.
+
+        Returns:
+            Dict[str, Any]: The workflow, with the status, success and result data of every step.
+        """
+        result: Result = self.rest_adapter.get(f"/workflows/{workflow_id}")
+        return result.data
+
     def get_property(self, type: str, id: UUID, property: str) -> Any:
         """
         Retrieves the value of a specified property from an object on the lab engine.
@@ -0,0 +1,154 @@
+from concurrent import futures
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Set, Tuple
+from uuid import UUID
+from ..equipment.operation import Operation
+
+if TYPE_CHECKING:
+    from .lab_connection import LabConnection
+
+
+class OperationFuture:
+    """
+    Handle to an operation submitted to the lab engine without waiting for it. The lab connection
+    resolves it in the background once the operation completed, so a single process can keep many
+    stations busy at once and collect the results as they come in.
+    """
+
+    def __init__(
+        self, operation: Operation, future: Future, lab_conn: "LabConnection"
+    ) -> None:
+        """
+        Initialize the OperationFuture.
+
+        Args:
+            operation (Operation): The submitted operation.
+            future (Future): Future resolved with the operation once it completed successfully,
+                or with a LabEngineException once it failed.
+            lab_conn (LabConnection): Connection the operation was submitted through.
+        """
+        self._operation = operation
+        self._future = future
+        self._lab_conn = lab_conn
+
+    @property
+    def operation(self) -> Operation:
+        """
+        The submitted operation.
+        """
+        return self._operation
+
+    @property
+    def operation_id(self) -> UUID:
+        """
+        The unique identifier of the submitted operation.
+        """
+        return self._operation.id
+
+    def done(self) -> bool:
+        """
+        Check whether the operation completed, without waiting.
+
+        Returns:
+            bool: True if the operation completed, successfully or not.
+        """
+        return self._future.done()
+
+    def result(self, timeout: float = None) -> Operation:
+        """
+        Wait for the operation to complete.
+
+        Args:
+            timeout (float, optional): Maximum time to wait in seconds. Waits indefinitely if None. Defaults to None.
+
+        Raises:
+            LabEngineException: If the operation failed.
+            TimeoutError: If the operation did not complete within the timeout.
+
+        Returns:
+            Operation: The completed operation.
+        """
+        return self._future.result(timeout)
+
+    def exception(self, timeout: float = None) -> BaseException | None:
+        """
+        Wait for the operation to complete and return the reason it failed.
+
+        Args:
+            timeout (float, optional): Maximum time to wait in seconds. Waits indefinitely if None. Defaults to None.
+
+        Raises:
+            TimeoutError: If the operation did not complete within the timeout.
+
+        Returns:
+            BaseException | None: The exception result() would raise, None if the operation succeeded.
+        """
+        return self._future.exception(timeout)
+
+    def add_done_callback(self, fn: Callable[["OperationFuture"], None]) -> None:
+        """
+        Call a function once the operation completed, right away if it already did.
+        Callbacks run on the thread that noticed the completion and should not block.
+
+        Args:
+            fn (Callable[[OperationFuture], None]): Function called with this future.
+        """
+        self._future.add_done_callback(lambda _: fn(self))
+
+    def cancel(self) -> bool:
+        """
+        Ask the lab engine to cancel the operation. The future completes with an exception
+        once the operation was cancelled.
+
+        Raises:
+            LabEngineException: If the station of a running operation cannot be reached.
+
+        Returns:
+            bool: True if the operation was cancelled or its station was asked to, False if it had already completed.
+        """
+        if self.done():
+            return False
+        return self._lab_conn.cancel_operation(self.operation_id)
+
+    def __repr__(self) -> str:
+        return f"OperationFuture(operation_id={self.operation_id}, done={self.done()})"
+
+
+def wait_all(
+    operation_futures: Iterable[OperationFuture], timeout: float = None
+) -> Tuple[Set[OperationFuture], Set[OperationFuture]]:
+    """
+    Wait for all the given operations to complete.
+
+    Args:
+        operation_futures (Iterable[OperationFuture]): The operations to wait for.
+        timeout (float, optional): Maximum time to wait in seconds. Waits indefinitely if None. Defaults to None.
+
+    Returns:
+        Tuple[Set[OperationFuture], Set[OperationFuture]]: The completed operations and the ones
+            still pending when the timeout passed.
+    """
+    by_future = {op_future._future: op_future for op_future in operation_futures}
+    done, pending = futures.wait(by_future, timeout)
+    return {by_future[f] for f in done}, {by_future[f] for f in pending}
+
+
+def as_completed(
+    operation_futures: Iterable[OperationFuture], timeout: float = None
+) -> Iterator[OperationFuture]:
+    """
+    Iterate over the given operations in the order they complete.
+
+    Args:
+        operation_futures (Iterable[OperationFuture]): The operations to wait for.
+        timeout (float, optional): Maximum time to wait for all of them in seconds. Waits indefinitely if None. Defaults to None.
+
+    Raises:
+        TimeoutError: If not all operations completed within the timeout.
+
+    Yields:
+        OperationFuture: The next operation to complete.
+    """
+    by_future = {op_future._future: op_future for op_future in operation_futures}
+    for future in futures.as_completed(by_future, timeout):
+        yield by_future[future]
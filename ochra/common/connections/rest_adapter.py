@@ -1,5 +1,7 @@
 import requests
+import threading
 import requests.packages
+from requests.adapters import HTTPAdapter
 from typing import List, Dict
 from json import JSONDecodeError
 import logging
@@ -11,6 +13,23 @@ class LabEngineException(Exception):
     pass
 
 
+class LabEngineBusyException(LabEngineException):
+    """
+    Raised when the lab engine rejects a request because it is overloaded.
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        """
+        Initializes a LabEngineBusyException instance.
+
+        Args:
+            message (str): Description of the rejection.
+            retry_after (float): Seconds the lab engine asked to wait before retrying.
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 class Result:
     """
     A class representing the result of an HTTP request, including status code, message, and data.
@@ -41,7 +60,8 @@ class RestAdapter:
         logger: logging.Logger = None,
     ):
         """
-        Initializes the RestAdapter for interacting with a RESTful API.
+        Initializes the RestAdapter for interacting with a RESTful API. The adapter may be shared
+        between threads, each thread sends its requests through its own session.
 
         Args:
             hostname (str): The hostname or IP address of the API server.
@@ -53,10 +73,24 @@ class RestAdapter:
         self._api_key = api_key
         self._ssl_verify = ssl_verify
         self._logger = logger or logging.getLogger(__name__)
+        # requests.Session is not thread-safe, keep one per thread
+        self._sessions = threading.local()
         if not ssl_verify:
             # noinspection PyUnresolvedReferences
             requests.packages.urllib3.disable_warnings()
 
+    @property
+    def _session(self) -> requests.Session:
+        """
+        The session of the calling thread, reusing its keep-alive connection across requests.
+        """
+        session = getattr(self._sessions, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount(self.url, HTTPAdapter(pool_maxsize=1))
+            self._sessions.session = session
+        return session
+
     def _do(
         self,
         http_method: str,
@@ -98,7 +132,7 @@ class RestAdapter:
         # log request and perform HTTP Request catching exceptions and re-raising
         try:
             self._logger.debug(msg=log_line_pre)
-            response = requests.request(
+            response = self._session.request(
                 method=http_method,
                 url=full_url,
                 verify=self._ssl_verify,
@@ -133,6 +167,11 @@ class RestAdapter:
             self._logger.debug(msg=log_line)
             return Result(response.status_code, message=response.reason, data=data_out)
         self._logger.error(msg=log_line)
+        if response.status_code == 429:
+            raise LabEngineBusyException(
+                f"{response.status_code}: {response.reason}, {response.text}",
+                retry_after=float(response.headers.get("Retry-After", 1)),
+            )
         raise LabEngineException(
             f"{response.status_code}: {response.reason}, {response.text}"
         )
@@ -3,7 +3,7 @@ import uuid
 from datetime import datetime
 from typing import Dict, Any
 from ..base.data_model import DataModel
-from ..utils.enum import OperationStatus
+from ..utils.enum import OperationPriority, OperationStatus
 from .operation_result import OperationResult
 
 
@@ -30,6 +30,9 @@ class Operation(DataModel):
     status: OperationStatus = OperationStatus.CREATED
     """Current status of the operation. Defaults to CREATED."""
 
+    priority: OperationPriority = OperationPriority.NORMAL
+    """Priority class of the operation. Defaults to NORMAL."""
+
     start_timestamp: datetime = Field(default=None)
     """ Timestamp when the operation started."""
 
@@ -39,4 +42,13 @@ class Operation(DataModel):
     result: OperationResult = Field(default=None)
     """Result of the operation."""
 
+    workflow_id: uuid.UUID | None = Field(default=None)
+    """Unique identifier of the workflow the operation is a step of, if any."""
+
+    queue_timeout: float | None = Field(default=None)
+    """Maximum time in seconds the operation may wait in the queue before it expires, unbounded if None."""
+
+    timeout: float | None = Field(default=None)
+    """Maximum time in seconds the operation may run before it is cancelled, unbounded if None."""
+
     _endpoint = "operations"  # associated endpoint for all operations
@@ -40,6 +40,9 @@ class Station(DataModel):
     locked: Optional[UUID] = Field(default=None)
     """Session ID of the user who has locked the station, if any."""
 
+    max_concurrent_ops: int = 1
+    """Maximum number of operations run at the same time, each on a different device (default: 1)."""
+
     _endpoint = "stations"  # associated endpoint for all stations
 
     def get_device(self, device_identifier: str| UUID) -> Type[Device]:
@@ -88,6 +88,22 @@ class OperationStatus(IntEnum):
     """Operation is currently in progress."""
 
 
+class OperationPriority(IntEnum):
+    """
+    An enumeration representing the priority classes of operations. Queued operations of a
+    higher class are always dispatched before those of a lower one.
+    """
+
+    BULK = 0
+    """Background work such as parametric sweeps."""
+
+    NORMAL = 1
+    """Regular operations."""
+
+    URGENT = 2
+    """Interactive or time-critical operations."""
+
+
 class ResultDataStatus(IntEnum):
     """
     An enumeration representing different statuses of result data.
@@ -3,6 +3,7 @@ from typing import Any, Optional, Union
 from copy import deepcopy
 from pydantic import create_model
 from ..connections.lab_connection import LabConnection
+from ..connections.operation_future import OperationFuture
 import inspect
 
 
@@ -142,6 +143,23 @@ class RestProxyMixinReadOnly:
                 # Set the property on the class with the custom getter and setter
                 setattr(self.__class__, field_name, property(getter, setter))
 
+    def submit_call(self, method: str, args: dict = None, **kwargs) -> OperationFuture:
+        """
+        Call a method of the object on the lab engine without waiting for it to complete,
+        so that several objects can be kept busy at once.
+
+        Args:
+            method (str): The name of the method to execute.
+            args (dict, optional): Arguments to pass to the method. Defaults to None.
+            **kwargs: Scheduling options passed on to LabConnection.submit_on_object, e.g. priority or timeout.
+
+        Returns:
+            OperationFuture: A future resolved with the operation once it completed.
+        """
+        return self._lab_conn.submit_on_object(
+            self._endpoint, self.id, method, args or {}, **kwargs
+        )
+
     @classmethod
     def from_id(cls, object_id: UUID):
         """
@@ -1,4 +1,4 @@
-from threading import Lock
+from threading import RLock
 from typing import Any
 
 
@@ -11,7 +11,8 @@ class SingletonMeta(type):
 
     _instances = {}
 
-    _lock: Lock = Lock()
+    # re-entrant so that a singleton can create other singletons in its constructor
+    _lock: RLock = RLock()
 
     def __call__(self, *args: Any, **kwds: Any) -> Any:
         """
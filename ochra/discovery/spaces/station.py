@@ -38,11 +38,22 @@ class Station(Station, RestProxyMixinReadOnly):
         return self._lab_conn.get_object("robots", robot_identifier)
     
     
-    def lock(self):
-        """Lock the station to the this session."""
-        self._lab_conn.call_on_object(self._endpoint,self.id, "lock", args={"session_id":self._lab_conn._session_id})
-        
+    def lock(self, ttl: float = 60.0) -> float:
+        """Lock the station to this session, or renew the lock if this session holds it already.
+        The lock is released on its own if it is not renewed within ttl seconds.
+
+        Args:
+            ttl (float, optional): Duration of the lock in seconds. Defaults to 60.0.
 
-    def unlock(self):
-        """Unlock the station from the this session."""
-        self._lab_conn.call_on_object(self._endpoint,self.id, "unlock", args = {"session_id":self._lab_conn._session_id})
\ No newline at end of file
+        Returns:
+            float: The time the lock expires at, in seconds since the epoch.
+        """
+        return self._lab_conn.lock_station(self.id, ttl)
+
+    def unlock(self) -> bool:
+        """Unlock the station from this session.
+
+        Returns:
+            bool: True if the lock was released, False if this session did not hold it.
+        """
+        return self._lab_conn.unlock_station(self.id)
\ No newline at end of file
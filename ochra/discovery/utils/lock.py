@@ -1,18 +1,53 @@
 from contextlib import contextmanager
+from threading import Event, Thread
+import logging
+
+
+class _LeaseRenewer(Thread):
+    """
+    Renews the lock of a station every third of its ttl until stopped, so that a lock
+    held for longer than its ttl is not released under its holder.
+    """
+
+    def __init__(self, station, ttl: float):
+        super().__init__(name=f"lock-renewer-{station.id}", daemon=True)
+        self._logger = logging.getLogger(__name__)
+        self._station = station
+        self._ttl = ttl
+        self._stopped = Event()
+
+    def run(self):
+        while not self._stopped.wait(self._ttl / 3):
+            try:
+                self._station.lock(self._ttl)
+            except Exception as e:
+                # the next attempt may get through before the lock expires
+                self._logger.error(f"Renewing the lock of station {self._station.id} failed: {e}")
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
 
 @contextmanager
-def lock(station):
-    station.lock()
+def lock(station, ttl: float = 60.0):
+    station.lock(ttl)
+    renewer = _LeaseRenewer(station, ttl)
+    renewer.start()
     try:
         yield station
     finally:
+        renewer.stop()
         station.unlock()
 
 class Lock(object):
-    def __init__(self, station):
+    def __init__(self, station, ttl: float = 60.0):
         self.station = station
-        self.station.lock()
+        self.station.lock(ttl)
+        self._renewer = _LeaseRenewer(station, ttl)
+        self._renewer.start()
     def __enter__(self):
         return self.station
     def __exit__(self, exc_type, exc_value, traceback):
-        self.station.unlock()
\ No newline at end of file
+        self._renewer.stop()
+        self.station.unlock()
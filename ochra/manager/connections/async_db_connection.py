@@ -0,0 +1,252 @@
+from ochra.common.utils.singleton_meta import SingletonMeta
+from .db_connection import DbConnection
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Tuple
+import asyncio
+import logging
+
+
+class AsyncDbConnection(metaclass=SingletonMeta):
+    """
+    AsyncDbConnection is a singleton class that provides the interface of DbConnection as coroutines,
+    so that the async request handlers of the lab server never block their event loop on the database.
+
+    pymongo has no asyncio API in the version the lab depends on. Like Motor, every call is therefore
+    run on a dedicated pool of threads that share the connection pool of the synchronous client,
+    which waits for the database without holding the GIL. A single worker can thus have as many
+    database calls in flight as the pool has threads.
+    """
+
+    def __init__(self, max_workers: int = 32) -> None:
+        """
+        Initialize an AsyncDbConnection instance on top of the DbConnection of this process.
+
+        Args:
+            max_workers (int, optional): Maximum number of database calls in flight at once. Defaults to 32.
+        """
+        self._logger = logging.getLogger(__name__)
+        self._db_conn: DbConnection = DbConnection()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="db"
+        )
+
+    async def _run(self, method: Callable, *args: Any) -> Any:
+        """
+        Run a method of DbConnection on the thread pool.
+
+        Args:
+            method (Callable): The method.
+            *args (Any): Its arguments.
+
+        Returns:
+            Any: The return value of the method.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(method, *args))
+
+    async def create(self, db_data: Dict[str, Any], doc: Dict[str, Any]) -> Any:
+        """
+        Create a new document in the specified collection.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            doc (Dict[str, Any]): The document to be created.
+
+        Returns:
+            Any: The result of the create operation, typically the created document or its identifier.
+        """
+        return await self._run(self._db_conn.create, db_data, doc)
+
+    async def create_many(self, db_data: Dict[str, Any], docs: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Create several documents in the specified collection with a single bulk write.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            docs (List[Dict[str, Any]]): The documents to be created.
+
+        Returns:
+            List[Any]: The identifiers of the created documents.
+        """
+        return await self._run(self._db_conn.create_many, db_data, docs)
+
+    async def read(self, db_data: Dict[str, Any], property: str = None, file: bool = False) -> Any:
+        """
+        Read documents from the specified collection that match the query.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection and query parameters.
+            property (str, optional): Specific property to retrieve from the documents. Defaults to None.
+            file (bool, optional): Flag indicating if the read operation involves file data. Defaults to False.
+
+        Returns:
+            Any: The result of the read operation, which could be a document, a specific property, or file data.
+        """
+        return await self._run(self._db_conn.read, db_data, property, file)
+
+    async def read_properties(self, db_data: Dict[str, Any], properties: List[str]) -> Dict[str, Any] | None:
+        """
+        Read several properties of a document in a single round-trip.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection and the document id.
+            properties (List[str]): The properties to retrieve.
+
+        Returns:
+            Dict[str, Any] | None: The value of every requested property, None for properties the document does not have,
+                or None if the document does not exist.
+        """
+        return await self._run(self._db_conn.read_properties, db_data, properties)
+
+    async def update(
+        self,
+        db_data: Dict[str, Any],
+        update: Dict[str, Any],
+        file: bool = False,
+        return_document: bool = False,
+        returned_properties: List[str] = None,
+    ) -> Any:
+        """
+        Update the document with the given ID in the specified collection.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection and query parameters.
+            update (Dict[str, Any]): The update operations to be applied to the matching documents.
+            file (bool, optional): Flag indicating if the update operation involves file data. Defaults to False.
+            return_document (bool, optional): Return the updated property of the document in the same round-trip. Defaults to False.
+            returned_properties (List[str], optional): Further properties returned along with the updated one
+                if return_document is set. Defaults to None.
+
+        Returns:
+            Any: The result of the update operation, whose matched_count is 0 if the document does not exist.
+                If return_document is set, the document with only the returned properties instead, or None if it does not exist.
+        """
+        return await self._run(
+            self._db_conn.update, db_data, update, file, return_document, returned_properties
+        )
+
+    async def delete(self, db_data: Dict[str, Any]) -> Any:
+        """
+        Delete documents from the specified collection that match the query.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection and query parameters.
+
+        Returns:
+            Any: The result of the delete operation.
+        """
+        return await self._run(self._db_conn.delete, db_data)
+
+    async def find(self, db_data: Dict[str, Any], search_params: Dict[str, Any]) -> Any:
+        """
+        Find the first document in the specified collection that matches the search parameters.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            search_params (Dict[str, Any]): The search parameters to filter the documents.
+
+        Returns:
+            Any: The first matching document, or None if no document matched.
+        """
+        return await self._run(self._db_conn.find, db_data, search_params)
+
+    async def find_all(self, db_data: Dict[str, Any], search_params: Dict[str, Any]) -> Any:
+        """
+        Find all documents in the specified collection that match the search parameters.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            search_params (Dict[str, Any]): The search parameters to filter the documents.
+
+        Returns:
+            Any: The matching documents.
+        """
+        return await self._run(self._db_conn.find_all, db_data, search_params)
+
+    async def count(self, db_data: Dict[str, Any], search_params: Dict[str, Any]) -> int:
+        """
+        Count the documents in the specified collection that match the search parameters.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            search_params (Dict[str, Any]): The search parameters to filter the documents.
+
+        Returns:
+            int: The number of matching documents.
+        """
+        return await self._run(self._db_conn.count, db_data, search_params)
+
+    async def find_and_update(
+        self,
+        db_data: Dict[str, Any],
+        search_params: Dict[str, Any],
+        update: Dict[str, Any],
+        sort: List[Tuple[str, int]] = None,
+        increment: Dict[str, int] = None,
+        maximum: Dict[str, Any] = None,
+        upsert: bool = False,
+        keep_existing: Dict[str, Any] = None,
+    ) -> Any:
+        """
+        Atomically find the first document matching the search parameters and set the given properties on it.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            search_params (Dict[str, Any]): The search parameters to filter the documents.
+            update (Dict[str, Any]): The properties and values to set on the matching document.
+            sort (List[Tuple[str, int]], optional): Properties and directions (1 or -1) deciding which document
+                is picked when several match. Defaults to None.
+            increment (Dict[str, int], optional): Numeric properties and the amounts to add to them. Defaults to None.
+            maximum (Dict[str, Any], optional): Properties raised to the given values if they are lower. Defaults to None.
+            upsert (bool, optional): Insert a document built from the search parameters if none matches. Defaults to False.
+            keep_existing (Dict[str, Any], optional): Properties and values only set if the matching document has
+                no value for them other than None, e.g. when it is inserted by an upsert. Defaults to None.
+
+        Returns:
+            Any: The updated document, or None if no document matched.
+        """
+        return await self._run(
+            self._db_conn.find_and_update,
+            db_data, search_params, update, sort, increment, maximum, upsert, keep_existing,
+        )
+
+    async def upsert_many(
+        self,
+        db_data: Dict[str, Any],
+        key: str,
+        documents: List[Dict[str, Any]],
+        keep_existing: List[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Update or insert several documents, each matched by the value of a key property, with a single bulk write.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            key (str): The property identifying a document, e.g. its name.
+            documents (List[Dict[str, Any]]): The documents to be stored, each with a value for the key property.
+            keep_existing (List[str], optional): Properties only set if the stored document has no value for them
+                other than None, e.g. when it is inserted. Defaults to None.
+
+        Returns:
+            List[Dict[str, Any]]: The stored documents, in the order of the given ones.
+        """
+        return await self._run(
+            self._db_conn.upsert_many, db_data, key, documents, keep_existing
+        )
+
+    async def distinct(
+        self, db_data: Dict[str, Any], property: str, search_params: Dict[str, Any]
+    ) -> List[Any]:
+        """
+        Get the distinct values of a property across the documents matching the search parameters.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            property (str): The property to collect the values of.
+            search_params (Dict[str, Any]): The search parameters to filter the documents.
+
+        Returns:
+            List[Any]: The distinct values of the property.
+        """
+        return await self._run(self._db_conn.distinct, db_data, property, search_params)
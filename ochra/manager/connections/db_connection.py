@@ -1,7 +1,7 @@
 from ochra.common.utils.singleton_meta import SingletonMeta
 from .mongo_adapter import MongoAdapter
 import logging
-from typing_extensions import Self, Dict, Any
+from typing_extensions import Self, Dict, Any, List, Tuple
 
 
 class DbConnection(metaclass=SingletonMeta):
@@ -14,6 +14,61 @@ class DbConnection(metaclass=SingletonMeta):
         db_adapter (MongoAdapter): Adapter for MongoDB operations. This can be replaced with any other database adapter that follows the same interface.
     """
 
+    # collections looked up by id, the id is unique in each of them
+    ID_COLLECTIONS = [
+        "devices",
+        "robots",
+        "stations",
+        "operations",
+        "operation_results",
+        "workflows",
+        "fair_shares",
+        "schedulers",
+        "admissions",
+        "consumables",
+        "containers",
+        "inventories",
+        "reagents",
+    ]
+
+    # collections looked up by name
+    NAME_COLLECTIONS = [
+        "devices",
+        "robots",
+        "stations",
+        "consumables",
+        "containers",
+        "inventories",
+        "reagents",
+    ]
+
+    # secondary indexes of the queries issued by the scheduler and the lab service
+    INDEXES: Dict[str, List[List[Tuple[str, int]]]] = {
+        "operations": [
+            # queue of a station, in claim order
+            [("station_id", 1), ("status", 1), ("priority", -1), ("fair_tag", 1), ("queued_at", 1)],
+            # queue of a device pool
+            [("device_class", 1), ("status", 1)],
+            # queue limits of a caller
+            [("caller_id", 1), ("status", 1)],
+            [("status", 1), ("expires_at", 1)],
+            [("status", 1), ("end_timestamp", 1)],
+            [("dispatched_at", 1)],
+            # slots of stopped schedulers still to be handed back
+            [("holds_slots", 1)],
+            [("result", 1)],
+            [("entity_id", 1)],
+            [("workflow_id", 1)],
+            # held workflow steps reserving a station
+            [("planned_station_id", 1), ("status", 1)],
+        ],
+        "devices": [[("owner_station", 1), ("status", 1)], [("cls", 1)]],
+        "robots": [[("owner_station", 1), ("status", 1)], [("cls", 1)]],
+        "workflows": [[("status", 1)]],
+        # admission tickets counted against the queue limits
+        "admissions": [[("caller_id", 1), ("expires_at", 1)], [("expires_at", 1)]],
+    }
+
     def __init__(
         self,
         hostname: str = "127.0.0.1:27017",
@@ -30,6 +85,33 @@ class DbConnection(metaclass=SingletonMeta):
         self.db_adapter: MongoAdapter = MongoAdapter(hostname, db_name, self._logger)
         
 
+    def ensure_indexes(self) -> None:
+        """
+        Create the indexes of every collection that do not exist yet, so that lookups do not scan
+        whole collections as the lab history grows. Safe to call from every lab server worker.
+        Indexes that cannot be created, e.g. because existing documents violate uniqueness, are logged and skipped.
+        """
+        indexes = [(collection, [("id", 1)], True, None) for collection in self.ID_COLLECTIONS]
+        # objects are registered by name, a unique name lets concurrent registrations of the same object
+        # converge on a single document, while objects without a name are not indexed
+        indexes += [
+            (collection, [("name", 1)], True, {"name": {"$type": "string"}})
+            for collection in self.NAME_COLLECTIONS
+        ]
+        indexes += [
+            (collection, keys, False, None)
+            for collection, collection_indexes in self.INDEXES.items()
+            for keys in collection_indexes
+        ]
+        for collection, keys, unique, partial_filter in indexes:
+            try:
+                self.db_adapter.create_index(
+                    {"_collection": collection}, keys, unique=unique, partial_filter=partial_filter
+                )
+            except Exception as e:
+                self._logger.error(f"Could not create index {keys} on {collection}: {e}")
+        self._logger.info(f"Ensured {len(indexes)} indexes")
+
     def create(self, db_data: Dict[str, Any], doc: Dict[str, Any]) -> Any:
         """
         Create a new document in the specified collection.
@@ -44,6 +126,20 @@ class DbConnection(metaclass=SingletonMeta):
         self._logger.debug(f"Creating a document in collection: {db_data['_collection']}")
         return self.db_adapter.create(db_data, doc)
 
+    def create_many(self, db_data: Dict[str, Any], docs: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Create several documents in the specified collection with a single bulk write.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            docs (List[Dict[str, Any]]): The documents to be created.
+
+        Returns:
+            List[Any]: The identifiers of the created documents.
+        """
+        self._logger.debug(f"Creating {len(docs)} documents in collection: {db_data['_collection']}")
+        return self.db_adapter.create_many(db_data, docs)
+
     def read(self, db_data: Dict[str, Any], property: str = None, file: bool = False) -> Any:
         """
         Read documents from the specified collection that match the query.
@@ -59,20 +155,52 @@ class DbConnection(metaclass=SingletonMeta):
         self._logger.debug(f"Reading documents from collection: {db_data['_collection']}")
         return self.db_adapter.read(db_data, property, file=file)
 
-    def update(self, db_data: Dict[str, Any], update: Dict[str, Any], file: bool = False) -> Any:
+    def read_properties(self, db_data: Dict[str, Any], properties: List[str]) -> Dict[str, Any] | None:
+        """
+        Read several properties of a document in a single round-trip.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection and the document id.
+            properties (List[str]): The properties to retrieve.
+
+        Returns:
+            Dict[str, Any] | None: The value of every requested property, None for properties the document does not have,
+                or None if the document does not exist.
+        """
+        self._logger.debug(f"Reading {properties} from collection: {db_data['_collection']}")
+        return self.db_adapter.read_properties(db_data, properties)
+
+    def update(
+        self,
+        db_data: Dict[str, Any],
+        update: Dict[str, Any],
+        file: bool = False,
+        return_document: bool = False,
+        returned_properties: List[str] = None,
+    ) -> Any:
         """
-        Update documents in the specified collection that match the query.
+        Update the document with the given ID in the specified collection.
         
         Args:
             db_data (Dict[str, Any]): Dictionary containing database information, including the target collection and query parameters.
             update (Dict[str, Any]): The update operations to be applied to the matching documents.
             file (bool, optional): Flag indicating if the update operation involves file data. Defaults to False.
+            return_document (bool, optional): Return the updated property of the document in the same round-trip. Defaults to False.
+            returned_properties (List[str], optional): Further properties returned along with the updated one
+                if return_document is set. Defaults to None.
 
         Returns:
-            Any: The result of the update operation, typically the updated document or a status indicator.
+            Any: The result of the update operation, whose matched_count is 0 if the document does not exist.
+                If return_document is set, the document with only the returned properties instead, or None if it does not exist.
         """
         self._logger.debug(f"Updating documents in collection: {db_data['_collection']}")
-        return self.db_adapter.update(db_data, update, file=file)
+        return self.db_adapter.update(
+            db_data,
+            update,
+            file=file,
+            return_document=return_document,
+            returned_properties=returned_properties,
+        )
 
     def delete(self, db_data: Dict[str, Any]) -> Any:
         """
@@ -114,3 +242,92 @@ class DbConnection(metaclass=SingletonMeta):
         """
         self._logger.debug(f"Finding all documents in collection: {db_data['_collection']}")
         return self.db_adapter.find_all(db_data, search_params)
+
+    def count(self, db_data: Dict[str, Any], search_params: Dict[str, Any]) -> int:
+        """
+        Count the documents in the specified collection that match the search parameters.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            search_params (Dict[str, Any]): The search parameters to filter the documents.
+
+        Returns:
+            int: The number of matching documents.
+        """
+        self._logger.debug(f"Counting documents in collection: {db_data['_collection']}")
+        return self.db_adapter.count(db_data, search_params)
+
+    def find_and_update(
+        self,
+        db_data: Dict[str, Any],
+        search_params: Dict[str, Any],
+        update: Dict[str, Any],
+        sort: List[Tuple[str, int]] = None,
+        increment: Dict[str, int] = None,
+        maximum: Dict[str, Any] = None,
+        upsert: bool = False,
+        keep_existing: Dict[str, Any] = None,
+    ) -> Any:
+        """
+        Atomically find the first document matching the search parameters and set the given properties on it.
+        Only one of several concurrent callers can claim a given document this way.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            search_params (Dict[str, Any]): The search parameters to filter the documents.
+            update (Dict[str, Any]): The properties and values to set on the matching document.
+            sort (List[Tuple[str, int]], optional): Properties and directions (1 or -1) deciding which document
+                is picked when several match. Defaults to None.
+            increment (Dict[str, int], optional): Numeric properties and the amounts to add to them. Defaults to None.
+            maximum (Dict[str, Any], optional): Properties raised to the given values if they are lower. Defaults to None.
+            upsert (bool, optional): Insert a document built from the search parameters if none matches. Defaults to False.
+            keep_existing (Dict[str, Any], optional): Properties and values only set if the matching document has
+                no value for them other than None, e.g. when it is inserted by an upsert. Defaults to None.
+
+        Returns:
+            Any: The updated document, or None if no document matched.
+        """
+        self._logger.debug(f"Finding and updating a document in collection: {db_data['_collection']}")
+        return self.db_adapter.find_and_update(
+            db_data, search_params, update, sort, increment, maximum, upsert, keep_existing
+        )
+
+    def upsert_many(
+        self,
+        db_data: Dict[str, Any],
+        key: str,
+        documents: List[Dict[str, Any]],
+        keep_existing: List[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Update or insert several documents, each matched by the value of a key property, with a single bulk write.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            key (str): The property identifying a document, e.g. its name.
+            documents (List[Dict[str, Any]]): The documents to be stored, each with a value for the key property.
+            keep_existing (List[str], optional): Properties only set if the stored document has no value for them
+                other than None, e.g. when it is inserted. Defaults to None.
+
+        Returns:
+            List[Dict[str, Any]]: The stored documents, in the order of the given ones.
+        """
+        self._logger.debug(f"Upserting {len(documents)} documents in collection: {db_data['_collection']}")
+        return self.db_adapter.upsert_many(db_data, key, documents, keep_existing)
+
+    def distinct(
+        self, db_data: Dict[str, Any], property: str, search_params: Dict[str, Any]
+    ) -> List[Any]:
+        """
+        Get the distinct values of a property across the documents matching the search parameters.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            property (str): The property to collect the values of.
+            search_params (Dict[str, Any]): The search parameters to filter the documents.
+
+        Returns:
+            List[Any]: The distinct values of the property.
+        """
+        self._logger.debug(f"Finding distinct {property} values in collection: {db_data['_collection']}")
+        return self.db_adapter.distinct(db_data, property, search_params)
@@ -1,5 +1,6 @@
 from mongoengine import connect, Document
-from typing import Any, Dict
+from pymongo import ReturnDocument, UpdateOne
+from typing import Any, Dict, List, Tuple
 import logging
 import json
 import gridfs
@@ -96,6 +97,21 @@ class MongoAdapter:
         else:
             return collection.insert_one(document).inserted_id
 
+    def create_many(self, db_data: Dict[str, Any], documents: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Create several documents in the specified collection with a single bulk write.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            documents (List[Dict[str, Any]]): The documents to be created, inserted in order.
+
+        Returns:
+            List[Any]: The identifiers of the created documents.
+        """
+        collection = db_data["_collection"]
+        collection = self._db_client[self._db_name][collection]
+        return collection.insert_many(documents, ordered=True).inserted_ids
+
     def read(self, db_data: Dict[str, Any], property: str, file: bool = False) -> Any:
         """
         Read documents from the specified collection that match the query.
@@ -112,7 +128,9 @@ class MongoAdapter:
         collection = db_data["_collection"]
         collection = self._db_client[self._db_name][collection]
         query = {"id": object_id}
-        result = collection.find_one(query)
+        # only transfer the requested property, documents such as stations grow large
+        projection = {property: 1, "_id": 0} if property else None
+        result = collection.find_one(query, projection)
 
         if property and result is not None:
             value = result[property]
@@ -123,17 +141,48 @@ class MongoAdapter:
         else:
             return result
 
-    def update(self, db_data: Dict[str, Any], update: Dict[str, Any], file: bool = False) -> Any:
+    def read_properties(self, db_data: Dict[str, Any], properties: List[str]) -> Dict[str, Any] | None:
         """
-        Update documents in the specified collection that match the query.
-        
+        Read several properties of a document in a single round-trip, transferring only those properties.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection and the document id.
+            properties (List[str]): The properties to retrieve.
+
+        Returns:
+            Dict[str, Any] | None: The value of every requested property, None for properties the document does not have,
+                or None if the document does not exist.
+        """
+        collection = self._db_client[self._db_name][db_data["_collection"]]
+        projection = {property: 1 for property in properties}
+        projection["_id"] = 0
+        result = collection.find_one({"id": db_data["id"]}, projection)
+        if result is None:
+            return None
+        return {property: result.get(property) for property in properties}
+
+    def update(
+        self,
+        db_data: Dict[str, Any],
+        update: Dict[str, Any],
+        file: bool = False,
+        return_document: bool = False,
+        returned_properties: List[str] = None,
+    ) -> Any:
+        """
+        Update the document with the given ID in the specified collection.
+
         Args:
             db_data (Dict[str, Any]): Dictionary containing database information, including the target collection and query parameters.
             update (Dict[str, Any]): The update operations to be applied to the matching documents.
             file (bool, optional): Flag indicating if the update operation involves file data. Defaults to False.
+            return_document (bool, optional): Return the updated property of the document in the same round-trip. Defaults to False.
+            returned_properties (List[str], optional): Further properties returned along with the updated one
+                if return_document is set. Defaults to None.
 
         Returns:
-            Any: The result of the update operation, typically the updated document or a status indicator.
+            Any: The result of the update operation, whose matched_count is 0 if the document does not exist.
+                If return_document is set, the document with only the returned properties instead, or None if it does not exist.
         """
         collection = db_data["_collection"]
         object_id = db_data["id"]
@@ -141,6 +190,7 @@ class MongoAdapter:
         if file:
             file_id = self.fs.put(update["result_data"], encoding="UTF8")
             key = list(update.keys())[0]
+            property_name = key
             update = {"$set": {key: file_id}}
         else:
             property_name = update["property"]
@@ -173,7 +223,16 @@ class MongoAdapter:
 
         query = {"id": object_id}
 
-        return collection.update_many(query, update)
+        if return_document:
+            projection = {property: 1 for property in returned_properties or []}
+            projection.update({property_name: 1, "_id": 0})
+            return collection.find_one_and_update(
+                query,
+                update,
+                projection=projection,
+                return_document=ReturnDocument.AFTER,
+            )
+        return collection.update_one(query, update)
 
     def delete(self, db_data: Dict[str, Any]) -> Any:
         """
@@ -226,3 +285,177 @@ class MongoAdapter:
             result.pop("_id")
             results_list.append(result)
         return results_list
+
+    def count(self, db_data: Dict[str, Any], search_params: Dict[str, Any]) -> int:
+        """
+        Count the documents in the specified collection that match the search parameters.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            search_params (Dict[str, Any]): The search parameters to filter the documents.
+
+        Returns:
+            int: The number of matching documents.
+        """
+        collection = db_data["_collection"]
+        collection = self._db_client[self._db_name][collection]
+        return collection.count_documents(search_params)
+
+    def find_and_update(
+        self,
+        db_data: Dict[str, Any],
+        search_params: Dict[str, Any],
+        update: Dict[str, Any],
+        sort: List[Tuple[str, int]] = None,
+        increment: Dict[str, int] = None,
+        maximum: Dict[str, Any] = None,
+        upsert: bool = False,
+        keep_existing: Dict[str, Any] = None,
+    ) -> Any:
+        """
+        Atomically find the first document matching the search parameters and set the given properties on it.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            search_params (Dict[str, Any]): The search parameters to filter the documents.
+            update (Dict[str, Any]): The properties and values to set on the matching document.
+            sort (List[Tuple[str, int]], optional): Properties and directions (1 or -1) deciding which document
+                is picked when several match. Defaults to None.
+            increment (Dict[str, int], optional): Numeric properties and the amounts to add to them. Defaults to None.
+            maximum (Dict[str, Any], optional): Properties raised to the given values if they are lower. Defaults to None.
+            upsert (bool, optional): Insert a document built from the search parameters if none matches. Defaults to False.
+            keep_existing (Dict[str, Any], optional): Properties and values only set if the matching document has
+                no value for them other than None, e.g. when it is inserted by an upsert. Defaults to None.
+
+        Returns:
+            Any: The updated document, or None if no document matched.
+        """
+        collection = self._db_client[self._db_name][db_data["_collection"]]
+        if keep_existing:
+            # the stored values are only known inside the update, which takes an aggregation pipeline
+            fields = self._pipeline_fields(update or {}, keep_existing)
+            for k, v in (increment or {}).items():
+                fields[k] = {"$add": [{"$ifNull": [f"${k}", 0]}, v]}
+            for k, v in (maximum or {}).items():
+                fields[k] = {"$max": [f"${k}", {"$literal": v}]}
+            update_doc = [{"$set": fields}]
+        else:
+            update_doc = {}
+            if update:
+                update_doc["$set"] = update
+            if increment:
+                update_doc["$inc"] = increment
+            if maximum:
+                update_doc["$max"] = maximum
+        result = collection.find_one_and_update(
+            search_params,
+            update_doc,
+            sort=sort,
+            upsert=upsert,
+            return_document=ReturnDocument.AFTER,
+        )
+        if result is not None:
+            result.pop("_id")
+        return result
+
+    def upsert_many(
+        self,
+        db_data: Dict[str, Any],
+        key: str,
+        documents: List[Dict[str, Any]],
+        keep_existing: List[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Update or insert several documents, each matched by the value of a key property, with a single bulk write.
+        Every update is atomic, so there is no point at which a replaced document does not exist.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            key (str): The property identifying a document, e.g. its name.
+            documents (List[Dict[str, Any]]): The documents to be stored, each with a value for the key property.
+            keep_existing (List[str], optional): Properties only set if the stored document has no value for them
+                other than None, e.g. when it is inserted. Defaults to None.
+
+        Returns:
+            List[Dict[str, Any]]: The stored documents, in the order of the given ones.
+        """
+        collection = self._db_client[self._db_name][db_data["_collection"]]
+        keep_existing = keep_existing or []
+        requests = []
+        for document in documents:
+            kept = {k: v for k, v in document.items() if k in keep_existing}
+            if kept:
+                update = {k: v for k, v in document.items() if k not in keep_existing}
+                update_doc = [{"$set": self._pipeline_fields(update, kept)}]
+            else:
+                update_doc = {"$set": document}
+            requests.append(UpdateOne({key: document[key]}, update_doc, upsert=True))
+        collection.bulk_write(requests, ordered=False)
+
+        stored = collection.find(
+            {key: {"$in": [document[key] for document in documents]}}, {"_id": 0}
+        )
+        by_key = {doc[key]: doc for doc in stored}
+        return [by_key[document[key]] for document in documents]
+
+    @staticmethod
+    def _pipeline_fields(update: Dict[str, Any], keep_existing: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the fields of a $set stage of an update pipeline, which sets properties to the given values
+        but keeps the stored value of others unless it is missing or None.
+
+        Args:
+            update (Dict[str, Any]): The properties and values to set.
+            keep_existing (Dict[str, Any]): The properties and values to set only where none is stored.
+
+        Returns:
+            Dict[str, Any]: The fields of the $set stage.
+        """
+        # values are wrapped as literals, strings starting with $ would otherwise be read as field paths
+        fields = {k: {"$literal": v} for k, v in update.items()}
+        for k, v in keep_existing.items():
+            fields[k] = {"$ifNull": [f"${k}", {"$literal": v}]}
+        return fields
+
+    def create_index(
+        self,
+        db_data: Dict[str, Any],
+        keys: List[Tuple[str, int]],
+        unique: bool = False,
+        partial_filter: Dict[str, Any] = None,
+    ) -> str:
+        """
+        Create an index on the specified collection, unless it exists already.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            keys (List[Tuple[str, int]]): The indexed properties and their directions (1 or -1).
+            unique (bool, optional): Reject documents with the same values for the indexed properties. Defaults to False.
+            partial_filter (Dict[str, Any], optional): Only index the documents matching this filter. Defaults to None.
+
+        Returns:
+            str: The name of the index.
+        """
+        collection = self._db_client[self._db_name][db_data["_collection"]]
+        if partial_filter:
+            return collection.create_index(
+                keys, unique=unique, partialFilterExpression=partial_filter
+            )
+        return collection.create_index(keys, unique=unique)
+
+    def distinct(
+        self, db_data: Dict[str, Any], property: str, search_params: Dict[str, Any]
+    ) -> List[Any]:
+        """
+        Get the distinct values of a property across the documents matching the search parameters.
+
+        Args:
+            db_data (Dict[str, Any]): Dictionary containing database information, including the target collection.
+            property (str): The property to collect the values of.
+            search_params (Dict[str, Any]): The search parameters to filter the documents.
+
+        Returns:
+            List[Any]: The distinct values of the property.
+        """
+        collection = self._db_client[self._db_name][db_data["_collection"]]
+        return collection.distinct(property, search_params)
@@ -1,5 +1,6 @@
 from ochra.common.connections.rest_adapter import RestAdapter, Result
 from ochra.common.equipment.operation import Operation
+from typing import Any, Dict, List
 import logging
 
 
@@ -30,7 +31,46 @@ class StationConnection:
         Returns:
             Result: The response from the remote station after executing the operation.
         """
-        data = {
+        # Not possible to use op.model_dump(mode="json") because there are no optional
+        # fields and thus None is not an allowed value for them
+        return self.rest_adapter.post(endpoint=endpoint, data=self._serialize_op(op))
+
+    def execute_ops(self, ops: List[Operation], endpoint: str) -> Result:
+        """
+        Execute several operations, in order, on the remote station with a single request.
+
+        Args:
+            ops (List[Operation]): The operations to be executed.
+            endpoint (str): The API endpoint for executing a batch of operations.
+        Returns:
+            Result: The response from the remote station, reporting the status of every operation.
+        """
+        return self.rest_adapter.post(
+            endpoint=endpoint, data=[self._serialize_op(op) for op in ops]
+        )
+
+    def cancel_op(self, op_id: str) -> Result:
+        """
+        Ask the remote station to cancel an operation. The station signals the running method,
+        or rejects the operation as soon as it arrives if it has not arrived yet.
+
+        Args:
+            op_id (str): The ID of the operation to cancel.
+        Returns:
+            Result: The response from the remote station.
+        """
+        return self.rest_adapter.post(endpoint=f"cancel_op/{op_id}")
+
+    def _serialize_op(self, op: Operation) -> Dict[str, Any]:
+        """
+        Serialize an operation into the request body expected by the station.
+
+        Args:
+            op (Operation): The operation to serialize.
+        Returns:
+            Dict[str, Any]: The serialized operation.
+        """
+        return {
             "id": str(op.id),
             "collection": op.collection,
             "module_path": op.module_path,
@@ -39,8 +79,5 @@ class StationConnection:
             "caller_id": str(op.caller_id),
             "method": op.method,
             "args": op.args,
+            "timeout": op.timeout,
         }
-
-        # Not possible to use op.model_dump(mode="json") because there are no optional
-        # fields and thus None is not an allowed value for them
-        return self.rest_adapter.post(endpoint=endpoint, data=data)
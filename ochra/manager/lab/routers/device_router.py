@@ -1,6 +1,7 @@
 import logging
 from fastapi import APIRouter
-from typing import Any, Dict
+from fastapi.concurrency import run_in_threadpool
+from typing import Any, Dict, Optional
 from ochra.common.connections.api_models import (
     ObjectCallRequest,
     ObjectPropertyPatchRequest,
@@ -29,6 +30,7 @@ class DeviceRouter(APIRouter):
         self.get("/{identifier}/property")(self.get_device_property)
         self.patch("/{identifier}/property")(self.modify_device_property)
         self.post("/{identifier}/method")(self.call_device)
+        self.post("/classes/{device_class}/method")(self.call_device_class)
         self.get("/")(self.get_device)
         self.delete("/{identifier}/")(self.delete_device)
 
@@ -44,7 +46,7 @@ class DeviceRouter(APIRouter):
         """
         # TODO: we need to assign the object to the station somehow
         self._logger.debug(f"Constructing device with args: {args}")
-        return self.lab_service.construct_object(args, COLLECTION)
+        return await self.lab_service.construct_object(args, COLLECTION)
 
     async def get_device_property(
         self, identifier: str, args: ObjectPropertyGetRequest
@@ -62,11 +64,11 @@ class DeviceRouter(APIRouter):
         self._logger.debug(
             f"Getting property for device {identifier} with args: {args}"
         )
-        return self.lab_service.get_object_property(identifier, COLLECTION, args)
+        return await self.lab_service.get_object_property(identifier, COLLECTION, args)
 
     async def modify_device_property(
         self, identifier: str, args: ObjectPropertyPatchRequest
-    ) -> bool:
+    ) -> Any:
         """
         Modify properties of a device.
 
@@ -75,12 +77,22 @@ class DeviceRouter(APIRouter):
             args (ObjectPropertyPatchRequest): The properties to modify.
 
         Returns:
-            bool: True if the modification was successful, False otherwise.
+            Any: True if the modification was successful, or the new value of the property if requested.
         """
         self._logger.debug(
             f"Modifying property for device {identifier} with args: {args}"
         )
-        return self.lab_service.patch_object(identifier, COLLECTION, args)
+        if args.property != "status":
+            return await self.lab_service.patch_object(identifier, COLLECTION, args)
+
+        # a device becoming idle may unblock queued operations on its station,
+        # which is read in the same update
+        patched, read = await self.lab_service.patch_and_read_object(
+            identifier, COLLECTION, args, ["owner_station"]
+        )
+        if read["owner_station"] is not None:
+            self.scheduler.notify(read["owner_station"])
+        return patched
 
     async def call_device(
         self, identifier: str, args: ObjectCallRequest
@@ -95,9 +107,44 @@ class DeviceRouter(APIRouter):
         Returns:
             Dict[str, Any]: A dict representing the Operation model in JSON format.
         """
-        op = self.lab_service.call_on_object(identifier, "device", args)
-        self._logger.debug(f"Calling device {identifier} with args: {args}")
-        self.scheduler.add_operation(op)
+        ticket = await run_in_threadpool(self.scheduler.admit, args.caller_id)
+        try:
+            op = await self.lab_service.call_on_object(identifier, "device", args)
+            self._logger.debug(f"Calling device {identifier} with args: {args}")
+            await run_in_threadpool(self.scheduler.add_operation, op)
+        finally:
+            await run_in_threadpool(self.scheduler.release_admission, ticket)
+        return op.get_base_model().model_dump(mode="json")
+
+    async def call_device_class(
+        self,
+        device_class: str,
+        args: ObjectCallRequest,
+        module_path: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Call a method on whichever device of the given class becomes available first.
+
+        Args:
+            device_class (str): The class name of the devices.
+            args (ObjectCallRequest): The method call parameters.
+            module_path (Optional[str], optional): The module of the devices, any if None. Defaults to None.
+
+        Returns:
+            Dict[str, Any]: A dict representing the Operation model in JSON format.
+        """
+        ticket = await run_in_threadpool(self.scheduler.admit, args.caller_id)
+        try:
+            op = await self.lab_service.call_on_device_class(device_class, args, module_path)
+            self._logger.debug(f"Calling device class {device_class} with args: {args}")
+            await run_in_threadpool(
+                self.scheduler.add_operation,
+                op,
+                device_class=device_class,
+                device_module_path=module_path,
+            )
+        finally:
+            await run_in_threadpool(self.scheduler.release_admission, ticket)
         return op.get_base_model().model_dump(mode="json")
 
     async def get_device(self, identifier: str) -> DataModel:
@@ -111,9 +158,9 @@ class DeviceRouter(APIRouter):
             DataModel: The device data model.
         """
         if is_valid_uuid(identifier):
-            device_obj = self.lab_service.get_object_by_id(identifier, COLLECTION)
+            device_obj = await self.lab_service.get_object_by_id(identifier, COLLECTION)
         else:
-            device_obj = self.lab_service.get_object_by_name(identifier, COLLECTION)
+            device_obj = await self.lab_service.get_object_by_name(identifier, COLLECTION)
         self._logger.debug(f"Getting device with identifier: {identifier}")
         return convert_to_data_model(device_obj)
 
@@ -128,5 +175,5 @@ class DeviceRouter(APIRouter):
             Dict: A message indicating the result of the deletion.
         """
         self._logger.debug(f"Deleting device with identifier: {identifier}")
-        self.lab_service.delete_object(identifier, COLLECTION)
+        await self.lab_service.delete_object(identifier, COLLECTION)
         return {"message": "Device deleted successfully"}
@@ -1,11 +1,21 @@
 import logging
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from typing import List, Type
+from ochra.common.connections.api_models import BulkConstructionRequest
 from ..utils.lab_service import LabService
 from ochra.common.base.data_model import DataModel
 from ochra.common.utils.misc import is_valid_uuid, convert_to_data_model
 
 COLLECTIONS = ["stations", "robots"]
+# collections whose objects can be registered in bulk
+BULK_COLLECTIONS = [
+    "devices",
+    "robots",
+    "consumables",
+    "containers",
+    "inventories",
+    "reagents",
+]
 
 
 class LabRouter(APIRouter):
@@ -20,6 +30,7 @@ class LabRouter(APIRouter):
         self.lab_service = LabService()
         self.get("/{object_type}/")(self.get_lab_object)
         self.get("/{object_type}/all")(self.get_lab_objects)
+        self.put("/{object_type}/bulk")(self.construct_lab_objects)
 
     async def get_lab_object(self, object_type: str, identifier: str) -> DataModel:
         """
@@ -37,9 +48,9 @@ class LabRouter(APIRouter):
         """
         collection = object_type if object_type in COLLECTIONS else None
         if is_valid_uuid(identifier):
-            lab_obj = self.lab_service.get_object_by_id(identifier, collection)
+            lab_obj = await self.lab_service.get_object_by_id(identifier, collection)
         else:
-            lab_obj = self.lab_service.get_object_by_name(identifier, collection)
+            lab_obj = await self.lab_service.get_object_by_name(identifier, collection)
         self._logger.debug(f"Getting lab object with identifier: {identifier}")
         return convert_to_data_model(lab_obj)
 
@@ -57,6 +68,29 @@ class LabRouter(APIRouter):
             HTTPException: If no lab objects are found (404).
         """
         collection = object_type if object_type in COLLECTIONS else None
-        lab_objs = self.lab_service.get_all_objects(collection)
+        lab_objs = await self.lab_service.get_all_objects(collection)
         self._logger.debug(f"Getting all lab objects of type: {object_type}")
         return [convert_to_data_model(lab_obj) for lab_obj in lab_objs]
+
+    async def construct_lab_objects(
+        self, object_type: str, args: BulkConstructionRequest
+    ) -> List[str]:
+        """
+        Register many lab objects of a specific type at once, e.g. all devices of a station.
+
+        Args:
+            object_type (str): The type of the lab objects (e.g., "devices").
+            args (BulkConstructionRequest): The objects to construct.
+
+        Returns:
+            List[str]: The IDs of the constructed objects, in the order of the request.
+
+        Raises:
+            HTTPException: If lab objects of the type cannot be registered in bulk (404).
+        """
+        if object_type not in BULK_COLLECTIONS:
+            raise HTTPException(
+                status_code=404, detail=f"cannot construct {object_type} in bulk"
+            )
+        self._logger.debug(f"Constructing {len(args.objects_json)} lab objects of type: {object_type}")
+        return await self.lab_service.construct_objects(args, object_type)
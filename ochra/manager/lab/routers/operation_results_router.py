@@ -46,7 +46,7 @@ class OperationResultRouter(APIRouter):
             str: The ID of the constructed operation result.
         """
         self._logger.debug(f"Constructing operation result with args: {args}")
-        return self.lab_service.construct_object(args, COLLECTION)
+        return await self.lab_service.construct_object(args, COLLECTION)
 
     async def get_property(
         self, identifier: str, args: ObjectPropertyGetRequest
@@ -64,11 +64,11 @@ class OperationResultRouter(APIRouter):
         self._logger.debug(
             f"Getting property for operation result {identifier} with args: {args}"
         )
-        return self.lab_service.get_object_property(identifier, COLLECTION, args)
+        return await self.lab_service.get_object_property(identifier, COLLECTION, args)
 
     async def modify_property(
         self, identifier: str, args: ObjectPropertyPatchRequest
-    ) -> bool:
+    ) -> Any:
         """
         Modify properties of an operation result.
 
@@ -77,12 +77,12 @@ class OperationResultRouter(APIRouter):
             args (ObjectPropertyPatchRequest): The properties to modify.
 
         Returns:
-            bool: True if the modification was successful, False otherwise.
+            Any: True if the modification was successful, or the new value of the property if requested.
         """
         self._logger.debug(
             f"Modifying property for operation result {identifier} with args: {args}"
         )
-        return self.lab_service.patch_object(identifier, COLLECTION, args)
+        return await self.lab_service.patch_object(identifier, COLLECTION, args)
 
     async def get_result(self, identifier: str) -> DataModel:
         """
@@ -95,9 +95,9 @@ class OperationResultRouter(APIRouter):
             DataModel: The operation result data model.
         """
         if is_valid_uuid(identifier):
-            result_obj = self.lab_service.get_object_by_id(identifier, COLLECTION)
+            result_obj = await self.lab_service.get_object_by_id(identifier, COLLECTION)
         else:
-            result_obj = self.lab_service.get_object_by_name(identifier, COLLECTION)
+            result_obj = await self.lab_service.get_object_by_name(identifier, COLLECTION)
         self._logger.debug(f"Getting result for operation {identifier}")
         return convert_to_data_model(result_obj)
 
@@ -114,7 +114,7 @@ class OperationResultRouter(APIRouter):
         Returns:
             FileResponse: The file response containing the data.
         """
-        value, delete = self.lab_service.get_file(identifier, COLLECTION)
+        value, delete = await self.lab_service.get_file(identifier, COLLECTION)
         response = FileResponse(value)
         if delete:
             background_tasks.add_task(remove, value)
@@ -131,4 +131,4 @@ class OperationResultRouter(APIRouter):
         """
         result_data = await file.read()
         self._logger.debug(f"Putting data for operation result {identifier}")
-        return self.lab_service.patch_file(identifier, COLLECTION, result_data)
+        return await self.lab_service.patch_file(identifier, COLLECTION, result_data)
@@ -1,32 +1,47 @@
 import logging
-from fastapi import APIRouter
-from typing import Any
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from typing import Any, Dict, List, Optional
 from ochra.common.connections.api_models import (
+    BulkCallRequest,
     ObjectPropertyPatchRequest,
     ObjectConstructionRequest,
     ObjectPropertyGetRequest,
 )
 from ..utils.lab_service import LabService
+from ..utils.completion_notifier import CompletionNotifier
 from ochra.common.base.data_model import DataModel
+from ochra.common.utils.enum import OperationStatus
 from ochra.common.utils.misc import is_valid_uuid, convert_to_data_model
 
 COLLECTION = "operations"
 
+# upper bound on a single long-poll so that proxies and clients do not time out the request
+MAX_WAIT_TIMEOUT = 60.0
+
 
 class OperationRouter(APIRouter):
     """
     OperationRouter is responsible for handling operation-related API endpoints.
     """
 
-    def __init__(self):
+    def __init__(self, scheduler):
         prefix = f"/{COLLECTION}"
         super().__init__(prefix=prefix)
         self._logger = logging.getLogger(__name__)
+        self.scheduler = scheduler
         self.lab_service = LabService()
+        self.completions = CompletionNotifier()
         self.put("/")(self.construct_op)
         self.get("/{identifier}/property")(self.get_op_property)
         self.patch("/{identifier}/property")(self.modify_op_property)
         self.get("/")(self.get_op)
+        self.get("/queue/stats")(self.get_queue_stats)
+        self.get("/queue/station_cache")(self.get_station_cache_stats)
+        self.get("/durations")(self.get_duration_estimates)
+        self.post("/bulk")(self.bulk_call)
+        self.post("/{identifier}/cancel")(self.cancel_op)
+        self.get("/{identifier}/wait")(self.wait_op)
 
     async def construct_op(self, args: ObjectConstructionRequest) -> str:
         """
@@ -40,7 +55,78 @@ class OperationRouter(APIRouter):
         """
         # TODO: we need to assign the object to the station somehow
         self._logger.debug(f"Constructing operation with args: {args}")
-        return self.lab_service.construct_object(args, COLLECTION)
+        return await self.lab_service.construct_object(args, COLLECTION)
+
+    async def bulk_call(self, args: BulkCallRequest) -> List[str]:
+        """
+        Submit many method calls at once, e.g. a parametric sweep over a plate.
+        All operations are stored and queued with a single bulk write.
+
+        Args:
+            args (BulkCallRequest): The calls, or the sweep and its argument sets.
+
+        Returns:
+            List[str]: The IDs of the created operations, in submission order.
+        """
+        calls = self.lab_service.expand_bulk_call(args)
+        ticket = await run_in_threadpool(self.scheduler.admit, args.caller_id, len(calls))
+        try:
+            self._logger.debug(f"Submitting {len(calls)} operations for {args.caller_id}")
+            operations = await run_in_threadpool(
+                self.lab_service.create_operations, calls, args.caller_id
+            )
+            await run_in_threadpool(
+                self.scheduler.add_operations,
+                operations,
+                [
+                    (call.device_class, call.module_path) if call.entity_id is None else None
+                    for call in calls
+                ],
+            )
+        finally:
+            await run_in_threadpool(self.scheduler.release_admission, ticket)
+        return [str(op.id) for op in operations]
+
+    async def cancel_op(self, identifier: str) -> bool:
+        """
+        Cancel an operation, whether it is queued or running.
+
+        Args:
+            identifier (str): The ID of the operation.
+
+        Returns:
+            bool: True if the operation was cancelled or its station was asked to, False if it had already completed.
+        """
+        self._logger.debug(f"Cancelling operation {identifier}")
+        return await run_in_threadpool(self.scheduler.cancel_operation, identifier)
+
+    async def wait_op(self, identifier: str, timeout: float = 30.0) -> Dict[str, Any]:
+        """
+        Wait until an operation completed, returning as soon as it does or once the timeout passed.
+
+        Args:
+            identifier (str): The ID of the operation.
+            timeout (float, optional): Maximum time to wait in seconds, capped at MAX_WAIT_TIMEOUT. Defaults to 30.0.
+
+        Returns:
+            Dict[str, Any]: The ID and status of the operation, and the ID of its result once completed.
+
+        Raises:
+            HTTPException: If the operation does not exist.
+        """
+        self._logger.debug(f"Waiting for operation {identifier} for up to {timeout}s")
+        status = await self.completions.wait(
+            identifier, min(max(timeout, 0.0), MAX_WAIT_TIMEOUT)
+        )
+        if status is None:
+            raise HTTPException(status_code=404, detail=f"operation {identifier} not found")
+
+        result = None
+        if status == OperationStatus.COMPLETED:
+            result = await self.lab_service.get_object_property(
+                identifier, COLLECTION, ObjectPropertyGetRequest(property="result")
+            )
+        return {"id": identifier, "status": status, "result": result}
 
     async def get_op_property(self, identifier: str, args: ObjectPropertyGetRequest) -> Any:
         """
@@ -56,11 +142,11 @@ class OperationRouter(APIRouter):
         self._logger.debug(
             f"Getting property for operation {identifier} with args: {args}"
         )
-        return self.lab_service.get_object_property(identifier, COLLECTION, args)
+        return await self.lab_service.get_object_property(identifier, COLLECTION, args)
 
     async def modify_op_property(
         self, identifier: str, args: ObjectPropertyPatchRequest
-    ) -> bool:
+    ) -> Any:
         """
         Modify properties of an operation.
 
@@ -69,12 +155,17 @@ class OperationRouter(APIRouter):
             args (ObjectPropertyPatchRequest): The properties to modify.
 
         Returns:
-            bool: True if the modification was successful, False otherwise.
+            Any: True if the modification was successful, or the new value of the property if requested.
         """
         self._logger.debug(
             f"Modifying property for operation {identifier} with args: {args}"
         )
-        return self.lab_service.patch_object(identifier, COLLECTION, args)
+        patched = await self.lab_service.patch_object(identifier, COLLECTION, args)
+
+        # stations complete their operations by patching the status
+        if args.property == "status" and args.property_value == OperationStatus.COMPLETED:
+            self.completions.notify(identifier)
+        return patched
 
     async def get_op(self, identifier: str) -> DataModel:
         """
@@ -87,9 +178,44 @@ class OperationRouter(APIRouter):
             DataModel: The operation data model.
         """
         if is_valid_uuid(identifier):
-            op_obj = self.lab_service.get_object_by_id(identifier, COLLECTION)
+            op_obj = await self.lab_service.get_object_by_id(identifier, COLLECTION)
         else:
-            op_obj = self.lab_service.get_object_by_name(identifier, COLLECTION)
+            op_obj = await self.lab_service.get_object_by_name(identifier, COLLECTION)
 
         self._logger.debug(f"Getting operation with identifier: {identifier}")
         return convert_to_data_model(op_obj)
+
+    async def get_queue_stats(self, since: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-caller statistics of the time operations spent queued.
+
+        Args:
+            since (Optional[float], optional): Only consider operations dispatched after this time
+                (seconds since the epoch). Defaults to the last hour.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The queue wait statistics of every caller.
+        """
+        self._logger.debug(f"Getting queue statistics since: {since}")
+        return await run_in_threadpool(self.scheduler.queue_stats, since)
+
+    async def get_station_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get the hit rate of the station state cache the scheduler bases its decisions on. Every
+        lab server worker keeps its own cache, the counters are those of the worker answering.
+
+        Returns:
+            Dict[str, Any]: The number of hits, misses, the hit rate and the number of cached stations.
+        """
+        self._logger.debug("Getting station state cache statistics")
+        return self.scheduler.station_cache_stats()
+
+    async def get_duration_estimates(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the duration estimates of every method the scheduler has seen.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The estimates, keyed by 'class.method'.
+        """
+        self._logger.debug("Getting operation duration estimates")
+        return self.scheduler.duration_stats()
@@ -1,5 +1,6 @@
 import logging
 from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
 from typing import Any, Dict
 from ochra.common.connections.api_models import (
     ObjectCallRequest,
@@ -43,7 +44,7 @@ class RobotRouter(APIRouter):
             str: The ID of the constructed robot.
         """
         self._logger.debug(f"Constructing robot with args: {args}")
-        return self.lab_service.construct_object(args, COLLECTION)
+        return await self.lab_service.construct_object(args, COLLECTION)
 
     async def get_property(
         self, identifier: str, args: ObjectPropertyGetRequest
@@ -59,11 +60,11 @@ class RobotRouter(APIRouter):
             Any: The requested properties of the robot.
         """
         self._logger.debug(f"Getting property for robot {identifier} with args: {args}")
-        return self.lab_service.get_object_property(identifier, COLLECTION, args)
+        return await self.lab_service.get_object_property(identifier, COLLECTION, args)
 
     async def modify_property(
         self, identifier: str, args: ObjectPropertyPatchRequest
-    ) -> bool:
+    ) -> Any:
         """
         Modify properties of a robot.
 
@@ -72,12 +73,22 @@ class RobotRouter(APIRouter):
             args (ObjectPropertyPatchRequest): The properties to modify.
 
         Returns:
-            bool: True if the modification was successful, False otherwise.
+            Any: True if the modification was successful, or the new value of the property if requested.
         """
         self._logger.debug(
             f"Modifying property for robot {identifier} with args: {args}"
         )
-        return self.lab_service.patch_object(identifier, COLLECTION, args)
+        if args.property != "status":
+            return await self.lab_service.patch_object(identifier, COLLECTION, args)
+
+        # a robot becoming idle may unblock queued operations on its station,
+        # which is read in the same update
+        patched, read = await self.lab_service.patch_and_read_object(
+            identifier, COLLECTION, args, ["owner_station"]
+        )
+        if read["owner_station"] is not None:
+            self.scheduler.notify(read["owner_station"])
+        return patched
 
     async def call_robot(
         self, identifier: str, args: ObjectCallRequest
@@ -92,9 +103,13 @@ class RobotRouter(APIRouter):
         Returns:
             Dict[str, Any]: A dict representing the Operation model in JSON format.
         """
-        op = self.lab_service.call_on_object(identifier, "robot", args)
-        self._logger.debug(f"Calling robot {identifier} with args: {args}")
-        self.scheduler.add_operation(op)
+        ticket = await run_in_threadpool(self.scheduler.admit, args.caller_id)
+        try:
+            op = await self.lab_service.call_on_object(identifier, "robot", args)
+            self._logger.debug(f"Calling robot {identifier} with args: {args}")
+            await run_in_threadpool(self.scheduler.add_operation, op)
+        finally:
+            await run_in_threadpool(self.scheduler.release_admission, ticket)
         return op.get_base_model().model_dump(mode="json")
 
     async def get_robot(self, identifier: str) -> DataModel:
@@ -108,9 +123,9 @@ class RobotRouter(APIRouter):
             DataModel: The robot data model.
         """
         if is_valid_uuid(identifier):
-            robot_obj = self.lab_service.get_object_by_id(identifier, COLLECTION)
+            robot_obj = await self.lab_service.get_object_by_id(identifier, COLLECTION)
         else:
-            robot_obj = self.lab_service.get_object_by_name(identifier, COLLECTION)
+            robot_obj = await self.lab_service.get_object_by_name(identifier, COLLECTION)
         self._logger.debug(f"Getting robot with identifier: {identifier}")
         return convert_to_data_model(robot_obj)
 
@@ -125,5 +140,5 @@ class RobotRouter(APIRouter):
             Dict: A message indicating the result of the deletion.
         """
         self._logger.debug(f"Deleting robot with identifier: {identifier}")
-        self.lab_service.delete_object(identifier, COLLECTION)
+        await self.lab_service.delete_object(identifier, COLLECTION)
         return {"message": "Robot deleted successfully"}
@@ -1,7 +1,9 @@
 import logging
 from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
 from typing import Any, Dict
 from ochra.common.connections.api_models import (
+    LockRequest,
     ObjectCallRequest,
     ObjectConstructionRequest,
     ObjectPropertyPatchRequest,
@@ -29,6 +31,8 @@ class StationRouter(APIRouter):
         self.get("/{identifier}/property")(self.get_station_property)
         self.patch("/{identifier}/property")(self.modify_property)
         self.post("/{identifier}/method")(self.call_method)
+        self.post("/{identifier}/lock")(self.lock_station)
+        self.post("/{identifier}/unlock")(self.unlock_station)
         self.get("/")(self.get_station)
         self.delete("/{identifier}/")(self.delete_station)
 
@@ -49,7 +53,7 @@ class StationRouter(APIRouter):
         # TODO we can just set this as part of the station model
         object["station_ip"] = request.client.host
         args.object_json = json.dumps(object)
-        return self.lab_service.construct_object(args, COLLECTION)
+        return await self.lab_service.construct_object(args, COLLECTION)
 
     async def get_station_property(
         self, identifier: str, args: ObjectPropertyGetRequest
@@ -67,11 +71,11 @@ class StationRouter(APIRouter):
         self._logger.debug(
             f"Getting property for station {identifier} with args: {args}"
         )
-        return self.lab_service.get_object_property(identifier, COLLECTION, args)
+        return await self.lab_service.get_object_property(identifier, COLLECTION, args)
 
     async def modify_property(
         self, identifier: str, args: ObjectPropertyPatchRequest
-    ) -> bool:
+    ) -> Any:
         """
         Modify properties of a station.
 
@@ -80,12 +84,17 @@ class StationRouter(APIRouter):
             args (ObjectPropertyPatchRequest): The properties to modify.
 
         Returns:
-            bool: True if the modification was successful, False otherwise.
+            Any: True if the modification was successful, or the new value of the property if requested.
         """
         self._logger.debug(
             f"Modifying property for station {identifier} with args: {args}"
         )
-        return self.lab_service.patch_object(identifier, COLLECTION, args)
+        patched = await self.lab_service.patch_object(identifier, COLLECTION, args)
+
+        # a station becoming idle, unlocked or allowing more operations may unblock queued operations
+        if args.property in ["status", "locked", "max_concurrent_ops"]:
+            self.scheduler.notify(identifier)
+        return patched
 
     async def call_method(
         self, identifier: str, args: ObjectCallRequest
@@ -100,11 +109,49 @@ class StationRouter(APIRouter):
         Returns:
             Dict[str, Any]: A dict representing the Operation model in JSON format.
         """
-        op = self.lab_service.call_on_object(identifier, "station", args)
-        self._logger.debug(f"Calling station {identifier} with args: {args}")
-        self.scheduler.add_operation(op)
+        ticket = await run_in_threadpool(self.scheduler.admit, args.caller_id)
+        try:
+            op = await self.lab_service.call_on_object(identifier, "station", args)
+            self._logger.debug(f"Calling station {identifier} with args: {args}")
+            await run_in_threadpool(self.scheduler.add_operation, op)
+        finally:
+            await run_in_threadpool(self.scheduler.release_admission, ticket)
         return op.get_base_model().model_dump(mode="json")
 
+    async def lock_station(self, identifier: str, args: LockRequest) -> Dict[str, Any]:
+        """
+        Acquire or renew the lock of a station for a lease.
+
+        Args:
+            identifier (str): The ID of the station.
+            args (LockRequest): The session taking the lock and the duration of the lease.
+
+        Returns:
+            Dict[str, Any]: The session holding the lock and when the lease expires.
+        """
+        self._logger.debug(f"Locking station {identifier} with args: {args}")
+        lock = await self.lab_service.lock_station(identifier, args)
+        self.scheduler.notify(identifier)
+        return lock
+
+    async def unlock_station(self, identifier: str, args: LockRequest) -> bool:
+        """
+        Release the lock of a station.
+
+        Args:
+            identifier (str): The ID of the station.
+            args (LockRequest): The session holding the lock.
+
+        Returns:
+            bool: True if the lock was released, False if the session did not hold it.
+        """
+        self._logger.debug(f"Unlocking station {identifier} with args: {args}")
+        unlocked = await self.lab_service.unlock_station(identifier, args)
+        if unlocked:
+            # queued operations of other sessions may run again
+            self.scheduler.notify(identifier)
+        return unlocked
+
     async def get_station(self, identifier: str) -> DataModel:
         """
         Get a station by its ID or name.
@@ -116,9 +163,9 @@ class StationRouter(APIRouter):
             DataModel: The station data model.
         """
         if is_valid_uuid(identifier):
-            station_obj = self.lab_service.get_object_by_id(identifier, COLLECTION)
+            station_obj = await self.lab_service.get_object_by_id(identifier, COLLECTION)
         else:
-            station_obj = self.lab_service.get_object_by_name(identifier, COLLECTION)
+            station_obj = await self.lab_service.get_object_by_name(identifier, COLLECTION)
 
         self._logger.debug(f"Getting station with identifier: {identifier}")
         return convert_to_data_model(station_obj)
@@ -134,5 +181,5 @@ class StationRouter(APIRouter):
             Dict: A message indicating the result of the deletion.
         """
         self._logger.debug(f"Deleting station with identifier: {identifier}")
-        self.lab_service.delete_object(identifier, COLLECTION)
+        await self.lab_service.delete_object(identifier, COLLECTION)
         return {"message": "Station deleted successfully"}
@@ -47,7 +47,7 @@ class StorageRouter(APIRouter):
         """
         self._logger.debug(f"Constructing {object_type} with args: {args}")
         collection = object_type if object_type in COLLECTIONS else None
-        return self.lab_service.construct_object(args, collection)
+        return await self.lab_service.construct_object(args, collection)
 
     async def get_storage_item_property(
         self, object_type: str, identifier: str, args: ObjectPropertyGetRequest
@@ -66,11 +66,11 @@ class StorageRouter(APIRouter):
             f"Getting property for {object_type} {identifier} with args: {args}"
         )
         collection = object_type if object_type in COLLECTIONS else None
-        return self.lab_service.get_object_property(identifier, collection, args)
+        return await self.lab_service.get_object_property(identifier, collection, args)
 
     async def modify_storage_item_property(
         self, object_type: str, identifier: str, args: ObjectPropertyPatchRequest
-    ) -> bool:
+    ) -> Any:
         """
         Modify properties of a storage item.
 
@@ -79,13 +79,13 @@ class StorageRouter(APIRouter):
             args (ObjectPropertyPatchRequest): The properties to modify.
 
         Returns:
-            bool: True if the modification was successful, False otherwise.
+            Any: True if the modification was successful, or the new value of the property if requested.
         """
         self._logger.debug(
             f"Modifying property for {object_type} {identifier} with args: {args}"
         )
         collection = object_type if object_type in COLLECTIONS else None
-        return self.lab_service.patch_object(identifier, collection, args)
+        return await self.lab_service.patch_object(identifier, collection, args)
 
     async def get_storage_item(self, object_type: str, identifier: str) -> DataModel:
         """
@@ -99,9 +99,9 @@ class StorageRouter(APIRouter):
         """
         collection = object_type if object_type in COLLECTIONS else None
         if is_valid_uuid(identifier):
-            storage_obj = self.lab_service.get_object_by_id(identifier, collection)
+            storage_obj = await self.lab_service.get_object_by_id(identifier, collection)
         else:
-            storage_obj = self.lab_service.get_object_by_name(identifier, collection)
+            storage_obj = await self.lab_service.get_object_by_name(identifier, collection)
 
         self._logger.debug(f"Getting {object_type} with identifier: {identifier}")
         return convert_to_data_model(storage_obj)
@@ -118,5 +118,5 @@ class StorageRouter(APIRouter):
         """
         collection = object_type if object_type in COLLECTIONS else None
         self._logger.debug(f"Deleting {object_type} with identifier: {identifier}")
-        self.lab_service.delete_object(identifier, collection)
+        await self.lab_service.delete_object(identifier, collection)
         return {"message": f"{object_type} deleted successfully"}
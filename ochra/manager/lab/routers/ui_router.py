@@ -65,14 +65,14 @@ class WebAppRouter(APIRouter):
         """
         return request.headers.get("HX-Request") == "true"
 
-    def build_table_fields(self) -> list[dict]:
+    async def build_table_fields(self) -> list[dict]:
         """
         Constructs a list of station information for rendering in the UI.
         
         Returns:
             list[dict]: A list of dictionaries containing station information.
         """
-        stations = self.lab_service.get_all_objects(STATIONS)
+        stations = await self.lab_service.get_all_objects(STATIONS)
         return [
             {
                 "name": s["name"],
@@ -94,7 +94,7 @@ class WebAppRouter(APIRouter):
         Returns:
             HTMLResponse: The rendered HTML response containing station information.
         """
-        table_fields = self.build_table_fields()
+        table_fields = await self.build_table_fields()
         self._logger.debug(f"Rendering station overview with {len(table_fields)} stations")
         return self.templates.TemplateResponse(
             "zzzstations.html",
@@ -259,14 +259,14 @@ class WebAppRouter(APIRouter):
         Returns:
             HTMLResponse: The rendered HTML response containing the station's information.
         """
-        s = self.lab_service.get_object_by_id(station_id, "stations")
+        s = await self.lab_service.get_object_by_id(station_id, "stations")
         body = await request.body()
         headers = dict(request.headers)
         method = request.method
         url = f"http://{s['station_ip']}:{s['port']}/hypermedia"
 
         # stations = self.lab_service.get_all_objects(STATIONS)
-        table_fields = self.build_table_fields()
+        table_fields = await self.build_table_fields()
 
         async with httpx.AsyncClient() as client:
             response = await client.request(method, url, headers=headers, data=body)
@@ -298,15 +298,15 @@ class WebAppRouter(APIRouter):
         Returns:
             HTMLResponse: The rendered HTML response containing the device's information.
         """
-        s = self.lab_service.get_object_by_id(station_id, "stations")
+        s = await self.lab_service.get_object_by_id(station_id, "stations")
         body = await request.body()
         headers = dict(request.headers)
         method = request.method
         url = f"http://{s['station_ip']}:{s['port']}/hypermedia/devices/{device_id}"
         station_url = f"http://{s['station_ip']}:{s['port']}/hypermedia"
-        stations = self.lab_service.get_all_objects(STATIONS)
-        station = self.lab_service.get_object_by_id(station_id, "stations")
-        table_fields = self.build_table_fields()
+        stations = await self.lab_service.get_all_objects(STATIONS)
+        station = await self.lab_service.get_object_by_id(station_id, "stations")
+        table_fields = await self.build_table_fields()
 
         async with httpx.AsyncClient() as client:
             response = await client.request(method, url, headers=headers, data=body)
@@ -348,7 +348,7 @@ class WebAppRouter(APIRouter):
         Raises:
             HTTPException: If the args format is invalid.
         """
-        station = self.lab_service.get_object_by_id(station_id, "stations")
+        station = await self.lab_service.get_object_by_id(station_id, "stations")
         proxy_url = f"http://{station['station_ip']}:{station['port']}/devices/{device_id}/commands"
         form = await request.form()
 
@@ -427,7 +427,7 @@ class WebAppRouter(APIRouter):
         if station_response.is_success:
             opp.end_timestamp = datetime.now()
 
-            self.lab_service.construct_object(
+            await self.lab_service.construct_object(
                 ObjectConstructionRequest(object_json=opp.model_dump_json()),
                 opp.collection,
             )
@@ -477,12 +477,12 @@ class WebAppRouter(APIRouter):
         Returns:
             HTMLResponse: The rendered HTML response containing the device's information.
         """
-        s = self.lab_service.get_object_by_id(station_id, "stations")
+        s = await self.lab_service.get_object_by_id(station_id, "stations")
         body = await request.body()
         headers = dict(request.headers)
         method = request.method
         url = f"http://{s['station_ip']}:{s['port']}/hypermedia/devices/{device_id}"
-        station = self.lab_service.get_object_by_id(station_id, "stations")
+        station = await self.lab_service.get_object_by_id(station_id, "stations")
 
         async with httpx.AsyncClient() as client:
             response = await client.request(method, url, headers=headers, data=body)
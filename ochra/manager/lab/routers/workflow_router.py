@@ -0,0 +1,47 @@
+import logging
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from typing import Any, Dict
+from ochra.common.connections.api_models import WorkflowRequest
+from ..utils.workflow_engine import WorkflowEngine
+
+COLLECTION = "workflows"
+
+
+class WorkflowRouter(APIRouter):
+    """
+    WorkflowRouter is responsible for handling workflow-related API endpoints.
+    """
+
+    def __init__(self, workflow_engine: WorkflowEngine):
+        super().__init__(prefix=f"/{COLLECTION}")
+        self._logger = logging.getLogger(__name__)
+        self.workflow_engine = workflow_engine
+        self.post("/")(self.submit_workflow)
+        self.get("/{identifier}")(self.get_workflow)
+
+    async def submit_workflow(self, args: WorkflowRequest) -> Dict[str, Any]:
+        """
+        Submit a workflow to be run by the lab server.
+
+        Args:
+            args (WorkflowRequest): The steps of the workflow.
+
+        Returns:
+            Dict[str, Any]: The ID of the workflow and the ID of the operation of every step.
+        """
+        self._logger.debug(f"Submitting workflow with {len(args.steps)} steps for {args.caller_id}")
+        return await run_in_threadpool(self.workflow_engine.submit, args)
+
+    async def get_workflow(self, identifier: str) -> Dict[str, Any]:
+        """
+        Get a workflow and the status of its steps.
+
+        Args:
+            identifier (str): The ID of the workflow.
+
+        Returns:
+            Dict[str, Any]: The workflow, with the status and result of every step.
+        """
+        self._logger.debug(f"Getting workflow with identifier: {identifier}")
+        return await run_in_threadpool(self.workflow_engine.get_workflow, identifier)
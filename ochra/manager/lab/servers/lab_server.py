@@ -1,6 +1,6 @@
 from pathlib import Path
 from contextlib import asynccontextmanager
-from typing import Optional, Callable
+from typing import Dict, Optional, Callable
 from fastapi import FastAPI, Request
 from fastapi.responses import RedirectResponse
 from fastapi.staticfiles import StaticFiles
@@ -16,7 +16,10 @@ from ..routers.operation_router import OperationRouter
 from ..routers.lab_router import LabRouter
 from ..routers.storage_router import StorageRouter
 from ..routers.operation_results_router import OperationResultRouter
+from ..routers.workflow_router import WorkflowRouter
 from ..utils.scheduler import Scheduler
+from ochra.manager.connections.db_connection import DbConnection
+from ..utils.workflow_engine import WorkflowEngine
 from ..utils.lab_logging import configure_lab_logging
 import inspect
 
@@ -31,6 +34,11 @@ class LabServer:
         port: int,
         folderpath: str,
         template_path: Optional[Path] = None,
+        max_concurrent_ops: int = 8,
+        batch_size: int = 1,
+        caller_weights: Optional[Dict[str, float]] = None,
+        max_queued_ops: Optional[int] = None,
+        max_queued_ops_per_caller: Optional[int] = None,
     ) -> None:
         """
         Initialize the LabServer instance.
@@ -40,6 +48,11 @@ class LabServer:
             port (int): The port number to listen on.
             folderpath (str): Directory path for storing lab data and logs.
             template_path (Path, optional): Optional path for Jinja2 templates and static files. Default is None.
+            max_concurrent_ops (int, optional): Maximum number of operations the scheduler executes at the same time. Default is 8.
+            batch_size (int, optional): Maximum number of queued operations the scheduler sends to a station in one request. Default is 1.
+            caller_weights (Dict[str, float], optional): Share of the lab of each caller relative to the others, callers not listed have a weight of 1. Default is None.
+            max_queued_ops (int, optional): Maximum number of queued operations, submissions beyond it are rejected with 429. Default is None, unlimited.
+            max_queued_ops_per_caller (int, optional): Maximum number of queued operations of a single caller. Default is None, unlimited.
         """
         MODULE_DIRECTORY = (
             Path(__file__).resolve().parent if not template_path else template_path
@@ -51,11 +64,20 @@ class LabServer:
         self._logger.info("Initializing lab server...")
         self.host = host
         self.port = port
-        self.scheduler = Scheduler()
+        self.scheduler = Scheduler(
+            max_workers=max_concurrent_ops,
+            batch_size=batch_size,
+            caller_weights=caller_weights,
+            max_queued=max_queued_ops,
+            max_queued_per_caller=max_queued_ops_per_caller,
+        )
+        self.workflow_engine = WorkflowEngine(self.scheduler)
 
         @asynccontextmanager
         async def lifespan(app: FastAPI):
+            DbConnection().ensure_indexes()
             self.scheduler.run()
+            self.workflow_engine.recover()
             yield
             self.scheduler.stop()
 
@@ -70,9 +92,10 @@ class LabServer:
         self.app.include_router(DeviceRouter(self.scheduler))
         self.app.include_router(StationRouter(self.scheduler))
         self.app.include_router(RobotRouter(self.scheduler))
-        self.app.include_router(OperationRouter())
+        self.app.include_router(OperationRouter(self.scheduler))
         self.app.include_router(StorageRouter())
         self.app.include_router(OperationResultRouter(folderpath))
+        self.app.include_router(WorkflowRouter(self.workflow_engine))
 
         ##NOTE: NEW ADDITIONS ###################
         self.app.include_router(WebAppRouter(self.templates))
@@ -0,0 +1,102 @@
+from ochra.common.utils.singleton_meta import SingletonMeta
+from ochra.common.utils.enum import OperationStatus
+from ochra.manager.connections.async_db_connection import AsyncDbConnection
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+
+class CompletionNotifier(metaclass=SingletonMeta):
+    """
+    CompletionNotifier is a singleton that wakes up requests waiting for operations to complete,
+    so that clients can long-poll for the completion of an operation instead of polling its status.
+    Whatever completes an operation in this process, the scheduler or a station patching the status,
+    notifies it by operation ID. Completions written by other lab server processes are not seen
+    directly, so waiters also re-check the database at a short interval.
+    """
+
+    def __init__(self, poll_interval: float = 1.0) -> None:
+        """
+        Initialize the CompletionNotifier.
+
+        Args:
+            poll_interval (float, optional): Time in seconds after which a waiter re-checks the database.
+                Bounds the latency of completions written by other processes. Defaults to 1.0.
+        """
+        self._logger = logging.getLogger(__name__)
+        self._db_conn: AsyncDbConnection = AsyncDbConnection()
+        self._poll_interval = poll_interval
+        self._lock = Lock()
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+
+    async def wait(self, operation_id: str, timeout: float) -> Optional[str]:
+        """
+        Wait until an operation completed or the timeout passed, without blocking the event loop.
+
+        Args:
+            operation_id (str): The ID of the operation.
+            timeout (float): Maximum time to wait in seconds.
+
+        Returns:
+            Optional[str]: The status of the operation, or None if it does not exist.
+        """
+        operation_id = str(operation_id)
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = (loop, event)
+        # register before the first check so that a completion in between is not missed
+        with self._lock:
+            self._waiters.setdefault(operation_id, []).append(waiter)
+
+        try:
+            deadline = loop.time() + timeout
+            while True:
+                event.clear()
+                status = await self._status(operation_id)
+                remaining = deadline - loop.time()
+                if status in [None, OperationStatus.COMPLETED] or remaining <= 0:
+                    return status
+                try:
+                    await asyncio.wait_for(
+                        event.wait(), min(self._poll_interval, remaining)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(operation_id, [])
+                if waiter in waiters:
+                    waiters.remove(waiter)
+                if not waiters:
+                    self._waiters.pop(operation_id, None)
+
+    def notify(self, operation_id: str) -> None:
+        """
+        Wake up the requests waiting for an operation. Safe to call from any thread.
+
+        Args:
+            operation_id (str): The ID of the operation.
+        """
+        with self._lock:
+            waiters = list(self._waiters.get(str(operation_id), []))
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # the event loop of the waiter was closed
+                pass
+
+    async def _status(self, operation_id: str) -> Optional[str]:
+        """
+        Read the status of an operation from the database.
+
+        Args:
+            operation_id (str): The ID of the operation.
+
+        Returns:
+            Optional[str]: The status of the operation, or None if it does not exist.
+        """
+        return await self._db_conn.read(
+            {"id": operation_id, "_collection": "operations"}, "status"
+        )
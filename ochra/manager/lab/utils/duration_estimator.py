@@ -0,0 +1,177 @@
+from collections import deque
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from ochra.common.utils.enum import OperationStatus
+from ochra.manager.connections.db_connection import DbConnection
+import logging
+
+
+class DurationEstimator:
+    """
+    DurationEstimator keeps running estimates of how long operations take, per entity class
+    (e.g. the class of the target device) and method. Every key has an exponentially weighted
+    moving average of its durations and a window of the most recent ones for percentiles.
+    The estimates are seeded from the start and end timestamps recorded on completed operations.
+    """
+
+    def __init__(self, alpha: float = 0.2, window: int = 100) -> None:
+        """
+        Initialize the DurationEstimator.
+
+        Args:
+            alpha (float, optional): Weight of a new duration in the moving average. Defaults to 0.2.
+            window (int, optional): Number of recent durations kept per key for percentiles. Defaults to 100.
+        """
+        self._logger = logging.getLogger(__name__)
+        self._db_conn: DbConnection = DbConnection()
+        self._alpha = alpha
+        self._window = window
+        self._lock = Lock()
+        self._averages: Dict[Tuple[str, str], float] = {}
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+
+        # class of every entity seen so far, entities do not change class
+        self._entity_classes: Dict[str, str] = {}
+
+    def observe(self, entity_class: str, method: str, duration: float) -> None:
+        """
+        Record the duration of a completed operation.
+
+        Args:
+            entity_class (str): Class of the entity the operation ran on.
+            method (str): Name of the method invoked.
+            duration (float): Duration of the operation in seconds.
+        """
+        key = (entity_class, method)
+        with self._lock:
+            average = self._averages.get(key)
+            self._averages[key] = (
+                duration
+                if average is None
+                else self._alpha * duration + (1 - self._alpha) * average
+            )
+            self._samples.setdefault(key, deque(maxlen=self._window)).append(duration)
+
+    def estimate(self, entity_class: str, method: str) -> Optional[float]:
+        """
+        Get the moving average of the durations of a method.
+
+        Args:
+            entity_class (str): Class of the entity.
+            method (str): Name of the method.
+
+        Returns:
+            Optional[float]: The estimated duration in seconds, or None if the method was never seen.
+        """
+        with self._lock:
+            return self._averages.get((entity_class, method))
+
+    def percentile(
+        self, entity_class: str, method: str, percentile: float
+    ) -> Optional[float]:
+        """
+        Get a percentile of the recent durations of a method.
+
+        Args:
+            entity_class (str): Class of the entity.
+            method (str): Name of the method.
+            percentile (float): The percentile, between 0 and 100.
+
+        Returns:
+            Optional[float]: The duration in seconds, or None if the method was never seen.
+        """
+        with self._lock:
+            samples = sorted(self._samples.get((entity_class, method), []))
+        if not samples:
+            return None
+        return samples[round(percentile / 100 * (len(samples) - 1))]
+
+    def entity_class(self, entity_id: str, entity_type: str) -> Optional[str]:
+        """
+        Get the class of an entity, reading it from the database the first time.
+
+        Args:
+            entity_id (str): ID of the entity.
+            entity_type (str): Type of the entity, one of 'device', 'robot' or 'station'.
+
+        Returns:
+            Optional[str]: The class of the entity, or None if it does not exist.
+        """
+        entity_id = str(entity_id)
+        entity_class = self._entity_classes.get(entity_id)
+        if entity_class is None:
+            entity = self._db_conn.read_properties(
+                {"id": entity_id, "_collection": entity_type + "s"}, ["cls"]
+            )
+            entity_class = entity.get("cls") if entity is not None else None
+            if entity_class is not None:
+                self._entity_classes[entity_id] = entity_class
+        return entity_class
+
+    def load_history(self, days: float = 7.0) -> int:
+        """
+        Seed the estimates with the operations completed during the given number of days.
+
+        Args:
+            days (float, optional): How far back to look. Defaults to 7.0.
+
+        Returns:
+            int: The number of durations recorded.
+        """
+        since = (datetime.now() - timedelta(days=days)).isoformat()
+        ops = self._db_conn.find_all(
+            {"_collection": "operations"},
+            {
+                "status": OperationStatus.COMPLETED,
+                "start_timestamp": {"$ne": None},
+                "end_timestamp": {"$gte": since},
+            },
+        )
+
+        # resolve the classes of all entities with one query per collection
+        entity_ids: Dict[str, List[str]] = {}
+        for op in ops:
+            entity_ids.setdefault(op["entity_type"] + "s", []).append(str(op["entity_id"]))
+        for collection, ids in entity_ids.items():
+            for entity in self._db_conn.find_all(
+                {"_collection": collection}, {"id": {"$in": ids}}
+            ):
+                if entity.get("cls") is not None:
+                    self._entity_classes[entity["id"]] = entity["cls"]
+
+        recorded = 0
+        for op in sorted(ops, key=lambda op: op["end_timestamp"]):
+            entity_class = self._entity_classes.get(str(op["entity_id"]))
+            if entity_class is None:
+                continue
+            duration = (
+                datetime.fromisoformat(op["end_timestamp"])
+                - datetime.fromisoformat(op["start_timestamp"])
+            ).total_seconds()
+            self.observe(entity_class, op["method"], duration)
+            recorded += 1
+
+        self._logger.info(f"Seeded duration estimates with {recorded} operations")
+        return recorded
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the estimates of every method seen so far.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: For every 'class.method' the number of recent durations,
+                their moving average and their median, 90th percentile and maximum.
+        """
+        with self._lock:
+            keys = list(self._averages)
+        stats = {}
+        for entity_class, method in keys:
+            stats[f"{entity_class}.{method}"] = {
+                "samples": len(self._samples[(entity_class, method)]),
+                "ewma": self.estimate(entity_class, method),
+                "p50": self.percentile(entity_class, method, 50),
+                "p90": self.percentile(entity_class, method, 90),
+                "max": self.percentile(entity_class, method, 100),
+            }
+        return stats
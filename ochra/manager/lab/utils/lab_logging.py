@@ -113,6 +113,11 @@ def configure_lab_logging(log_root_path: str, console_log_level: int = logging.I
                 level=logging.DEBUG,
                 propagate=False,
             ),
+            "ochra.manager.lab.routers.workflow_router": get_logger_config(
+                handlers=["console_handler", "routers_handler"],
+                level=logging.DEBUG,
+                propagate=False,
+            ),
             "ochra.manager.connections.db_connection": get_logger_config(
                 handlers=["console_handler", "db_connection_handler"],
                 level=logging.DEBUG,
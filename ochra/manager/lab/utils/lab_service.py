@@ -4,14 +4,25 @@ from typing import Any, List, Dict, Optional, Tuple
 from ochra.common.equipment.operation import Operation
 from fastapi import HTTPException
 from ochra.common.connections.api_models import (
+    BulkCallRequest,
+    LockRequest,
     ObjectCallRequest,
+    OperationCall,
     ObjectPropertyPatchRequest,
     ObjectConstructionRequest,
     ObjectPropertyGetRequest,
+    BulkConstructionRequest,
 )
 from ...connections.db_connection import DbConnection
+from ...connections.async_db_connection import AsyncDbConnection
+from .station_state_cache import StationStateCache
+from ochra.common.utils.enum import PatchType
+from ochra.common.utils.misc import is_valid_uuid
+import itertools
 import json
+import uuid
 from pathlib import Path
+from time import time
 import shutil
 from os import remove
 
@@ -22,10 +33,14 @@ class LabService:
     abstracting database interactions and file management to avoid code duplication across routers.
 
     Attributes:
-        db_conn (DbConnection): Database connection instance for CRUD operations.
+        db_conn (DbConnection): Database connection instance for the operations used by the scheduler's threads.
+        async_db_conn (AsyncDbConnection): Database connection instance awaited by the request handlers.
         folderpath (Optional[Path]): Path to the folder for storing files, if provided.
     """
 
+    # properties an object keeps from its existing version when it is constructed again, unless they are None there
+    KEPT_PROPERTIES = ["id", "inventory"]
+
     def __init__(self, folderpath: Optional[str] = None) -> None:
         """
         Initialize the LabService with an optional folder path for file storage.
@@ -34,6 +49,8 @@ class LabService:
             folderpath (Optional[str]): Path to the folder for storing files. If None, file operations are disabled.
         """
         self.db_conn: DbConnection = DbConnection()
+        self.async_db_conn: AsyncDbConnection = AsyncDbConnection()
+        self.station_states: StationStateCache = StationStateCache()
         self._logger = logging.getLogger(__name__)
 
         # TODO: split this to check if the string is an actual directory to return some form of error message
@@ -44,15 +61,15 @@ class LabService:
         else:
             self.folderpath = None
 
-    def patch_object(
+    async def patch_object(
         self,
         object_id: str,
         collection: str,
         set_req: ObjectPropertyPatchRequest,
         file=False,
-    ) -> bool:
+    ) -> Any:
         """
-        Update properties of an object in the specified collection.
+        Update properties of an object in the specified collection with a single update.
 
         Args:
             object_id (str): Unique identifier of the object to update.
@@ -61,43 +78,85 @@ class LabService:
             file (bool, optional): Indicates if the property being updated is a file. Defaults to False.
 
         Returns:
-            bool: True if the update was successful.
+            Any: True if the update was successful, or the new value of the property if the request asks for it.
 
         Raises:
             HTTPException: If the object does not exist or the update fails.
         """
+        patched, _ = await self.patch_and_read_object(object_id, collection, set_req, [], file=file)
+        return patched
 
-        try:
-            self.db_conn.read({"id": object_id, "_collection": collection})
-            self._logger.debug(f"got Object {object_id}")
-        except Exception as e:
-            self._logger.debug(f"{object_id} does not exist")
-            raise HTTPException(status_code=404, detail=str(e))
+    async def patch_and_read_object(
+        self,
+        object_id: str,
+        collection: str,
+        set_req: ObjectPropertyPatchRequest,
+        properties: List[str],
+        file=False,
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Update properties of an object and read other properties of it in the same single update.
+
+        Args:
+            object_id (str): Unique identifier of the object to update.
+            collection (str): Name of the database collection containing the object.
+            set_req (ObjectPropertyPatchRequest): Request containing the property name and new value.
+            properties (List[str]): The properties to read, as they are after the update.
+            file (bool, optional): Indicates if the property being updated is a file. Defaults to False.
+
+        Returns:
+            Tuple[Any, Dict[str, Any]]: What patch_object returns, and the value of every read property,
+                None for properties the object does not have.
+
+        Raises:
+            HTTPException: If the object does not exist or the update fails.
+        """
+        return_document = set_req.return_document or bool(properties)
         try:
             self._logger.debug(
                 f"attempting to update {set_req.property} to {set_req.property_value}"
             )  # noqa
 
-            self.db_conn.update(
+            result = await self.async_db_conn.update(
                 {"id": object_id, "_collection": collection},
                 set_req.model_dump(),
                 file=file,
+                return_document=return_document,
+                returned_properties=properties,
             )
-
-            self._logger.debug(
-                f"changed {set_req.property} to {set_req.property_value}"
-            )
-
         except Exception as e:
             self._logger.error(e)
             raise HTTPException(status_code=500, detail=e)
-        return True
 
-    def construct_object(
+        found = result is not None if return_document else result.matched_count > 0
+        if not found:
+            self._logger.debug(f"{object_id} does not exist")
+            raise HTTPException(
+                status_code=404, detail=f"{collection} {object_id} does not exist"
+            )
+        self._logger.debug(f"changed {set_req.property} to {set_req.property_value}")
+
+        # keep the scheduler's view of the station in sync with the db
+        if collection == "stations":
+            if set_req.patch_type == PatchType.SET:
+                self.station_states.update(
+                    object_id, set_req.property, set_req.property_value
+                )
+            elif set_req.property in StationStateCache.TRACKED_PROPERTIES:
+                self.station_states.invalidate(object_id)
+
+        read = {property: result.get(property) for property in properties}
+        if set_req.return_document:
+            return result.get(set_req.property), read
+        return True, read
+
+    async def construct_object(
         self, construct_req: ObjectConstructionRequest, collection: str
     ) -> str:
         """
         Create or update an object in the specified database collection.
+        An object with the name of an existing one replaces it in a single atomic update,
+        keeping the ID of the existing object and its inventory unless that is None.
 
         Args:
             construct_req (ObjectConstructionRequest): Request containing the object's JSON definition.
@@ -111,24 +170,65 @@ class LabService:
         """
 
         object_dict: dict = json.loads(construct_req.object_json)
-        existing_object = self.db_conn.find(
-            {"_collection": collection}, {"name": object_dict.get("name", "")}
-        )
-        self._logger.info(f"existing_object: {existing_object}")
-        if existing_object is not None:
-            object_dict["id"] = existing_object.get("id")
-            obj_inv = existing_object.get("inventory", None)
-            if obj_inv is not None:
-                object_dict["inventory"] = obj_inv
-            self.db_conn.delete(
-                {"id": existing_object.get("id"), "_collection": collection}
+        if object_dict.get("name"):
+            keep_existing = {
+                k: object_dict.pop(k) for k in self.KEPT_PROPERTIES if k in object_dict
+            }
+            stored = await self.async_db_conn.find_and_update(
+                {"_collection": collection},
+                {"name": object_dict["name"]},
+                object_dict,
+                upsert=True,
+                keep_existing=keep_existing,
             )
+            object_id = stored.get("id")
+        else:
+            await self.async_db_conn.create({"_collection": collection}, object_dict)
+            object_id = object_dict.get("id")
 
-        self.db_conn.create({"_collection": collection}, object_dict)
+        if collection == "stations":
+            self.station_states.invalidate(object_id)
         self._logger.debug(f"constructed object of type {object_dict.get('cls')}")
-        return object_dict.get("id")
+        return object_id
+
+    async def construct_objects(
+        self, construct_req: BulkConstructionRequest, collection: str
+    ) -> List[str]:
+        """
+        Create or update many objects in the specified database collection with a single bulk write,
+        as construct_object does for one.
+
+        Args:
+            construct_req (BulkConstructionRequest): Request containing the objects' JSON definitions.
+            collection (str): Name of the database collection.
 
-    def call_on_object(
+        Returns:
+            List[str]: The IDs of the constructed or updated objects, in the order of the request.
+        """
+        object_dicts = [json.loads(object_json) for object_json in construct_req.objects_json]
+        named = [object_dict for object_dict in object_dicts if object_dict.get("name")]
+        unnamed = [object_dict for object_dict in object_dicts if not object_dict.get("name")]
+
+        stored = {}
+        if named:
+            for doc in await self.async_db_conn.upsert_many(
+                {"_collection": collection}, "name", named, self.KEPT_PROPERTIES
+            ):
+                stored[doc["name"]] = doc.get("id")
+        if unnamed:
+            await self.async_db_conn.create_many({"_collection": collection}, unnamed)
+
+        object_ids = [
+            stored[object_dict["name"]] if object_dict.get("name") else object_dict.get("id")
+            for object_dict in object_dicts
+        ]
+        if collection == "stations":
+            for object_id in object_ids:
+                self.station_states.invalidate(object_id)
+        self._logger.debug(f"constructed {len(object_ids)} objects in {collection}")
+        return object_ids
+
+    async def call_on_object(
         self, object_id: str, object_type: str, call_req: ObjectCallRequest
     ) -> Operation:
         """
@@ -154,12 +254,15 @@ class LabService:
                 caller_id=call_req.caller_id,
                 method=call_req.method,
                 args=call_req.args,
+                priority=call_req.priority,
+                queue_timeout=call_req.queue_timeout,
+                timeout=call_req.timeout,
                 collection="operations",
                 module_path="ochra.discovery.equipment.operation",
             )
 
             # TODO change to use a proxy for operation instead of accessing db directly
-            self.db_conn.create(
+            await self.async_db_conn.create(
                 {"_collection": "operations"}, json.loads(op.model_dump_json())
             )
 
@@ -172,7 +275,238 @@ class LabService:
             self._logger.error(e)
             raise HTTPException(status_code=500, detail=str(e))
 
-    def get_object_property(
+    async def call_on_device_class(
+        self,
+        device_class: str,
+        call_req: ObjectCallRequest,
+        module_path: Optional[str] = None,
+    ) -> Operation:
+        """
+        Invoke a method on any device of the specified class and record the operation.
+        The operation initially targets the first matching device, the scheduler binds it
+        to an idle one when it is dispatched.
+
+        Args:
+            device_class (str): Class name of the target devices.
+            call_req (ObjectCallRequest): Request containing method name, arguments, and caller information.
+            module_path (Optional[str], optional): Module of the target devices, any if None. Defaults to None.
+
+        Returns:
+            Operation: The created Operation instance representing the method call.
+
+        Raises:
+            HTTPException: If no device of the class exists or the operation cannot be created or stored.
+        """
+        search_params = {"cls": device_class}
+        if module_path is not None:
+            search_params["module_path"] = module_path
+        device = await self.async_db_conn.find({"_collection": "devices"}, search_params)
+        if device is None:
+            raise HTTPException(
+                status_code=404, detail=f"no device of class {device_class} found"
+            )
+        return await self.call_on_object(device["id"], "device", call_req)
+
+    def expand_bulk_call(self, bulk_req: BulkCallRequest) -> List[OperationCall]:
+        """
+        Expand a bulk call request into the individual calls, the listed calls first and then the
+        sweep, once for every argument set of the list and once for every combination of the grid.
+
+        Args:
+            bulk_req (BulkCallRequest): The bulk call request.
+
+        Returns:
+            List[OperationCall]: The calls in submission order.
+
+        Raises:
+            HTTPException: If the request has no calls, or argument sets without a sweep.
+        """
+        calls = list(bulk_req.calls)
+        arg_sets = list(bulk_req.args_list)
+        if bulk_req.args_grid:
+            names = list(bulk_req.args_grid)
+            arg_sets += [
+                dict(zip(names, values))
+                for values in itertools.product(*bulk_req.args_grid.values())
+            ]
+        if bulk_req.sweep is not None:
+            shared_args = bulk_req.sweep.args or {}
+            calls += [
+                bulk_req.sweep.model_copy(update={"args": {**shared_args, **arg_set}})
+                for arg_set in arg_sets or [{}]
+            ]
+        elif arg_sets:
+            raise HTTPException(status_code=400, detail="argument sets given without a sweep")
+
+        if not calls:
+            raise HTTPException(status_code=400, detail="bulk call has no calls")
+        return calls
+
+    def create_operations(
+        self,
+        calls: List[OperationCall],
+        caller_id: str,
+        workflow_id: Optional[uuid.UUID] = None,
+    ) -> List[Operation]:
+        """
+        Build the operations of the given calls without storing them. Every distinct target is
+        looked up once. Calls on a device class target the first device of the class until the
+        scheduler binds them to an idle one.
+
+        Args:
+            calls (List[OperationCall]): The calls.
+            caller_id (str): ID of the caller.
+            workflow_id (Optional[uuid.UUID], optional): ID of the workflow the calls are steps of. Defaults to None.
+
+        Returns:
+            List[Operation]: The operations, in the order of the calls.
+
+        Raises:
+            HTTPException: If a call has no target or its target does not exist.
+        """
+        targets: Dict[Tuple, str] = {}
+        operations = []
+        for call in calls:
+            target = (call.entity_type, call.entity_id, call.device_class, call.module_path)
+            if target not in targets:
+                targets[target] = self._resolve_call_target(call)
+            operations.append(
+                Operation(
+                    entity_id=targets[target],
+                    entity_type=call.entity_type,
+                    caller_id=caller_id,
+                    method=call.method,
+                    args=call.args or {},
+                    priority=call.priority,
+                    queue_timeout=call.queue_timeout,
+                    timeout=call.timeout,
+                    workflow_id=workflow_id,
+                    collection="operations",
+                    module_path="ochra.discovery.equipment.operation",
+                )
+            )
+        return operations
+
+    def _resolve_call_target(self, call: OperationCall) -> str:
+        """
+        Resolve the ID of the entity a call targets.
+
+        Args:
+            call (OperationCall): The call.
+
+        Returns:
+            str: The ID of the target entity.
+
+        Raises:
+            HTTPException: If the call has no target or its target does not exist.
+        """
+        if call.entity_id is None:
+            if call.device_class is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"call of {call.method} needs an entity_id or a device_class",
+                )
+            if call.entity_type not in ["device", "robot"]:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"call of {call.method} on class {call.device_class} must target devices or robots",
+                )
+            search_params = {"cls": call.device_class}
+            if call.module_path is not None:
+                search_params["module_path"] = call.module_path
+            device = self.db_conn.find({"_collection": call.entity_type + "s"}, search_params)
+            if device is None:
+                raise HTTPException(
+                    status_code=404, detail=f"no {call.entity_type} of class {call.device_class} found"
+                )
+            return device["id"]
+
+        search_params = (
+            {"id": call.entity_id} if is_valid_uuid(call.entity_id) else {"name": call.entity_id}
+        )
+        entity = self.db_conn.find({"_collection": call.entity_type + "s"}, search_params)
+        if entity is None:
+            raise HTTPException(
+                status_code=404, detail=f"{call.entity_type} {call.entity_id} not found"
+            )
+        return entity["id"]
+
+    async def lock_station(self, station_id: str, lock_req: LockRequest) -> Dict[str, Any]:
+        """
+        Acquire or renew the lock of a station with a single atomic compare-and-set. The lock is
+        granted if the station is unlocked, already locked by the caller, or its lease expired.
+
+        Args:
+            station_id (str): ID of the station.
+            lock_req (LockRequest): The session taking the lock and the duration of the lease.
+
+        Returns:
+            Dict[str, Any]: The session holding the lock of the station and when the lease expires.
+
+        Raises:
+            HTTPException: If the station does not exist or is locked by another session.
+        """
+        now = time()
+        search_params = {"id": station_id}
+        station = await self.async_db_conn.find_and_update(
+            {"_collection": "stations"},
+            {
+                **search_params,
+                "$or": [
+                    {"locked": None},
+                    {"locked": lock_req.caller_id},
+                    {"lock_expires_at": {"$lte": now}},
+                ],
+            },
+            {"locked": lock_req.caller_id, "lock_expires_at": now + lock_req.ttl},
+        )
+        if station is None:
+            station = await self.async_db_conn.find({"_collection": "stations"}, search_params)
+            if station is None:
+                raise HTTPException(status_code=404, detail=f"station {station_id} not found")
+            expiry = station.get("lock_expires_at")
+            raise HTTPException(
+                status_code=409,
+                detail=f"station {station_id} is locked by session {station['locked']}"
+                + (f" for another {expiry - now:.1f}s" if expiry is not None else ""),
+            )
+
+        self.station_states.update(station_id, "locked", lock_req.caller_id)
+        return {
+            "locked": station["locked"],
+            "lock_expires_at": station["lock_expires_at"],
+        }
+
+    async def unlock_station(self, station_id: str, lock_req: LockRequest) -> bool:
+        """
+        Release the lock of a station held by the caller, or any lock if the caller is ADMIN.
+
+        Args:
+            station_id (str): ID of the station.
+            lock_req (LockRequest): The session releasing the lock.
+
+        Returns:
+            bool: True if the lock was released, False if the caller did not hold it.
+
+        Raises:
+            HTTPException: If the station does not exist.
+        """
+        search_params = {"id": station_id}
+        lock_params = {} if lock_req.caller_id == "ADMIN" else {"locked": lock_req.caller_id}
+        station = await self.async_db_conn.find_and_update(
+            {"_collection": "stations"},
+            {**search_params, **lock_params},
+            {"locked": None, "lock_expires_at": None},
+        )
+        if station is None:
+            if await self.async_db_conn.find({"_collection": "stations"}, search_params) is None:
+                raise HTTPException(status_code=404, detail=f"station {station_id} not found")
+            return False
+
+        self.station_states.update(station_id, "locked", None)
+        return True
+
+    async def get_object_property(
         self, object_id: str, collection: str, request: ObjectPropertyGetRequest
     ) -> Any:
         """
@@ -190,13 +524,13 @@ class LabService:
             HTTPException: If the object or property is not found.
         """
         try:
-            return self.db_conn.read(
+            return await self.async_db_conn.read(
                 {"id": object_id, "_collection": collection}, request.property
             )
         except Exception as e:
             raise HTTPException(status_code=404, detail=str(e))
 
-    def get_object_by_name(self, name: str, collection: str) -> Dict[str, Any]:
+    async def get_object_by_name(self, name: str, collection: str) -> Dict[str, Any]:
         """
         Retrieve an object by its name from the specified collection.
 
@@ -211,11 +545,11 @@ class LabService:
             HTTPException: If the object is not found.
         """
         try:
-            return self.db_conn.find({"_collection": collection}, {"name": name})
+            return await self.async_db_conn.find({"_collection": collection}, {"name": name})
         except Exception as e:
             raise HTTPException(status_code=404, detail=str(e))
 
-    def get_object_by_id(self, object_id: str, collection: str) -> Dict[str, Any]:
+    async def get_object_by_id(self, object_id: str, collection: str) -> Dict[str, Any]:
         """
         Retrieve an object by its unique ID from the specified collection.
 
@@ -230,11 +564,11 @@ class LabService:
             HTTPException: If the object is not found.
         """
         try:
-            return self.db_conn.find({"_collection": collection}, {"id": object_id})
+            return await self.async_db_conn.find({"_collection": collection}, {"id": object_id})
         except Exception as e:
             raise HTTPException(status_code=404, detail=str(e))
 
-    def get_all_objects(
+    async def get_all_objects(
         self, collection: str, query_dict: Dict[str, Any] = None
     ) -> List[Dict[str, Any]]:
         """
@@ -251,11 +585,11 @@ class LabService:
             HTTPException: If no objects are found or retrieval fails.
         """
         try:
-            return self.db_conn.find_all({"_collection": collection}, query_dict)
+            return await self.async_db_conn.find_all({"_collection": collection}, query_dict)
         except Exception as e:
             raise HTTPException(status_code=404, detail=str(e))
 
-    def patch_file(self, object_id: str, collection: str, result_data: bytes) -> None:
+    async def patch_file(self, object_id: str, collection: str, result_data: bytes) -> None:
         """
         Update the file associated with an object in the database and manage its storage.
 
@@ -269,41 +603,34 @@ class LabService:
         #     update={"result_data": result_data},
         #     file=True,
         # )
-        parent_op = self.db_conn.find(
+        parent_op = await self.async_db_conn.find(
             {"_collection": "operations"}, {"result": object_id}
         )
-        entity_id = self.db_conn.read(
-            {"id": parent_op["id"], "_collection": "operations"}, property="entity_id"
-        )
-        entity_type = self.db_conn.read(
-            {"id": parent_op["id"], "_collection": "operations"}, property="entity_type"
-        )
-        entity_name = self.db_conn.read(
-            {"id": entity_id, "_collection": f"{entity_type}s"}, property="name"
+        entity_name = await self.async_db_conn.read(
+            {"id": parent_op["entity_id"], "_collection": f"{parent_op['entity_type']}s"},
+            property="name",
         )
         if self.folderpath is not None:
             # create folder with the operation id
             path = self.folderpath / entity_name
             path.mkdir(exist_ok=True)
 
-            # create the file within the folder
-            filename = path / self.db_conn.read(
-                {"id": object_id, "_collection": collection}, property="data_file_name"
+            result = await self.async_db_conn.read_properties(
+                {"id": object_id, "_collection": collection},
+                ["data_file_name", "data_type"],
             )
+
+            # create the file within the folder
+            filename = path / result["data_file_name"]
             with open(filename, "wb") as file:
                 file.write(result_data)
 
             # unzip the file if the result data is a folder
-            if (
-                self.db_conn.read(
-                    {"id": object_id, "_collection": collection}, property="data_type"
-                )
-                == "folder"
-            ):
+            if result["data_type"] == "folder":
                 shutil.unpack_archive(filename, filename.with_suffix(""), "zip")
                 remove(filename)
 
-    def get_file(self, object_id: str, collection: str) -> Tuple[Path, bool]:
+    async def get_file(self, object_id: str, collection: str) -> Tuple[Path, bool]:
         """
         Retrieve the file associated with an object from the database and local storage.
 
@@ -317,30 +644,22 @@ class LabService:
         Raises:
             HTTPException: If the folder path is not set or the file cannot be found.
         """
-        parent_op = self.db_conn.find(
+        parent_op = await self.async_db_conn.find(
             {"_collection": "operations"}, {"result": object_id}
         )
-        entity_id = self.db_conn.read(
-            {"id": parent_op["id"], "_collection": "operations"}, property="entity_id"
-        )
-        entity_type = self.db_conn.read(
-            {"id": parent_op["id"], "_collection": "operations"}, property="entity_type"
-        )
-        entity_name = self.db_conn.read(
-            {"id": entity_id, "_collection": f"{entity_type}s"}, property="name"
+        entity_name = await self.async_db_conn.read(
+            {"id": parent_op["entity_id"], "_collection": f"{parent_op['entity_type']}s"},
+            property="name",
         )
         # TODO: zip up folder and delete for returns
         if self.folderpath is not None:
             delete = False
             # get the file path
-            file_path: Path = (
-                self.folderpath
-                / entity_name
-                / self.db_conn.read(
-                    {"id": object_id, "_collection": collection},
-                    property="data_file_name",
-                )
+            data_file_name = await self.async_db_conn.read(
+                {"id": object_id, "_collection": collection},
+                property="data_file_name",
             )
+            file_path: Path = self.folderpath / entity_name / data_file_name
             if file_path.suffix == ".zip":
                 # if the file is a directory, zip it up
                 delete = True
@@ -350,7 +669,7 @@ class LabService:
             # if no folderpath is set, return None
             raise HTTPException(status_code=404, detail="Folder path not set")
 
-    def delete_object(self, object_id: str, collection: str) -> None:
+    async def delete_object(self, object_id: str, collection: str) -> None:
         """
         Delete an object from the specified database collection.
 
@@ -362,6 +681,8 @@ class LabService:
             HTTPException: If the object is not found or deletion fails.
         """
         try:
-            self.db_conn.delete({"id": object_id, "_collection": collection})
+            await self.async_db_conn.delete({"id": object_id, "_collection": collection})
+            if collection == "stations":
+                self.station_states.invalidate(object_id)
         except Exception as e:
             raise HTTPException(status_code=404, detail=str(e))
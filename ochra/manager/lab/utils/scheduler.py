@@ -1,10 +1,26 @@
 from ochra.manager.connections.db_connection import DbConnection
 from ochra.common.equipment.operation import Operation
-from threading import Thread
-from time import sleep
-from ochra.common.utils.enum import ActivityStatus, PatchType
+from ochra.common.equipment.operation_result import OperationResult
+from threading import Thread, Condition
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from time import time
+from uuid import uuid4
+from datetime import datetime
+import json
+import math
+from ochra.common.utils.enum import (
+    ActivityStatus,
+    OperationPriority,
+    OperationStatus,
+    PatchType,
+)
 from fastapi import HTTPException
 from ...connections.station_connection import StationConnection
+from ochra.common.connections.rest_adapter import LabEngineException
+from .station_state_cache import StationStateCache
+from .duration_estimator import DurationEstimator
+from .completion_notifier import CompletionNotifier
 import logging
 
 
@@ -12,29 +28,621 @@ class Scheduler:
     """
     A class to manage and schedule operations in the lab.
 
-    Attributes:
-        op_queue (list): A list to hold the queued operations.
+    The queue lives in the operations collection: an operation is queued once its
+    target station has been resolved and stored on it, and it stays queued while its
+    status is CREATED. Dispatching claims the station (IDLE to BUSY) and then the next
+    runnable operation for it (CREATED to ASSIGNED) with atomic find-and-modify calls,
+    so any number of lab server workers can share the queue without dispatching an
+    operation twice.
+
+    The scheduling loop sleeps on a condition variable and is woken up when an
+    operation is queued, a station reports a status or lock change, or a
+    dispatched operation finishes. Each wake-up only looks at the stations that
+    changed. Dispatched operations run on a bounded pool of worker threads,
+    reusing one connection per station. With a batch size above one, consecutive
+    operations queued for a station are sent to it in a single request.
+
+    Operations submitted against a device class instead of a specific device are
+    queued without a station. Any station owning an idle device of that class can
+    claim them, and the operation is bound to that device when it is dispatched.
+
+    Stations allowing more than one concurrent operation are not claimed as a whole.
+    Instead the scheduler takes one of their max_concurrent_ops slots (the running_ops
+    counter) and then claims the target device (IDLE to BUSY), so operations on different
+    devices of the station run in parallel. Operations on the station itself take every
+    slot and run alone. While one of them waits for the station to empty, shorter operations
+    are only backfilled if their estimated duration ends before the station is expected to be free.
+
+    Stations running one operation at a time are planned ahead across stations in the same way:
+    a held workflow step whose dependencies are running elsewhere reserves its station from the
+    time they are expected to complete, and queued operations only start on the station before
+    then if they are expected to be done by the time the step is released.
+
+    Queued operations are dispatched by priority class first. Within a class, callers
+    share the lab by start-time fair queuing: every operation is tagged on submission with
+    the later of the lab's virtual time and the finish tag of its caller's previous operation,
+    and each operation advances its caller's finish tag by the inverse of the caller's weight.
+    A caller submitting a long sweep thus only runs ahead of the others by its own backlog,
+    not by everything it queued. The tags are kept in the fair_shares collection so that
+    every lab server worker shares them.
+
+    Queue limits are enforced across lab server workers by admission tickets. A submission first
+    stores a ticket for its operations in the admissions collection and only then counts the queued
+    operations and the tickets of the other submissions, so of two concurrent submissions at least
+    one sees the other. The ticket is released once the operations are queued, or expires. The held
+    steps of a workflow count as queued from its submission, so releasing them takes no admission.
+
+    Every claim records the scheduler that made it, and each scheduler heartbeats in the
+    schedulers collection. Claims of a scheduler whose heartbeat stopped, because its lab
+    server worker crashed or the lab server was restarted, are reconciled by the others.
     """
-    def __init__(self):
+
+    # order in which the queued operations of a station are claimed
+    CLAIM_ORDER = [("priority", -1), ("fair_tag", 1), ("queued_at", 1)]
+
+    def __init__(
+        self,
+        idle_timeout: float = 5.0,
+        max_workers: int = 8,
+        batch_size: int = 1,
+        caller_weights: Optional[Dict[str, float]] = None,
+        max_queued: Optional[int] = None,
+        max_queued_per_caller: Optional[int] = None,
+        dispatcher_timeout: float = 30.0,
+        admission_ttl: float = 30.0,
+        backfill: bool = True,
+    ):
+        """
+        Initialize the Scheduler.
+
+        Args:
+            idle_timeout (float, optional): Interval in seconds at which the scheduling loop re-checks
+                every station with queued operations and purges expired ones, however often it is
+                woken up in between. Acts as a safety net for changes made through other lab server
+                workers or outside the lab server. Defaults to 5.0.
+            max_workers (int, optional): Maximum number of operations executing at the same time. Defaults to 8.
+            batch_size (int, optional): Maximum number of queued operations sent to a station in one request.
+                Batches require a station server providing the process_ops endpoint. Defaults to 1.
+            caller_weights (Optional[Dict[str, float]], optional): Share of the lab of each caller relative
+                to the others, callers not listed have a weight of 1. Defaults to None.
+            max_queued (Optional[int], optional): Maximum number of operations queued at the same time,
+                unlimited if None. Defaults to None.
+            max_queued_per_caller (Optional[int], optional): Maximum number of operations of a single caller
+                queued at the same time, unlimited if None. Defaults to None.
+            dispatcher_timeout (float, optional): Time in seconds after its last heartbeat a scheduler
+                is considered stopped and its claims are reconciled, at least three times idle_timeout.
+                Defaults to 30.0.
+            admission_ttl (float, optional): Time in seconds an admission ticket holds its place in the queue
+                if it is not released, e.g. because the lab server worker stopped. Defaults to 30.0.
+            backfill (bool, optional): Whether operations may start ahead of a reservation if they are expected
+                to finish before it. If False, operations behind an operation waiting for a whole station wait
+                as well, and workflow steps reserve nothing (first come, first served). Defaults to True.
+        """
         self._logger = logging.getLogger(__name__)
-        self.op_queue = []
         self._db_conn: DbConnection = DbConnection()
+        self._station_states: StationStateCache = StationStateCache()
+        self._durations: DurationEstimator = DurationEstimator()
+        self._completions: CompletionNotifier = CompletionNotifier()
         self._stop = False
-        
-        # create operation queue in db
-        self._queue_id = self._db_conn.create(
-            {"_collection": "lab"}, {"op_queue": self.op_queue}
+        self._idle_timeout = idle_timeout
+        self._batch_size = max(1, batch_size)
+        self._caller_weights = caller_weights or {}
+        self._max_queued = max_queued
+        self._max_queued_per_caller = max_queued_per_caller
+        self._admission_ttl = admission_ttl
+        self._backfill = backfill
+
+        # identifies the claims of this scheduler to the recovery of the other workers
+        self._worker_id = str(uuid4())
+        self._dispatcher_timeout = max(dispatcher_timeout, 3 * idle_timeout)
+        self._last_heartbeat = 0.0
+        self._last_recovery = 0.0
+        self._last_sweep = 0.0
+
+        # guards the wake-up state shared with the routers and workers
+        self._wakeup = Condition()
+        self._dirty_stations: Set[str] = set()
+        self._sweep = False
+
+        # number of dispatches by this scheduler per station that have not returned yet
+        self._in_flight: Dict[str, int] = {}
+
+        # bounded pool executing the dispatched operations
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="scheduler-op"
         )
+        # stations left waiting while all workers were busy
+        self._deferred_stations: Set[str] = set()
+
+        # connections to the stations, created on first dispatch
+        self._station_conns: Dict[str, StationConnection] = {}
+
+        # called with the operations this scheduler saw finish
+        self._completion_listeners: List[Callable[[List[Operation]], None]] = []
 
-    def add_operation(self, operation: Operation) -> None:
+    @property
+    def op_queue(self) -> List[Operation]:
+        """
+        The queued operations in dispatch order.
+        """
+        queued = self._db_conn.find_all(
+            {"_collection": "operations"}, self._queued_query()
+        )
+        queued.sort(
+            key=lambda op: (
+                -op.get("priority", OperationPriority.NORMAL),
+                op.get("fair_tag") or 0.0,
+                op["queued_at"],
+            )
+        )
+        return [self._to_operation(op) for op in queued]
+
+    def queue_stats(self, since: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-caller statistics of the time operations spent queued.
+
+        Args:
+            since (Optional[float], optional): Only consider operations dispatched after this
+                time (seconds since the epoch). Defaults to the last hour.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: For every caller the number of dispatched operations and their
+                mean, median, 95th percentile and maximum queue wait in seconds, along with the number
+                of operations still queued and the wait of the oldest one.
         """
-            Adds an operation to the scheduling queue.
+        now = time()
+        since = now - 3600.0 if since is None else since
+
+        waits: Dict[str, List[float]] = {}
+        for op in self._db_conn.find_all(
+            {"_collection": "operations"}, {"dispatched_at": {"$gte": since}}
+        ):
+            waits.setdefault(op["caller_id"], []).append(
+                op["dispatched_at"] - op["queued_at"]
+            )
+        queued: Dict[str, List[float]] = {}
+        for op in self._db_conn.find_all(
+            {"_collection": "operations"}, self._queued_query()
+        ):
+            queued.setdefault(op["caller_id"], []).append(now - op["queued_at"])
+
+        stats = {}
+        for caller_id in set(waits) | set(queued):
+            caller_waits = sorted(waits.get(caller_id, []))
+            caller_queued = queued.get(caller_id, [])
+            count = len(caller_waits)
+            stats[caller_id] = {
+                "dispatched": count,
+                "mean_wait": sum(caller_waits) / count if count else None,
+                "p50_wait": caller_waits[int(0.5 * (count - 1))] if count else None,
+                "p95_wait": caller_waits[int(0.95 * (count - 1))] if count else None,
+                "max_wait": caller_waits[-1] if count else None,
+                "queued": len(caller_queued),
+                "oldest_queued_wait": max(caller_queued, default=None),
+            }
+        return stats
+
+    def admit(self, caller_id: str, count: int = 1) -> Optional[str]:
+        """
+        Admits new operations of a caller to the queue. Submissions are rejected while they would
+        take the number of queued operations, overall or of the caller, past its limit. Operations
+        admitted by other workers but not queued yet, and held workflow steps, count towards the
+        limits as well.
+
+        Args:
+            caller_id (str): The ID of the caller submitting the operations.
+            count (int, optional): The number of operations submitted. Defaults to 1.
+
+        Returns:
+            Optional[str]: The admission ticket, to be handed to release_admission once the operations
+                are queued or the submission failed, or None if the queue is unlimited.
+
+        Raises:
+            HTTPException: 429 with a Retry-After header estimating when the queue will have drained
+                enough, or 413 if the submission is larger than the limit itself.
+        """
+        limits = [
+            (limit, search_params, scope)
+            for limit, search_params, scope in [
+                (self._max_queued, {}, "lab"),
+                (self._max_queued_per_caller, {"caller_id": caller_id}, f"caller {caller_id}"),
+            ]
+            if limit is not None
+        ]
+        if not limits:
+            return None
+        for limit, _, scope in limits:
+            if count > limit:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"{count} operations exceed the queue limit of the {scope} ({limit})",
+                )
+
+        # take the ticket before counting, a submission counting concurrently sees it or is seen by it
+        ticket = str(uuid4())
+        self._db_conn.create(
+            {"_collection": "admissions"},
+            {
+                "id": ticket,
+                "caller_id": caller_id,
+                "count": count,
+                "expires_at": time() + self._admission_ttl,
+            },
+        )
+        # held workflow steps were admitted with their workflow and are released into the queue unchecked
+        pending = self._queued_query()
+        del pending["queued_at"]
+        pending["$or"] = [{"queued_at": {"$ne": None}}, {"held": True}]
+        try:
+            for limit, search_params, scope in limits:
+                queued = self._db_conn.count(
+                    {"_collection": "operations"}, {**pending, **search_params}
+                )
+                admitted = sum(
+                    admission["count"]
+                    for admission in self._db_conn.find_all(
+                        {"_collection": "admissions"},
+                        {**search_params, "expires_at": {"$gt": time()}},
+                    )
+                )
+                excess = queued + admitted - limit
+                if excess > 0:
+                    retry_after = self._drain_time(excess, search_params)
+                    self._logger.info(
+                        f"Rejected {count} operations of {caller_id}, queue of the {scope} is full, retry after {retry_after}s"
+                    )
+                    raise HTTPException(
+                        status_code=429,
+                        detail=f"queue of the {scope} is full ({queued + admitted - count} of {limit} operations queued)",
+                        headers={"Retry-After": str(retry_after)},
+                    )
+        except Exception:
+            self.release_admission(ticket)
+            raise
+        return ticket
+
+    def release_admission(self, ticket: Optional[str]) -> None:
+        """
+        Releases an admission ticket, the admitted operations are queued or were never created.
+
+        Args:
+            ticket (Optional[str]): The ticket returned by admit, None is ignored.
+        """
+        if ticket is not None:
+            self._db_conn.delete({"_collection": "admissions", "id": ticket})
+
+    def _expire_admissions(self) -> None:
+        """
+        Deletes the admission tickets that were never released, they no longer count towards the limits.
+        """
+        for admission in self._db_conn.find_all(
+            {"_collection": "admissions"}, {"expires_at": {"$lte": time()}}
+        ):
+            self.release_admission(admission["id"])
+
+    def _drain_time(self, excess: int, search_params: Dict[str, Any], window: float = 60.0) -> int:
+        """
+        Estimates how long the queue takes to dispatch a number of operations, from the rate
+        operations were dispatched at recently.
+
+        Args:
+            excess (int): The number of operations.
+            search_params (Dict[str, Any]): Restricts the dispatched operations considered, e.g. to a caller.
+            window (float, optional): The time in seconds the rate is measured over, also the longest
+                estimate returned. Defaults to 60.0.
+
+        Returns:
+            int: The estimate in whole seconds, at least 1.
+        """
+        dispatched = self._db_conn.count(
+            {"_collection": "operations"},
+            {**search_params, "dispatched_at": {"$gte": time() - window}},
+        )
+        if not dispatched:
+            return int(window)
+        return max(1, min(int(window), math.ceil(excess * window / dispatched)))
+
+    def add_operation(
+        self,
+        operation: Operation,
+        device_class: Optional[str] = None,
+        device_module_path: Optional[str] = None,
+    ) -> None:
+        """
+            Adds an operation to the queue of its target station.
 
             Args:
                 operation (Operation): The operation to be added to the queue.
+                device_class (Optional[str], optional): If given, the operation may run on any idle
+                    device of this class instead of its target entity. Defaults to None.
+                device_module_path (Optional[str], optional): Restricts device_class to the devices
+                    of this module. Defaults to None.
+
+            Raises:
+                HTTPException: If the station of the target entity, or a station owning a device
+                    of the given class, cannot be found.
+        """
+        if device_class is not None:
+            self._add_pooled_operation(operation, device_class, device_module_path)
+            return
+
+        station_id = self.resolve_station_id(operation)
+        self._logger.debug(f"Adding operation {operation.id} to queue of station {station_id}")
+
+        # storing the target station makes the operation visible to every dispatcher
+        queued_at = time()
+        self._db_conn.find_and_update(
+            {"_collection": "operations"},
+            {"id": str(operation.id), "status": OperationStatus.CREATED},
+            {
+                "station_id": station_id,
+                "queued_at": queued_at,
+                "expires_at": self._expires_at(operation, queued_at),
+                "fair_tag": self._fair_tags(operation.caller_id, 1)[0],
+            },
+        )
+        self.notify(station_id)
+
+    def _add_pooled_operation(
+        self,
+        operation: Operation,
+        device_class: str,
+        device_module_path: Optional[str],
+    ) -> None:
+        """
+        Adds an operation to the queue of every station owning a device of the given class.
+
+        Args:
+            operation (Operation): The operation to be added to the queue.
+            device_class (str): The class of the devices the operation may run on.
+            device_module_path (Optional[str]): The module of the devices the operation may run on, any if None.
+
+        Raises:
+            HTTPException: If no station owns a device of the given class.
+        """
+        stations = self._pool_stations(device_class, device_module_path)
+        if not stations:
+            raise HTTPException(
+                status_code=404, detail=f"no station with a {device_class} device found"
+            )
+        self._logger.debug(
+            f"Adding operation {operation.id} to the {device_class} pool of stations {stations}"
+        )
+
+        # without a station, the operation is visible to the dispatchers of every matching station
+        queued_at = time()
+        self._db_conn.find_and_update(
+            {"_collection": "operations"},
+            {"id": str(operation.id), "status": OperationStatus.CREATED},
+            {
+                "station_id": None,
+                "device_class": device_class,
+                "device_module_path": device_module_path,
+                "queued_at": queued_at,
+                "expires_at": self._expires_at(operation, queued_at),
+                "fair_tag": self._fair_tags(operation.caller_id, 1)[0],
+            },
+        )
+        for station_id in stations:
+            self.notify(station_id)
+
+    def add_operations(
+        self,
+        operations: List[Operation],
+        pools: Optional[List[Optional[Tuple[str, Optional[str]]]]] = None,
+    ) -> None:
+        """
+        Stores and queues many new operations with a single bulk write. The target stations of
+        every operation are resolved first, so either all operations are queued or none is.
+
+        Args:
+            operations (List[Operation]): The operations to be stored and queued, in submission order.
+            pools (Optional[List[Optional[Tuple[str, Optional[str]]]]], optional): For every operation, None
+                to run it on its target entity, or the device class and module path of the devices it may
+                run on instead. Defaults to None.
+
+        Raises:
+            HTTPException: If the station of a target entity, or a station owning a device of a
+                given class, cannot be found.
+        """
+        pools = pools or [None] * len(operations)
+        station_ids: Dict[str, str] = {}
+        pool_stations: Dict[Tuple[str, Optional[str]], List[str]] = {}
+        queued_at = time()
+        docs = []
+        for operation, pool in zip(operations, pools):
+            doc = json.loads(operation.model_dump_json())
+            if pool is None:
+                entity_id = str(operation.entity_id)
+                if entity_id not in station_ids:
+                    station_ids[entity_id] = self.resolve_station_id(operation)
+                doc["station_id"] = station_ids[entity_id]
+            else:
+                if pool not in pool_stations:
+                    pool_stations[pool] = self._pool_stations(*pool)
+                    if not pool_stations[pool]:
+                        raise HTTPException(
+                            status_code=404, detail=f"no station with a {pool[0]} device found"
+                        )
+                doc["station_id"] = None
+                doc["device_class"], doc["device_module_path"] = pool
+            doc["queued_at"] = queued_at
+            doc["expires_at"] = self._expires_at(operation, queued_at)
+            docs.append(doc)
+
+        # one finish tag update per caller, consecutive operations of a caller get consecutive tags
+        counts: Dict[str, int] = {}
+        for operation in operations:
+            counts[operation.caller_id] = counts.get(operation.caller_id, 0) + 1
+        tags = {caller_id: iter(self._fair_tags(caller_id, count)) for caller_id, count in counts.items()}
+        for doc in docs:
+            doc["fair_tag"] = next(tags[doc["caller_id"]])
+
+        self._db_conn.create_many({"_collection": "operations"}, docs)
+        self._logger.debug(f"Added {len(docs)} operations to the queue")
+
+        for station_id in set(station_ids.values()).union(*pool_stations.values()):
+            self.notify(station_id)
+
+    def _expires_at(self, operation: Operation, queued_at: float) -> Optional[float]:
+        """
+        Computes when a queued operation expires.
+
+        Args:
+            operation (Operation): The operation.
+            queued_at (float): When the operation was queued (seconds since the epoch).
+
+        Returns:
+            Optional[float]: The time the operation expires at, or None if it may wait indefinitely.
+        """
+        if operation.queue_timeout is None:
+            return None
+        return queued_at + operation.queue_timeout
+
+    def _fair_tags(self, caller_id: str, count: int) -> List[float]:
+        """
+        Computes the start tags of new operations of the given caller and advances the caller's finish tag past them.
+
+        Args:
+            caller_id (str): The ID of the caller submitting the operations.
+            count (int): The number of operations submitted.
+
+        Returns:
+            List[float]: The start tags in submission order, operations with lower tags are dispatched first.
         """
-        self._logger.debug(f"Adding operation {operation.id} to queue")
-        self.op_queue.append(operation)
+        virtual_time = self._db_conn.find(
+            {"_collection": "fair_shares"}, {"id": "virtual_time"}
+        )
+        virtual_time = virtual_time["tag"] if virtual_time else 0.0
+
+        # a caller that was idle starts at the current virtual time, not where it left off
+        cost = 1.0 / self._caller_weights.get(str(caller_id), 1.0)
+        self._db_conn.find_and_update(
+            {"_collection": "fair_shares"},
+            {"id": str(caller_id)},
+            None,
+            maximum={"tag": virtual_time},
+            upsert=True,
+        )
+        share = self._db_conn.find_and_update(
+            {"_collection": "fair_shares"},
+            {"id": str(caller_id)},
+            None,
+            increment={"tag": cost * count},
+        )
+        start = share["tag"] - cost * count
+        return [start + i * cost for i in range(count)]
+
+    def _claim_operation(
+        self, station_id: str, op_query: Dict[str, Any], slots: int = 0
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Claims the next queued operation matching the search parameters for a station and
+        advances the lab's virtual time to its tag.
+
+        Args:
+            station_id (str): The ID of the station the operation is dispatched to.
+            op_query (Dict[str, Any]): The search parameters matching the runnable operations.
+            slots (int, optional): Number of station slots already taken for the operation, recorded
+                on it so that they are handed back even if this scheduler stops. Defaults to 0.
+
+        Returns:
+            Optional[Dict[str, Any]]: The claimed operation document, or None if none matched.
+        """
+        claim = {
+            "status": OperationStatus.ASSIGNED,
+            "station_id": station_id,
+            "dispatched_at": time(),
+            "dispatcher": self._worker_id,
+        }
+        if slots:
+            claim["holds_slots"] = slots
+        op = self._db_conn.find_and_update(
+            {"_collection": "operations"},
+            op_query,
+            claim,
+            sort=self.CLAIM_ORDER,
+        )
+        if op is not None and op.get("fair_tag") is not None:
+            self._db_conn.find_and_update(
+                {"_collection": "fair_shares"},
+                {"id": "virtual_time"},
+                None,
+                maximum={"tag": op["fair_tag"]},
+                upsert=True,
+            )
+        return op
+
+    def _pool_stations(
+        self, device_class: str, device_module_path: Optional[str] = None
+    ) -> List[str]:
+        """
+        Finds the stations owning a device or robot of the given class, the same ones
+        _idle_devices binds pooled operations to.
+
+        Args:
+            device_class (str): The class of the devices.
+            device_module_path (Optional[str], optional): The module of the devices, any if None. Defaults to None.
+
+        Returns:
+            List[str]: The IDs of the stations.
+        """
+        search_params = {"cls": device_class, "owner_station": {"$ne": None}}
+        if device_module_path is not None:
+            search_params["module_path"] = device_module_path
+        stations = set()
+        for collection in ["devices", "robots"]:
+            stations.update(
+                str(station_id)
+                for station_id in self._db_conn.distinct(
+                    {"_collection": collection}, "owner_station", search_params
+                )
+            )
+        return sorted(stations)
+
+    def notify(self, station_id: Optional[str] = None) -> None:
+        """
+        Wakes up the scheduling loop, e.g. after a station became idle or its lock was released.
+
+        Args:
+            station_id (Optional[str], optional): The station that changed. If None, every
+                station with queued operations is checked. Defaults to None.
+        """
+        with self._wakeup:
+            if station_id is None:
+                self._sweep = True
+            else:
+                self._dirty_stations.add(str(station_id))
+            self._wakeup.notify()
+
+    def add_completion_listener(
+        self, listener: Callable[[List[Operation]], None]
+    ) -> None:
+        """
+        Registers a function called, from a worker thread, with the operations this scheduler
+        saw return from their station or failed itself. The operations may have been requeued
+        instead of completed, listeners have to check their status.
+
+        Args:
+            listener (Callable[[List[Operation]], None]): The function to call.
+        """
+        self._completion_listeners.append(listener)
+
+    def _notify_completed(self, operations: List[Operation]) -> None:
+        """
+        Wakes up the requests waiting for the given operations and calls the completion listeners with them.
+
+        Args:
+            operations (List[Operation]): The operations that finished.
+        """
+        for op in operations:
+            self._completions.notify(str(op.id))
+        for listener in self._completion_listeners:
+            try:
+                listener(operations)
+            except Exception as e:
+                self._logger.error(f"Completion listener failed: {e}")
 
     def run(self) -> None:
         """
@@ -45,87 +653,1187 @@ class Scheduler:
 
     def _schedule(self) -> None:
         """
-        The main scheduling loop that processes operations in the queue.
+        The main scheduling loop that dispatches the queued operations of changed stations.
         """
+        self._heartbeat()
+        try:
+            self._recover()
+        except Exception as e:
+            self._logger.error(f"Recovering unfinished operations failed: {e}")
+        try:
+            self._durations.load_history()
+        except Exception as e:
+            self._logger.error(f"Loading the operation history failed: {e}")
+
+        # start with a sweep to pick up the queue left behind by a previous run
+        with self._wakeup:
+            self._sweep = True
+
         while not self._stop:
-            queue = self.op_queue.copy()
-            for operation in queue:
-                # resolve station id and endpoint
-                station_id = self._resolve_station_id(operation)
-
-                # check station status
-                station_status = self._db_conn.read(
-                    {"id": station_id, "_collection": "stations"},
-                    "status",
+            if time() - self._last_heartbeat >= self._idle_timeout:
+                try:
+                    self._heartbeat()
+                except Exception as e:
+                    self._logger.error(f"Heartbeat failed: {e}")
+            # on elapsed time only, claims of stopped schedulers matter most while the lab is busy
+            if time() - self._last_recovery >= self._dispatcher_timeout:
+                try:
+                    self._recover()
+                except Exception as e:
+                    self._logger.error(f"Recovering unfinished operations failed: {e}")
+
+            with self._wakeup:
+                if not self._dirty_stations and not self._sweep:
+                    self._wakeup.wait(timeout=max(0.0, self._last_sweep + self._idle_timeout - time()))
+                stations = self._dirty_stations
+                self._dirty_stations = set()
+                # on elapsed time as well, wake-ups of a busy lab would otherwise postpone the sweep forever
+                sweep = self._sweep or time() - self._last_sweep >= self._idle_timeout
+                self._sweep = False
+
+            if self._stop:
+                break
+
+            if sweep:
+                self._last_sweep = time()
+                # pick up work queued through other workers and refresh the station states
+                self._station_states.invalidate()
+                stations.update(self._queued_stations())
+                try:
+                    self._expire_operations()
+                except Exception as e:
+                    self._logger.error(f"Purging expired operations failed: {e}")
+                try:
+                    self._expire_admissions()
+                except Exception as e:
+                    self._logger.error(f"Purging expired admissions failed: {e}")
+
+            for station_id in stations:
+                try:
+                    self._dispatch_station(station_id)
+                except Exception as e:
+                    self._logger.error(f"Dispatching to station {station_id} failed: {e}")
+
+    def _expire_operations(self) -> None:
+        """
+        Completes the queued operations that waited past their queue timeout as failed.
+        They were never claimed, so no station is involved.
+        """
+        expired = self._db_conn.find_all(
+            {"_collection": "operations"},
+            {"status": OperationStatus.CREATED, "expires_at": {"$lte": time()}},
+        )
+        purged = [
+            op
+            for op in expired
+            if self.fail_operation(
+                op["id"],
+                OperationStatus.CREATED,
+                f"Operation expired after waiting {op['queue_timeout']} seconds in the queue",
+            )
+        ]
+        if purged:
+            self._logger.info(f"Purged {len(purged)} expired operations from the queue")
+            self._notify_completed([self._to_operation(op) for op in purged])
+
+    def _queued_stations(self) -> Set[str]:
+        """
+        Finds every station that may run one of the queued operations.
+
+        Returns:
+            Set[str]: The IDs of the stations.
+        """
+        stations = set(
+            self._db_conn.distinct(
+                {"_collection": "operations"}, "station_id", self._queued_query()
+            )
+        )
+        stations.discard(None)
+
+        pooled = self._db_conn.find_all(
+            {"_collection": "operations"},
+            {"status": OperationStatus.CREATED, "station_id": None, "device_class": {"$ne": None}},
+        )
+        pools = {(op["device_class"], op.get("device_module_path")) for op in pooled}
+        for device_class, device_module_path in pools:
+            stations.update(self._pool_stations(device_class, device_module_path))
+        return stations
+
+    def _heartbeat(self) -> None:
+        """
+        Records that this scheduler is running, so that the other workers leave its claims alone.
+        """
+        self._last_heartbeat = time()
+        self._db_conn.find_and_update(
+            {"_collection": "schedulers"},
+            {"id": self._worker_id},
+            {"heartbeat_at": self._last_heartbeat},
+            upsert=True,
+        )
+
+    def _recover(self) -> None:
+        """
+        Reconciles the operations claimed by schedulers that stopped, in a previous run of the lab
+        server or in a lab server worker that crashed. A scheduler counts as stopped once its heartbeat
+        is older than the dispatcher timeout, so claims of running schedulers, including ones made a
+        moment ago by another worker, are never touched. Every worker runs the recovery on start and
+        then periodically, each change is a compare-and-set on the stopped scheduler's claim.
+
+        Operations that were claimed but never reached their station are queued again, and the station
+        and device claimed for them are released even though they are marked busy. Operations in
+        progress are left alone while their station, or device on stations running several operations
+        at the same time, is busy executing them, and are completed as failed otherwise instead of being
+        run a second time. The slots the reconciled operations held are handed back.
+        """
+        now = time()
+        self._last_recovery = now
+        live = [
+            scheduler["id"]
+            for scheduler in self._db_conn.find_all(
+                {"_collection": "schedulers"},
+                {"heartbeat_at": {"$gte": now - self._dispatcher_timeout}},
+            )
+        ]
+        live.append(self._worker_id)
+
+        # claims made before dispatchers were recorded have no dispatcher and are matched as well
+        orphans = self._db_conn.find_all(
+            {"_collection": "operations"},
+            {
+                "queued_at": {"$ne": None},
+                "dispatcher": {"$nin": live},
+                "$or": [
+                    {"status": {"$in": [OperationStatus.ASSIGNED, OperationStatus.IN_PROGRESS]}},
+                    {"holds_slots": {"$gt": 0}},
+                ],
+            },
+        )
+        if not orphans:
+            return
+
+        # station states may have changed while nobody was dispatching to them
+        self._station_states.invalidate()
+
+        # stations still working through a batch sent by a stopped scheduler
+        running = {
+            op["station_id"] for op in orphans if op["status"] == OperationStatus.IN_PROGRESS
+        }
+
+        stations = set()
+        sweep = False
+        interrupted = []
+        for op in orphans:
+            station_id = op["station_id"]
+            max_concurrent_ops = self._station_states.get(station_id, "max_concurrent_ops") or 1
+
+            if op["status"] == OperationStatus.ASSIGNED:
+                if max_concurrent_ops == 1 and station_id in running:
+                    # the station runs the rest of the batch once it is done with the current operation
+                    continue
+                # hand the slots back before another scheduler can claim the operation
+                self._release_orphan_slots(op, max_concurrent_ops)
+                if not self._requeue_operation(op["id"], op.get("dispatcher")):
+                    continue
+                self._logger.info(f"Requeued operation {op['id']} that never reached its station")
+                stations.add(station_id)
+                sweep = sweep or op.get("device_class") is not None
+                if op["entity_type"] != "station":
+                    self._release_device(self._entity_document(op))
+                if max_concurrent_ops == 1:
+                    self._db_conn.find_and_update(
+                        {"_collection": "stations"},
+                        {
+                            "id": station_id,
+                            "status": ActivityStatus.BUSY,
+                            "dispatcher": op.get("dispatcher"),
+                        },
+                        {"status": ActivityStatus.IDLE},
+                    )
+                    self._station_states.invalidate(station_id)
+
+            elif op["status"] == OperationStatus.IN_PROGRESS:
+                if self._still_running(op, max_concurrent_ops):
+                    continue
+                self._logger.warning(f"Operation {op['id']} was interrupted, marking it as failed")
+                if op["entity_type"] != "station":
+                    self._release_device(self._entity_document(op))
+                if self.fail_operation(
+                    op["id"],
+                    OperationStatus.IN_PROGRESS,
+                    "Operation was interrupted and has not been run to completion",
+                ):
+                    interrupted.append(op)
+                self._release_orphan_slots(op, max_concurrent_ops)
+                stations.add(station_id)
+
+            else:
+                # completed by its station after its scheduler stopped
+                self._release_orphan_slots(op, max_concurrent_ops)
+                stations.add(station_id)
+
+        self._logger.info(
+            f"Reconciled {len(orphans)} operations of stopped schedulers across {len(stations)} stations"
+        )
+        with self._wakeup:
+            self._dirty_stations.update(stations)
+            self._sweep = self._sweep or sweep
+            self._wakeup.notify()
+
+        if interrupted:
+            self._notify_completed([self._to_operation(op) for op in interrupted])
+
+    def _still_running(self, op: Dict[str, Any], max_concurrent_ops: int) -> bool:
+        """
+        Checks whether an operation in progress is still being executed by its station.
+
+        Args:
+            op (Dict[str, Any]): The operation document.
+            max_concurrent_ops (int): The number of operations its station may run at the same time.
+
+        Returns:
+            bool: True if the station, or the target device on a station running several operations
+                at the same time, is busy.
+        """
+        if op["entity_type"] != "station" and max_concurrent_ops > 1:
+            entity = self._entity_document(op)
+            status = self._db_conn.read(entity, "status")
+        else:
+            status = self._station_states.get(op["station_id"], "status")
+        return status == ActivityStatus.BUSY
+
+    def _entity_document(self, op: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Builds the reference to the device or robot targeted by an operation.
+
+        Args:
+            op (Dict[str, Any]): The operation document.
+
+        Returns:
+            Dict[str, Any]: The ID of the entity, tagged with its collection.
+        """
+        return {
+            "id": str(op["entity_id"]),
+            "_collection": "robots" if op["entity_type"] == "robot" else "devices",
+        }
+
+    def _release_orphan_slots(self, op: Dict[str, Any], max_concurrent_ops: int) -> None:
+        """
+        Hands back the slots held by an operation claimed by a stopped scheduler.
+
+        Args:
+            op (Dict[str, Any]): The operation document.
+            max_concurrent_ops (int): The number of operations its station may run at the same time.
+        """
+        if max_concurrent_ops == 1:
+            return
+        slots = op.get("holds_slots")
+        if slots is None:
+            # claimed before the slots were recorded on the operations
+            slots = max_concurrent_ops if op["entity_type"] == "station" else 1
+        if slots:
+            self._release_slots(op["station_id"], slots, op)
+
+    def _requeue_operation(self, operation_id: str, dispatcher: Optional[str]) -> bool:
+        """
+        Puts an operation that was claimed but not run back in the queue. Operations queued for
+        a device pool are released from the station they were bound to.
+
+        Args:
+            operation_id (str): The ID of the operation.
+            dispatcher (Optional[str]): The scheduler that claimed the operation.
+
+        Returns:
+            bool: True if the operation was requeued, False if it was claimed again or its status
+                changed in the meantime.
+        """
+        op = self._db_conn.find_and_update(
+            {"_collection": "operations"},
+            {"id": str(operation_id), "status": OperationStatus.ASSIGNED, "dispatcher": dispatcher},
+            {"status": OperationStatus.CREATED, "dispatcher": None},
+        )
+        if op is None:
+            return False
+        if op.get("device_class") is not None:
+            self._db_conn.find_and_update(
+                {"_collection": "operations"},
+                {"id": op["id"], "status": OperationStatus.CREATED, "station_id": op["station_id"]},
+                {"station_id": None},
+            )
+        return True
+
+    def fail_operation(
+        self, operation_id: str, status: OperationStatus, error: str
+    ) -> bool:
+        """
+        Completes an operation with a failed result, unless its status changed in the meantime.
+
+        Args:
+            operation_id (str): The ID of the operation.
+            status (OperationStatus): The status the operation is expected to be in.
+            error (str): Description of the failure stored on the result.
+
+        Returns:
+            bool: True if the operation was completed, False if its status changed in the meantime.
+        """
+        result = OperationResult(
+            success=False,
+            error=error,
+            collection="operation_results",
+            module_path="ochra.discovery.equipment.operation_result",
+        )
+        self._db_conn.create(
+            {"_collection": "operation_results"}, json.loads(result.model_dump_json())
+        )
+        failed = self._db_conn.find_and_update(
+            {"_collection": "operations"},
+            {"id": str(operation_id), "status": status},
+            {
+                "result": str(result.id),
+                "end_timestamp": datetime.now().isoformat(),
+                "status": OperationStatus.COMPLETED,
+            },
+        ) is not None
+        if failed:
+            self._completions.notify(str(operation_id))
+        return failed
+
+    def cancel_operation(self, operation_id: str) -> bool:
+        """
+        Cancels an operation. Queued operations, including held workflow steps, are completed as
+        failed right away without involving their station. For dispatched operations the station is
+        asked to cancel them: it signals the running method and completes the operation as failed
+        once the method returned, or gave up waiting for it, freeing the station.
+
+        Args:
+            operation_id (str): The ID of the operation.
+
+        Returns:
+            bool: True if the operation was cancelled or its station was asked to, False if it had already completed.
+
+        Raises:
+            HTTPException: If the operation does not exist or its station cannot be reached.
+        """
+        op = self._db_conn.find({"_collection": "operations"}, {"id": str(operation_id)})
+        if op is None:
+            raise HTTPException(status_code=404, detail=f"operation {operation_id} not found")
+
+        if op["status"] == OperationStatus.CREATED:
+            if self.fail_operation(op["id"], OperationStatus.CREATED, "Operation was cancelled"):
+                self._logger.info(f"Cancelled queued operation {op['id']}")
+                self._notify_completed([self._to_operation(op)])
+                return True
+            # claimed in the meantime
+            op = self._db_conn.find({"_collection": "operations"}, {"id": op["id"]})
+
+        if op["status"] == OperationStatus.COMPLETED:
+            return False
+
+        try:
+            self._get_station_connection(op["station_id"]).cancel_op(op["id"])
+        except LabEngineException as e:
+            raise HTTPException(
+                status_code=502,
+                detail=f"station {op['station_id']} could not be asked to cancel: {e}",
+            )
+        self._logger.info(f"Asked station {op['station_id']} to cancel operation {op['id']}")
+        return True
+
+    def _queued_query(
+        self, station_id: Optional[str] = None, devices: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Builds the search parameters matching queued operations.
+
+        Args:
+            station_id (Optional[str], optional): Only match operations queued for this station. Defaults to None.
+            devices (Optional[List[Dict[str, Any]]], optional): Idle devices of the station, operations queued
+                for the pool of one of them are matched as well. Defaults to None.
+
+        Returns:
+            Dict[str, Any]: The search parameters.
+        """
+        # expired operations stay out of the queue until they are purged
+        not_expired = [{"expires_at": {"$lte": time()}}]
+        if station_id is None:
+            return {
+                "status": OperationStatus.CREATED,
+                "queued_at": {"$ne": None},
+                "$nor": not_expired,
+            }
+        if not devices:
+            return {
+                "status": OperationStatus.CREATED,
+                "station_id": station_id,
+                "$nor": not_expired,
+            }
+
+        pools = {}
+        for device in devices:
+            pools.setdefault(device["cls"], set()).add(device.get("module_path"))
+        return {
+            "status": OperationStatus.CREATED,
+            "$nor": not_expired,
+            "$or": [{"station_id": station_id}]
+            + [
+                {
+                    "station_id": None,
+                    "device_class": device_class,
+                    "device_module_path": {"$in": [None] + list(module_paths)},
+                }
+                for device_class, module_paths in pools.items()
+            ],
+        }
+
+    def _dispatch_station(self, station_id: str) -> None:
+        """
+        Dispatches the next runnable operations queued for the given station, if the station is free.
+
+        Args:
+            station_id (str): The ID of the station to dispatch to.
+        """
+        max_concurrent_ops = self._station_states.get(station_id, "max_concurrent_ops")
+        if max_concurrent_ops is not None and max_concurrent_ops > 1:
+            self._dispatch_devices(station_id, max_concurrent_ops)
+            return
+
+        # the station has not returned the previous operation yet
+        if self._in_flight.get(station_id):
+            return
+
+        # every worker is busy, retry when one frees up
+        if self._defer_if_saturated(station_id):
+            return
+
+        # skip stations known to be busy without touching the db
+        if self._station_states.get(station_id, "status") != ActivityStatus.IDLE:
+            return
+
+        # claim the station, only one dispatcher can move it from IDLE to BUSY
+        station = self._db_conn.find_and_update(
+            {"_collection": "stations"},
+            {"id": station_id, "status": ActivityStatus.IDLE},
+            {"status": ActivityStatus.BUSY, "dispatcher": self._worker_id},
+        )
+        if station is None:
+            self._station_states.invalidate(station_id)
+            return
+        self._station_states.update(station_id, "status", ActivityStatus.BUSY)
+
+        # idle devices of the station can take operations queued for their device class
+        devices = self._idle_devices(station_id)
+
+        # claim the next operations for the station, only the lock holder's may run on a locked station
+        op_query = self._queued_query(station_id, devices)
+        lock_holder = self._lock_holder(station)
+        if lock_holder:
+            op_query["caller_id"] = lock_holder
+
+        # devices in error, e.g. still running a stopped method, take nothing until they recover
+        failed_ids = self._failed_devices(station_id)
+        if failed_ids:
+            op_query["$nor"] = op_query["$nor"] + [
+                {"device_class": None, "entity_id": {"$in": failed_ids}}
+            ]
+
+        # a workflow step about to be released may hold the station
+        reservation = self._reservation(station_id) if self._backfill else None
+        operations = []
+        busy_until = time()
+        while len(operations) < self._batch_size:
+            if reservation is None:
+                op = self._claim_operation(station_id, op_query)
+            else:
+                op, busy_until = self._claim_before(station_id, op_query, reservation, busy_until)
+            if op is None:
+                break
+            try:
+                if op.get("device_class") is not None:
+                    op = self._bind_device(op, devices, len(operations))
+                operations.append(self._to_operation(op))
+            except ValueError as e:
+                self.fail_operation(op["id"], OperationStatus.ASSIGNED, str(e))
+
+        if not operations:
+            self._release_station(station_id)
+            return
+
+        self._submit(operations, station_id)
+
+    def _dispatch_devices(self, station_id: str, max_concurrent_ops: int) -> None:
+        """
+        Dispatches queued operations to the idle devices of a station running several
+        operations at the same time, until its slots or the runnable operations run out.
+
+        Args:
+            station_id (str): The ID of the station to dispatch to.
+            max_concurrent_ops (int): The number of operations the station may run at the same time.
+        """
+        while self._in_flight.get(station_id, 0) < max_concurrent_ops:
+            if self._defer_if_saturated(station_id):
+                return
+            if not self._dispatch_device_op(station_id, max_concurrent_ops):
+                return
+
+    def _dispatch_device_op(self, station_id: str, max_concurrent_ops: int) -> bool:
+        """
+        Claims a slot of the station, then the next runnable operation and its target device.
+
+        Args:
+            station_id (str): The ID of the station to dispatch to.
+            max_concurrent_ops (int): The number of operations the station may run at the same time.
+
+        Returns:
+            bool: True if an operation was dispatched.
+        """
+        # skip stations known to be in error without touching the db
+        if self._station_states.get(station_id, "status") == ActivityStatus.ERROR:
+            return False
+
+        # claim a slot, at most max_concurrent_ops dispatchers get one
+        station = self._db_conn.find_and_update(
+            {"_collection": "stations"},
+            {
+                "id": station_id,
+                "status": {"$ne": ActivityStatus.ERROR},
+                "running_ops": {"$not": {"$gte": max_concurrent_ops}},
+            },
+            None,
+            increment={"running_ops": 1},
+        )
+        if station is None:
+            return False
+        slots = 1
+
+        devices = self._idle_devices(station_id)
+        entity_ids = [device["id"] for device in devices] + [station_id]
+        op_query = self._queued_query(station_id, devices)
+        op_query["$and"] = [
+            {"$or": [{"station_id": None}, {"entity_id": {"$in": entity_ids}}]}
+        ]
+        lock_holder = self._lock_holder(station)
+        if lock_holder:
+            op_query["caller_id"] = lock_holder
+
+        # operations on the station itself wait for the station to empty, hold it for them
+        reserved_query = dict(self._queued_query(station_id), entity_type="station")
+        if lock_holder:
+            reserved_query["caller_id"] = lock_holder
+        if self._db_conn.find({"_collection": "operations"}, reserved_query) is None:
+            op_query["$and"].append({"entity_type": {"$ne": "station"}})
+            op = self._claim_operation(station_id, op_query, slots)
+        else:
+            op = self._claim_with_reservation(
+                station_id, op_query, station["running_ops"] == 1
+            )
+        if op is None:
+            self._release_slots(station_id, slots)
+            return False
+
+        device = None
+        if op.get("device_class") is not None:
+            op = self._bind_device(op, devices, 0)
+        if op["entity_type"] == "station":
+            # take the remaining slots so that nothing else starts next to it
+            if self._db_conn.find_and_update(
+                {"_collection": "stations"},
+                {"id": station_id, "running_ops": 1},
+                {"running_ops": max_concurrent_ops},
+            ) is not None:
+                slots = max_concurrent_ops
+                self._db_conn.find_and_update(
+                    {"_collection": "operations"},
+                    {"id": op["id"], "dispatcher": self._worker_id},
+                    {"holds_slots": slots},
                 )
+            else:
+                device = False
+        else:
+            device = next(
+                (device for device in devices if device["id"] == op["entity_id"]), None
+            )
+            # claim the device, only one dispatcher can move it from IDLE to BUSY
+            if device is None or self._db_conn.find_and_update(
+                {"_collection": device["_collection"]},
+                {"id": device["id"], "status": ActivityStatus.IDLE},
+                {"status": ActivityStatus.BUSY},
+            ) is None:
+                device = False
+
+        if device is False:
+            # lost the race for the station or device, retry once it changes
+            self._release_slots(station_id, slots, self._own_claim(op["id"], slots))
+            self._requeue_operation(op["id"], self._worker_id)
+            return False
+
+        try:
+            operation = self._to_operation(op)
+        except ValueError as e:
+            self.fail_operation(op["id"], OperationStatus.ASSIGNED, str(e))
+            if device is not None:
+                self._release_device(device)
+            self._release_slots(station_id, slots, self._own_claim(op["id"], slots))
+            return True
 
-                if station_status == ActivityStatus.IDLE:
-                    # check if station is locked by a user
-                    station_locked_by = self._db_conn.read(
-                        {"id": station_id, "_collection": "stations"},
-                        "locked",
+        self._submit([operation], station_id, slots, device)
+        return True
+
+    def _claim_with_reservation(
+        self, station_id: str, op_query: Dict[str, Any], empty: bool
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Claims the next runnable operation of a station that has an operation on the station
+        itself queued, following EASY backfilling. Operations ahead of the first station-wide
+        operation run as usual. That operation reserves the station from the time its running
+        operations are expected to be done, operations behind it only start if they are expected
+        to finish before then. Operations without a duration estimate are never backfilled.
+
+        Args:
+            station_id (str): The ID of the station to dispatch to.
+            op_query (Dict[str, Any]): The search parameters matching the runnable operations.
+            empty (bool): Whether nothing else runs on the station.
+
+        Returns:
+            Optional[Dict[str, Any]]: The claimed operation document, or None if none may start.
+        """
+        reserved_from = None
+        for op in self._candidates(op_query):
+            if op["entity_type"] == "station":
+                if empty:
+                    claimed = self._claim_operation(
+                        station_id, {"id": op["id"], "status": OperationStatus.CREATED}, 1
                     )
+                    if claimed is not None:
+                        return claimed
+                elif reserved_from is None:
+                    if not self._backfill:
+                        # nothing overtakes the operation waiting for the station
+                        return None
+                    reserved_from = self._expected_free_at(station_id)
+                continue
 
-                    if not station_locked_by or station_locked_by == str(
-                        operation.caller_id
-                    ):
-                        # remove operation from queue
-                        self.op_queue.remove(operation)
-
-                        # execute operation in a new daemon thread
-                        op_thread = Thread(
-                            target=self._execute_op,
-                            args=(operation, station_id),
-                            daemon=True,
-                        )
-                        self._logger.debug(f"Starting operation execution for {operation.id}")
-                        op_thread.start()
-                        sleep(1)  # needed to allow the station to update its status
-            # update queue in db and sleep
-            if queue != self.op_queue:
-                self._db_conn.update(
-                    {"id": self._queue_id, "_collection": "lab"},
-                    {
-                        "property": "op_queue",
-                        "property_value": [
-                            op.get_base_model().model_dump_json()
-                            for op in self.op_queue
-                        ],
-                        "patch_type": PatchType.SET,
-                        "patch_args": None,
-                    },
+            if reserved_from is not None:
+                duration = self._expected_duration(op)
+                if duration is None or time() + duration > reserved_from:
+                    continue
+                self._logger.debug(
+                    f"Backfilling operation {op['id']} ahead of the reservation of station {station_id}"
+                )
+            claimed = self._claim_operation(
+                station_id, {"id": op["id"], "status": OperationStatus.CREATED}, 1
+            )
+            if claimed is not None:
+                return claimed
+        return None
+
+    def _expected_free_at(self, station_id: str) -> float:
+        """
+        Estimates when the operations running on a station will be done.
+
+        Args:
+            station_id (str): The ID of the station.
+
+        Returns:
+            float: The expected time (seconds since the epoch), or the current time if the
+                duration of a running operation is unknown.
+        """
+        now = time()
+        free_at = now
+        for op in self._db_conn.find_all(
+            {"_collection": "operations"},
+            {
+                "station_id": station_id,
+                "status": {"$in": [OperationStatus.ASSIGNED, OperationStatus.IN_PROGRESS]},
+            },
+        ):
+            duration = self._expected_duration(op)
+            if duration is None or op.get("dispatched_at") is None:
+                return now
+            free_at = max(free_at, op["dispatched_at"] + duration)
+        return free_at
+
+    def _candidates(self, op_query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Reads the operations matching the search parameters in claim order.
+
+        Args:
+            op_query (Dict[str, Any]): The search parameters matching the runnable operations.
+
+        Returns:
+            List[Dict[str, Any]]: The operation documents.
+        """
+        candidates = self._db_conn.find_all({"_collection": "operations"}, op_query)
+        candidates.sort(
+            key=lambda op: (
+                -op.get("priority", OperationPriority.NORMAL),
+                op.get("fair_tag") or 0.0,
+                op["queued_at"],
+            )
+        )
+        return candidates
+
+    def _expected_duration(self, op: Dict[str, Any]) -> Optional[float]:
+        """
+        Estimates how long an operation runs, pessimistically at the 90th percentile of its method.
+
+        Args:
+            op (Dict[str, Any]): The operation document.
+
+        Returns:
+            Optional[float]: The duration in seconds, or None if the method was never seen.
+        """
+        entity_class = op.get("device_class") or self._durations.entity_class(
+            op["entity_id"], op["entity_type"]
+        )
+        if entity_class is None:
+            return None
+        return self._durations.percentile(entity_class, op["method"], 90)
+
+    def _reservation(self, station_id: str) -> Optional[Tuple[float, int]]:
+        """
+        Finds the earliest reservation of a station running one operation at a time. A held workflow
+        step reserves its station from the time it is expected to be released, i.e. once the steps it
+        depends on, running on this or other stations, are expected to complete. Steps depending on
+        operations that have not started, or overran their estimate, are too uncertain to plan for.
+
+        Args:
+            station_id (str): The ID of the station.
+
+        Returns:
+            Optional[Tuple[float, int]]: The expected release time (seconds since the epoch) and the
+                priority of the step, or None if nothing reserves the station.
+        """
+        now = time()
+        reservation = None
+        for step in self._db_conn.find_all(
+            {"_collection": "operations"},
+            {"status": OperationStatus.CREATED, "held": True, "planned_station_id": station_id},
+        ):
+            released_at = self._expected_release(step.get("depends_on_ops") or [], now)
+            if released_at is None or released_at <= now:
+                continue
+            if reservation is None or released_at < reservation[0]:
+                reservation = (released_at, step.get("priority", OperationPriority.NORMAL))
+        return reservation
+
+    def _expected_release(self, dependency_ids: List[str], now: float) -> Optional[float]:
+        """
+        Estimates when the last of the given operations completes.
+
+        Args:
+            dependency_ids (List[str]): The IDs of the operations.
+            now (float): The current time (seconds since the epoch).
+
+        Returns:
+            Optional[float]: The expected time, or None if an operation has not started, its duration is
+                unknown or it already ran longer than expected.
+        """
+        if not dependency_ids:
+            return None
+        released_at = now
+        for op in self._db_conn.find_all(
+            {"_collection": "operations"}, {"id": {"$in": dependency_ids}}
+        ):
+            if op["status"] == OperationStatus.COMPLETED:
+                continue
+            if op["status"] == OperationStatus.CREATED or op.get("dispatched_at") is None:
+                return None
+            duration = self._expected_duration(op)
+            if duration is None or op["dispatched_at"] + duration < now:
+                return None
+            released_at = max(released_at, op["dispatched_at"] + duration)
+        return released_at
+
+    def _claim_before(
+        self,
+        station_id: str,
+        op_query: Dict[str, Any],
+        reservation: Tuple[float, int],
+        busy_until: float,
+    ) -> Tuple[Optional[Dict[str, Any]], float]:
+        """
+        Claims the next runnable operation of a reserved station that is expected to finish before the
+        reservation starts. Operations of a higher priority class than the reserving step are not held
+        back, operations without a duration estimate are never backfilled.
+
+        Args:
+            station_id (str): The ID of the station to dispatch to.
+            op_query (Dict[str, Any]): The search parameters matching the runnable operations.
+            reservation (Tuple[float, int]): The start and priority of the reservation, see _reservation.
+            busy_until (float): When the operations already claimed for the batch are expected to be done.
+
+        Returns:
+            Tuple[Optional[Dict[str, Any]], float]: The claimed operation document, or None if none fits,
+                and when the batch is expected to be done with it.
+        """
+        reserved_from, priority = reservation
+        for op in self._candidates(op_query):
+            duration = self._expected_duration(op)
+            if op.get("priority", OperationPriority.NORMAL) <= priority:
+                if duration is None or busy_until + duration > reserved_from:
+                    continue
+                self._logger.debug(
+                    f"Backfilling operation {op['id']} ahead of the reservation of station {station_id}"
                 )
-            sleep(1)
+            claimed = self._claim_operation(
+                station_id, {"id": op["id"], "status": OperationStatus.CREATED}
+            )
+            if claimed is not None:
+                return claimed, busy_until + (duration or 0.0)
+        return None, busy_until
+
+    def _defer_if_saturated(self, station_id: str) -> bool:
+        """
+        Remembers the station for later if every worker is busy.
+
+        Args:
+            station_id (str): The ID of the station waiting for a worker.
+
+        Returns:
+            bool: True if every worker is busy.
+        """
+        with self._wakeup:
+            if sum(self._in_flight.values()) < self._max_workers:
+                return False
+            self._deferred_stations.add(station_id)
+            return True
+
+    def _submit(
+        self,
+        operations: List[Operation],
+        station_id: str,
+        slots: int = 0,
+        device: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Hands claimed operations over to a worker.
+
+        Args:
+            operations (List[Operation]): The claimed operations.
+            station_id (str): The ID of the station where the operations will be executed.
+            slots (int, optional): Number of station slots held by the operations, 0 if the whole
+                station was claimed. Defaults to 0.
+            device (Optional[Dict[str, Any]], optional): The device claimed for the operations, if any. Defaults to None.
+        """
+        # reserve the worker until the operations return
+        with self._wakeup:
+            self._in_flight[station_id] = self._in_flight.get(station_id, 0) + 1
+
+        self._logger.debug(
+            f"Starting execution of operations {[str(op.id) for op in operations]}"
+        )
+        self._executor.submit(self._execute_ops, operations, station_id, slots, device)
+
+    def _idle_devices(self, station_id: str) -> List[Dict[str, Any]]:
+        """
+        Finds the idle devices and robots of a station.
+
+        Args:
+            station_id (str): The ID of the station.
+
+        Returns:
+            List[Dict[str, Any]]: The device documents, each tagged with its collection.
+        """
+        devices = []
+        for collection in ["devices", "robots"]:
+            for device in self._db_conn.find_all(
+                {"_collection": collection},
+                {"owner_station": station_id, "status": ActivityStatus.IDLE},
+            ):
+                device["_collection"] = collection
+                devices.append(device)
+        return devices
+
+    def _failed_devices(self, station_id: str) -> List[str]:
+        """
+        Finds the devices and robots of a station that are in error.
+
+        Args:
+            station_id (str): The ID of the station.
+
+        Returns:
+            List[str]: The IDs of the devices and robots.
+        """
+        return [
+            device["id"]
+            for collection in ["devices", "robots"]
+            for device in self._db_conn.find_all(
+                {"_collection": collection},
+                {"owner_station": station_id, "status": ActivityStatus.ERROR},
+            )
+        ]
+
+    def _release_device(self, device: Dict[str, Any]) -> None:
+        """
+        Hands a device claimed by this scheduler back if nothing else changed its status.
+
+        Args:
+            device (Dict[str, Any]): The device document, tagged with its collection.
+        """
+        self._db_conn.find_and_update(
+            {"_collection": device["_collection"]},
+            {"id": device["id"], "status": ActivityStatus.BUSY},
+            {"status": ActivityStatus.IDLE},
+        )
+
+    def _release_slots(
+        self, station_id: str, slots: int, claim: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Hands slots of a station running several operations at the same time back.
+
+        Args:
+            station_id (str): The ID of the station.
+            slots (int): The number of slots to release.
+            claim (Optional[Dict[str, Any]], optional): The id, holds_slots and dispatcher of the operation
+                holding the slots. They are only handed back if the operation still records them, so that
+                they are released once. None for slots not recorded on an operation. Defaults to None.
+        """
+        if claim is not None and self._db_conn.find_and_update(
+            {"_collection": "operations"},
+            {
+                "id": str(claim["id"]),
+                "holds_slots": claim.get("holds_slots"),
+                "dispatcher": claim.get("dispatcher"),
+            },
+            {"holds_slots": 0},
+        ) is None:
+            return
+        self._db_conn.find_and_update(
+            {"_collection": "stations"},
+            {"id": station_id},
+            None,
+            increment={"running_ops": -slots},
+        )
+
+    def _own_claim(self, operation_id: str, slots: int) -> Dict[str, Any]:
+        """
+        Describes the slots held by an operation claimed by this scheduler.
+
+        Args:
+            operation_id (str): The ID of the operation.
+            slots (int): The number of slots it holds.
+
+        Returns:
+            Dict[str, Any]: The claim, see _release_slots.
+        """
+        return {"id": str(operation_id), "holds_slots": slots, "dispatcher": self._worker_id}
+
+    def _bind_device(
+        self, op: Dict[str, Any], devices: List[Dict[str, Any]], position: int
+    ) -> Dict[str, Any]:
+        """
+        Binds an operation queued for a device pool to one of the matching devices of the station.
+
+        Args:
+            op (Dict[str, Any]): The claimed operation document.
+            devices (List[Dict[str, Any]]): The idle devices of the station.
+            position (int): Position of the operation in its batch, spreads a batch over the matching devices.
+
+        Returns:
+            Dict[str, Any]: The updated operation document.
+        """
+        matching = [
+            device
+            for device in devices
+            if device["cls"] == op["device_class"]
+            and op.get("device_module_path") in [None, device.get("module_path")]
+        ]
+        device = matching[position % len(matching)]
+        return self._db_conn.find_and_update(
+            {"_collection": "operations"},
+            {"id": op["id"], "status": OperationStatus.ASSIGNED},
+            {
+                "entity_id": device["id"],
+                "entity_type": "robot" if device["_collection"] == "robots" else "device",
+            },
+        ) or op
+
+    def _to_operation(self, op: Dict[str, Any]) -> Operation:
+        """
+        Converts an operation document into an Operation, leaving unset fields at their defaults.
+
+        Args:
+            op (Dict[str, Any]): The operation document.
+
+        Returns:
+            Operation: The operation.
+        """
+        return Operation(**{key: value for key, value in op.items() if value is not None})
+
+    def _lock_holder(self, station: Dict[str, Any]) -> Optional[str]:
+        """
+        Gets the session holding the lock of a station, releasing the lock if its lease expired.
+
+        Args:
+            station (Dict[str, Any]): The station document.
+
+        Returns:
+            Optional[str]: The ID of the session holding the lock, or None if the station is not locked.
+        """
+        holder = station.get("locked")
+        if not holder:
+            return None
+        expires_at = station.get("lock_expires_at")
+        if expires_at is None or expires_at > time():
+            return str(holder)
+
+        # only clear the lease that expired, not one taken or renewed in the meantime
+        released = self._db_conn.find_and_update(
+            {"_collection": "stations"},
+            {"id": station["id"], "locked": holder, "lock_expires_at": expires_at},
+            {"locked": None, "lock_expires_at": None},
+        )
+        if released is not None:
+            self._logger.info(f"Lock of session {holder} on station {station['id']} expired")
+            self._station_states.update(station["id"], "locked", None)
+        return None
+
+    def _release_station(self, station_id: str) -> None:
+        """
+        Hands a station claimed by this scheduler back to the queue if nothing else changed its status.
+
+        Args:
+            station_id (str): The ID of the station to release.
+        """
+        self._db_conn.find_and_update(
+            {"_collection": "stations"},
+            {"id": station_id, "status": ActivityStatus.BUSY},
+            {"status": ActivityStatus.IDLE},
+        )
+        self._station_states.invalidate(station_id)
 
     def stop(self) -> None:
         """
         Stops the scheduling thread.
         """
         self._stop = True
+        with self._wakeup:
+            self._wakeup.notify()
         self.thread.join()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _execute_ops(
+        self,
+        operations: List[Operation],
+        station_id: str,
+        slots: int = 0,
+        device: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Executes the given operations, in order, on the specified station.
+
+        Args:
+            operations (List[Operation]): The operations to be executed.
+            station_id (str): The ID of the station where the operations will be executed.
+            slots (int, optional): Number of station slots held by the operations, 0 if the whole
+                station was claimed. Defaults to 0.
+            device (Optional[Dict[str, Any]], optional): The device claimed for the operations, if any. Defaults to None.
+        """
+        try:
+            if len(operations) == 1:
+                started = time()
+                self._run_op(operations[0], station_id)
+                duration = time() - started
+            else:
+                self._run_batch(operations, station_id)
+        except Exception as e:
+            self._logger.error(
+                f"Execution of operations {[str(op.id) for op in operations]} failed: {e}"
+            )
+            # operations the station never started would stay claimed forever, fail them
+            for op in self._db_conn.find_all(
+                {"_collection": "operations"},
+                {
+                    "id": {"$in": [str(op.id) for op in operations]},
+                    "status": OperationStatus.ASSIGNED,
+                },
+            ):
+                self.fail_operation(
+                    op["id"],
+                    OperationStatus.ASSIGNED,
+                    f"Operation could not be run on station {station_id}: {e}",
+                )
+            # the station may not have reached the operations, do not leave it claimed
+            if not slots:
+                self._release_station(station_id)
+            elif device is not None:
+                self._release_device(device)
+        else:
+            if len(operations) == 1:
+                self._observe_duration(operations[0], duration)
+        finally:
+            # release the station and worker and let the loop pick the next operation
+            if slots:
+                self._release_slots(
+                    station_id, slots, self._own_claim(operations[0].id, slots)
+                )
+            self._station_states.invalidate(station_id)
+            with self._wakeup:
+                self._in_flight[station_id] -= 1
+                if not self._in_flight[station_id]:
+                    del self._in_flight[station_id]
+                self._dirty_stations.add(station_id)
+                self._dirty_stations.update(self._deferred_stations)
+                self._deferred_stations.clear()
+                self._wakeup.notify()
+            self._notify_completed(operations)
+
+    def _observe_duration(self, operation: Operation, duration: float) -> None:
+        """
+        Records how long an operation took for future duration estimates.
+
+        Args:
+            operation (Operation): The completed operation.
+            duration (float): Its duration in seconds.
+        """
+        try:
+            entity_class = self._durations.entity_class(
+                operation.entity_id, operation.entity_type
+            )
+        except Exception as e:
+            self._logger.error(f"Resolving the class of {operation.entity_id} failed: {e}")
+            return
+        if entity_class is not None:
+            self._durations.observe(entity_class, operation.method, duration)
+
+    def duration_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        The duration estimates of every method seen so far.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The estimates, see DurationEstimator.stats.
+        """
+        return self._durations.stats()
 
-    def _execute_op(self, operation: Operation, station_id: str) -> None:
+    def station_cache_stats(self) -> Dict[str, Any]:
         """
-        Executes the given operation on the specified station.
+        The counters of the station state cache of this lab server worker.
+
+        Returns:
+            Dict[str, Any]: The counters, see StationStateCache.stats.
+        """
+        return self._station_states.stats()
+
+    def _run_op(self, operation: Operation, station_id: str) -> None:
+        """
+        Sends the given operation to the station and stores its result.
 
         Args:
             operation (Operation): The operation to be executed.
             station_id (str): The ID of the station where the operation will be executed.
         """
-        # establish connection with station
-        station_ip = self._db_conn.read(
-            {"id": station_id, "_collection": "stations"}, "station_ip"
-        )
+        station_client = self._get_station_connection(station_id)
 
-        station_port = self._db_conn.read(
-            {"id": station_id, "_collection": "stations"}, "port"
-        )
-        station_client: StationConnection = StationConnection(
-            station_ip + ":" + str(station_port)
-        )
         # execute operation and save result in db
-        # TODO fix this when working on operation handling issue
-        result = station_client.execute_op(operation, "process_op")
+        try:
+            result = station_client.execute_op(operation, "process_op")
+        except LabEngineException:
+            # the station may have moved, resolve its endpoint again next time
+            self._station_conns.pop(station_id, None)
+            raise
+        if not result.data:
+            # the station stores the operation result itself
+            return
         self._db_conn.update(
             {"id": operation.id, "_collection": "operations"},
             {
@@ -136,7 +1844,83 @@ class Scheduler:
             },
         )
 
-    def _resolve_station_id(self, op: Operation) -> str:
+    def _run_batch(self, operations: List[Operation], station_id: str) -> None:
+        """
+        Sends the given operations to the station in one request. Operations the station
+        rejected before starting them are completed as failed, the ones it did not reach
+        are queued again.
+
+        Args:
+            operations (List[Operation]): The operations to be executed, in order.
+            station_id (str): The ID of the station where the operations will be executed.
+        """
+        station_client = self._get_station_connection(station_id)
+        try:
+            result = station_client.execute_ops(operations, "process_ops")
+        except LabEngineException:
+            # the station may have moved, resolve its endpoint again next time
+            self._station_conns.pop(station_id, None)
+            raise
+
+        rejected = [
+            report for report in result.data if report["status"] == OperationStatus.ASSIGNED
+        ]
+        for report in rejected:
+            self._logger.warning(
+                f"Station {station_id} rejected operation {report['id']}: {report['error']}"
+            )
+            self.fail_operation(report["id"], OperationStatus.ASSIGNED, report["error"])
+        # durations of the operations that ran to completion, the batch as a whole says little
+        reports = {report["id"]: report for report in result.data}
+        for operation in operations:
+            report = reports.get(str(operation.id), {})
+            if (
+                report.get("status") == OperationStatus.COMPLETED
+                and not report.get("error")
+                and report.get("duration") is not None
+            ):
+                self._observe_duration(operation, report["duration"])
+
+        skipped = [
+            report["id"]
+            for report in result.data
+            if report["status"] == OperationStatus.CREATED
+        ]
+        for operation_id in skipped:
+            self._requeue_operation(operation_id, self._worker_id)
+        if skipped:
+            self.notify()
+            self._logger.warning(
+                f"Station {station_id} stopped its batch early, requeued operations {skipped}"
+            )
+        if rejected or skipped:
+            # the station may still be claimed if it stopped before changing its status
+            self._release_station(station_id)
+
+    def _get_station_connection(self, station_id: str) -> StationConnection:
+        """
+        Gets the cached connection to a station, resolving its endpoint on first use.
+
+        Args:
+            station_id (str): The ID of the station.
+
+        Returns:
+            StationConnection: The connection to the station.
+        """
+        station_client = self._station_conns.get(station_id)
+        if station_client is None:
+            station = self._db_conn.read_properties(
+                {"id": station_id, "_collection": "stations"}, ["station_ip", "port"]
+            )
+            if station is None:
+                raise LabEngineException(f"Station {station_id} not found")
+            station_client = StationConnection(
+                station["station_ip"] + ":" + str(station["port"])
+            )
+            self._station_conns[station_id] = station_client
+        return station_client
+
+    def resolve_station_id(self, op: Operation) -> str:
         """
         Resolves the station ID for the given operation.
 
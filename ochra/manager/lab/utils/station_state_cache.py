@@ -0,0 +1,135 @@
+from ochra.common.utils.singleton_meta import SingletonMeta
+from ochra.manager.connections.db_connection import DbConnection
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Optional
+import logging
+
+
+class StationStateCache(metaclass=SingletonMeta):
+    """
+    StationStateCache is a singleton, in-process cache of the station properties the scheduler
+    bases its decisions on. LabService writes through to it whenever a station document is patched,
+    so in the steady state scheduling takes no database round-trips. The database stays the source
+    of truth: missing or expired entries are read from it.
+
+    Attributes:
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups that had to read the database.
+    """
+
+    TRACKED_PROPERTIES = ["status", "locked", "max_concurrent_ops"]
+
+    def __init__(self, max_age: float = 30.0) -> None:
+        """
+        Initialize the StationStateCache.
+
+        Args:
+            max_age (float, optional): Time in seconds after which an entry is re-read from the database.
+                Bounds staleness caused by writes from other processes. Defaults to 30.0.
+        """
+        self._logger = logging.getLogger(__name__)
+        self._db_conn: DbConnection = DbConnection()
+        self._max_age = max_age
+        self._lock = Lock()
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._timestamps: Dict[str, float] = {}
+        # bumped on every write so that a concurrent database read cannot overwrite newer state
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, station_id: str, property: str) -> Any:
+        """
+        Get a tracked property of a station, reading the station from the database on a miss.
+
+        Args:
+            station_id (str): ID of the station.
+            property (str): Name of the property, one of TRACKED_PROPERTIES.
+
+        Returns:
+            Any: The value of the property, or None if the station does not exist.
+        """
+        station_id = str(station_id)
+        with self._lock:
+            state = self._states.get(station_id)
+            if state is not None and (
+                monotonic() - self._timestamps[station_id] < self._max_age
+            ):
+                self.hits += 1
+                return state.get(property)
+            self.misses += 1
+            generation = self._generations.get(station_id, 0)
+
+        state = self._db_conn.read_properties(
+            {"id": station_id, "_collection": "stations"}, self.TRACKED_PROPERTIES
+        )
+        if state is None:
+            return None
+
+        with self._lock:
+            if self._generations.get(station_id, 0) == generation:
+                self._states[station_id] = state
+                self._timestamps[station_id] = monotonic()
+        return state.get(property)
+
+    def update(self, station_id: str, property: str, value: Any) -> None:
+        """
+        Write a new value of a tracked property through to the cache. Untracked properties are ignored.
+
+        Args:
+            station_id (str): ID of the station.
+            property (str): Name of the property.
+            value (Any): New value of the property.
+        """
+        if property not in self.TRACKED_PROPERTIES:
+            return
+        station_id = str(station_id)
+        with self._lock:
+            self._generations[station_id] = self._generations.get(station_id, 0) + 1
+            # only update complete entries, partial ones are filled on the next miss
+            state = self._states.get(station_id)
+            if state is not None:
+                state[property] = value
+
+    def invalidate(self, station_id: Optional[str] = None) -> None:
+        """
+        Drop the cached state of a station so that the next lookup reads the database.
+
+        Args:
+            station_id (Optional[str], optional): ID of the station. If None, the whole cache is cleared. Defaults to None.
+        """
+        with self._lock:
+            if station_id is None:
+                stations = set(self._generations) | set(self._states)
+                self._states.clear()
+                self._timestamps.clear()
+            else:
+                stations = [str(station_id)]
+                self._states.pop(stations[0], None)
+                self._timestamps.pop(stations[0], None)
+            for station in stations:
+                self._generations[station] = self._generations.get(station, 0) + 1
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Fraction of lookups answered from the cache.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the cache counters.
+
+        Returns:
+            Dict[str, Any]: The number of hits, misses, the hit rate and the number of cached stations.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hit_rate,
+                "cached_stations": len(self._states),
+            }
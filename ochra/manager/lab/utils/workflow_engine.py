@@ -0,0 +1,359 @@
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+import json
+import uuid
+from fastapi import HTTPException
+from ochra.common.connections.api_models import WorkflowRequest, WorkflowStep
+from ochra.common.equipment.operation import Operation
+from ochra.common.utils.enum import OperationStatus
+from ochra.manager.connections.db_connection import DbConnection
+from .lab_service import LabService
+from .scheduler import Scheduler
+import logging
+
+
+class WorkflowEngine:
+    """
+    WorkflowEngine runs workflows, graphs of method calls where a step only starts once the steps
+    it depends on completed successfully, on the lab server. This way a caller submits a whole
+    workflow in one request instead of driving every step and waiting for it over the network.
+
+    Every step is stored as an operation when the workflow is submitted, but held back from the
+    queue. Held steps on a specific entity record their station and dependencies, so that the
+    scheduler can reserve the station for them while their dependencies run. Whenever a step
+    completes, its held dependents whose dependencies all succeeded are released to the scheduler,
+    with the results of the steps they reference passed as arguments.
+    Dependents of a failed step are completed as failed without being run. Releasing is a
+    compare-and-set on the held operation, so several lab server workers can advance the same
+    workflow without queuing a step twice.
+    """
+
+    def __init__(self, scheduler: Scheduler) -> None:
+        """
+        Initialize the WorkflowEngine and subscribe it to the operations completed by the scheduler.
+
+        Args:
+            scheduler (Scheduler): The scheduler the steps are queued on.
+        """
+        self._logger = logging.getLogger(__name__)
+        self._db_conn: DbConnection = DbConnection()
+        self._lab_service = LabService()
+        self._scheduler = scheduler
+        self._scheduler.add_completion_listener(self._on_completed)
+
+    def submit(self, request: WorkflowRequest) -> Dict[str, Any]:
+        """
+        Store a workflow and queue the steps without dependencies.
+
+        Args:
+            request (WorkflowRequest): The workflow to run.
+
+        Returns:
+            Dict[str, Any]: The ID of the workflow and the ID of the operation of every step.
+
+        Raises:
+            HTTPException: If the steps do not form a valid graph, a target entity does not exist
+                or the queue cannot take the steps.
+        """
+        self._validate(request.steps)
+        ticket = self._scheduler.admit(request.caller_id, len(request.steps))
+        try:
+            workflow_id = uuid.uuid4()
+            ops = self._lab_service.create_operations(
+                request.steps, request.caller_id, workflow_id
+            )
+            operations = {step.name: str(op.id) for step, op in zip(request.steps, ops)}
+            docs = []
+            station_ids: Dict[str, str] = {}
+            for step, op in zip(request.steps, ops):
+                doc = json.loads(op.model_dump_json())
+                # held operations are not visible to the scheduler until released
+                doc["held"] = True
+                if step.depends_on and step.entity_id is not None:
+                    # lets the scheduler keep the station free for the step once its dependencies run
+                    if doc["entity_id"] not in station_ids:
+                        station_ids[doc["entity_id"]] = self._scheduler.resolve_station_id(op)
+                    doc["planned_station_id"] = station_ids[doc["entity_id"]]
+                    doc["depends_on_ops"] = [operations[name] for name in step.depends_on]
+                docs.append(doc)
+            self._db_conn.create_many({"_collection": "operations"}, docs)
+
+            self._db_conn.create(
+                {"_collection": "workflows"},
+                {
+                    "id": str(workflow_id),
+                    "caller_id": request.caller_id,
+                    "status": OperationStatus.IN_PROGRESS,
+                    "success": None,
+                    "created_at": datetime.now().isoformat(),
+                    "steps": [
+                        {
+                            "name": step.name,
+                            "operation_id": operations[step.name],
+                            "depends_on": step.depends_on,
+                            "arg_refs": step.arg_refs,
+                            # steps on a specific entity do not run on a device pool
+                            "device_class": step.device_class if step.entity_id is None else None,
+                            "module_path": step.module_path,
+                        }
+                        for step in request.steps
+                    ],
+                },
+            )
+            self._logger.info(
+                f"Submitted workflow {workflow_id} with {len(request.steps)} steps for {request.caller_id}"
+            )
+
+            self.advance(str(workflow_id))
+        finally:
+            # the steps without dependencies are queued, the others are held
+            self._scheduler.release_admission(ticket)
+        return {"id": str(workflow_id), "operations": operations}
+
+    def advance(self, workflow_id: str) -> None:
+        """
+        Release the held steps of a workflow whose dependencies completed, fail the ones
+        whose dependencies failed and complete the workflow once every step is done.
+        Safe to call any number of times, from any lab server worker.
+
+        Args:
+            workflow_id (str): The ID of the workflow.
+        """
+        workflow = self._db_conn.find({"_collection": "workflows"}, {"id": workflow_id})
+        if workflow is None or workflow["status"] == OperationStatus.COMPLETED:
+            return
+
+        # steps failed here complete their own dependents on the next pass
+        while True:
+            ops, results = self._load_steps(workflow)
+            progressed = False
+            for step in workflow["steps"]:
+                op = ops[step["operation_id"]]
+                if op["status"] != OperationStatus.CREATED or not op.get("held"):
+                    continue
+
+                dependencies = [
+                    ops[self._step(workflow, name)["operation_id"]]
+                    for name in step["depends_on"]
+                ]
+                failed = [
+                    name
+                    for name, dependency in zip(step["depends_on"], dependencies)
+                    if dependency["status"] == OperationStatus.COMPLETED
+                    and not results.get(dependency["id"], {}).get("success")
+                ]
+                if failed:
+                    progressed |= self._scheduler.fail_operation(
+                        op["id"],
+                        OperationStatus.CREATED,
+                        f"Step {failed[0]} of the workflow failed",
+                    )
+                elif all(
+                    dependency["status"] == OperationStatus.COMPLETED
+                    for dependency in dependencies
+                ):
+                    progressed |= self._release(workflow, step, op, ops, results)
+            if not progressed:
+                break
+
+        if all(op["status"] == OperationStatus.COMPLETED for op in ops.values()):
+            success = all(results.get(op["id"], {}).get("success") for op in ops.values())
+            completed = self._db_conn.find_and_update(
+                {"_collection": "workflows"},
+                {"id": workflow_id, "status": OperationStatus.IN_PROGRESS},
+                {
+                    "status": OperationStatus.COMPLETED,
+                    "success": success,
+                    "end_timestamp": datetime.now().isoformat(),
+                },
+            )
+            if completed is not None:
+                self._logger.info(
+                    f"Workflow {workflow_id} completed {'successfully' if success else 'with failures'}"
+                )
+
+    def get_workflow(self, workflow_id: str) -> Dict[str, Any]:
+        """
+        Get a workflow along with the status and result of every step.
+
+        Args:
+            workflow_id (str): The ID of the workflow.
+
+        Returns:
+            Dict[str, Any]: The workflow document, every step extended with its operation status,
+                whether it succeeded and the data it returned.
+
+        Raises:
+            HTTPException: If the workflow does not exist.
+        """
+        # completions seen by other lab server workers may not have advanced the workflow yet
+        self.advance(workflow_id)
+        workflow = self._db_conn.find({"_collection": "workflows"}, {"id": workflow_id})
+        if workflow is None:
+            raise HTTPException(status_code=404, detail=f"workflow {workflow_id} not found")
+
+        ops, results = self._load_steps(workflow)
+        for step in workflow["steps"]:
+            op = ops[step["operation_id"]]
+            result = results.get(op["id"], {})
+            step["status"] = op["status"]
+            step["success"] = result.get("success")
+            step["result_data"] = result.get("result_data")
+            step["error"] = result.get("error")
+        return workflow
+
+    def recover(self) -> None:
+        """
+        Advance every unfinished workflow, picking up the steps completed while the lab server was down.
+        """
+        workflows = self._db_conn.find_all(
+            {"_collection": "workflows"}, {"status": OperationStatus.IN_PROGRESS}
+        )
+        for workflow in workflows:
+            self.advance(workflow["id"])
+        self._logger.info(f"Recovered {len(workflows)} unfinished workflows")
+
+    def _on_completed(self, operations: List[Operation]) -> None:
+        """
+        Advance the workflows of operations that finished.
+
+        Args:
+            operations (List[Operation]): The operations that finished.
+        """
+        for workflow_id in {str(op.workflow_id) for op in operations if op.workflow_id is not None}:
+            self.advance(workflow_id)
+
+    def _release(
+        self,
+        workflow: Dict[str, Any],
+        step: Dict[str, Any],
+        op: Dict[str, Any],
+        ops: Dict[str, Dict[str, Any]],
+        results: Dict[str, Dict[str, Any]],
+    ) -> bool:
+        """
+        Pass the referenced results to a held step and hand it to the scheduler.
+
+        Args:
+            workflow (Dict[str, Any]): The workflow document.
+            step (Dict[str, Any]): The step to release.
+            op (Dict[str, Any]): The operation document of the step.
+            ops (Dict[str, Dict[str, Any]]): The operation documents of every step by ID.
+            results (Dict[str, Dict[str, Any]]): The result documents of the completed steps by operation ID.
+
+        Returns:
+            bool: Whether another pass may progress, i.e. the step could not be queued and was failed,
+                so its dependents are failed next. False once the step is queued or released elsewhere,
+                which completes nothing yet.
+        """
+        args = dict(op["args"] or {})
+        for arg, name in step["arg_refs"].items():
+            dependency = ops[self._step(workflow, name)["operation_id"]]
+            args[arg] = results[dependency["id"]].get("result_data")
+
+        released = self._db_conn.find_and_update(
+            {"_collection": "operations"},
+            {"id": op["id"], "status": OperationStatus.CREATED, "held": True},
+            {"held": False, "args": args},
+        )
+        if released is None:
+            # released or cancelled by someone else in the meantime
+            return False
+
+        op["args"] = args
+        try:
+            self._scheduler.add_operation(
+                Operation(**{key: value for key, value in op.items() if value is not None}),
+                device_class=step["device_class"],
+                device_module_path=step["module_path"],
+            )
+        except HTTPException as e:
+            return self._scheduler.fail_operation(op["id"], OperationStatus.CREATED, e.detail)
+        return False
+
+    def _load_steps(
+        self, workflow: Dict[str, Any]
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """
+        Read the operations of the steps of a workflow and the results of the completed ones.
+
+        Args:
+            workflow (Dict[str, Any]): The workflow document.
+
+        Returns:
+            Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]: The operation documents by ID and the result documents by operation ID.
+        """
+        ops = {
+            op["id"]: op
+            for op in self._db_conn.find_all(
+                {"_collection": "operations"}, {"workflow_id": workflow["id"]}
+            )
+        }
+        result_ops = {op["result"]: op["id"] for op in ops.values() if op.get("result")}
+        results = {}
+        if result_ops:
+            for result in self._db_conn.find_all(
+                {"_collection": "operation_results"}, {"id": {"$in": list(result_ops)}}
+            ):
+                results[result_ops[result["id"]]] = result
+        return ops, results
+
+    def _step(self, workflow: Dict[str, Any], name: str) -> Dict[str, Any]:
+        """
+        Find a step of a workflow by name.
+
+        Args:
+            workflow (Dict[str, Any]): The workflow document.
+            name (str): The name of the step.
+
+        Returns:
+            Dict[str, Any]: The step.
+        """
+        return next(step for step in workflow["steps"] if step["name"] == name)
+
+    def _validate(self, steps: List[WorkflowStep]) -> None:
+        """
+        Check that the steps have unique names and form an acyclic graph.
+
+        Args:
+            steps (List[WorkflowStep]): The steps of the workflow.
+
+        Raises:
+            HTTPException: If the steps are not a valid workflow.
+        """
+        if not steps:
+            raise HTTPException(status_code=400, detail="workflow has no steps")
+
+        names = [step.name for step in steps]
+        if len(set(names)) != len(names):
+            raise HTTPException(status_code=400, detail="workflow step names must be unique")
+        for step in steps:
+            for name in step.depends_on:
+                if name not in names:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"step {step.name} depends on unknown step {name}",
+                    )
+            for arg, name in step.arg_refs.items():
+                if name not in step.depends_on:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"argument {arg} of step {step.name} references step {name} it does not depend on",
+                    )
+
+        # Kahn's algorithm, whatever cannot be ordered is part of a cycle
+        pending = {step.name: set(step.depends_on) for step in steps}
+        ready = [name for name, dependencies in pending.items() if not dependencies]
+        while ready:
+            done = ready.pop()
+            del pending[done]
+            for name, dependencies in pending.items():
+                if done in dependencies:
+                    dependencies.discard(done)
+                    if not dependencies:
+                        ready.append(name)
+        if pending:
+            raise HTTPException(
+                status_code=400,
+                detail=f"workflow steps {sorted(pending)} form a cycle",
+            )
@@ -21,7 +21,14 @@ class Station(Station, RestProxyMixin):
     port: int = Field(default=None)
     """Network port number for the station."""
 
-    def __init__(self, name: str, type: StationType, location: Location, port: int):
+    def __init__(
+        self,
+        name: str,
+        type: StationType,
+        location: Location,
+        port: int,
+        max_concurrent_ops: int = 1,
+    ):
         super().__init__(
             collection="stations",
             name=name,
@@ -29,6 +36,7 @@ class Station(Station, RestProxyMixin):
             location=location,
             module_path="ochra.discovery.spaces.station",
             locked=None,
+            max_concurrent_ops=max_concurrent_ops,
         )
         self.port = port
 
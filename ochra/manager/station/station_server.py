@@ -6,7 +6,7 @@ from fastapi.responses import HTMLResponse
 
 
 from pydantic import BaseModel
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 from pathlib import Path, PurePath
 import shutil
 from os import remove
@@ -14,6 +14,15 @@ import datetime
 import uvicorn
 import os
 import signal
+from time import perf_counter, time
+from threading import Lock, local
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    TimeoutError as FutureTimeoutError,
+    wait,
+)
 
 from ochra.common.connections.lab_connection import LabConnection
 from ochra.common.utils.enum import (
@@ -50,6 +59,60 @@ def _is_path(obj: Any) -> bool:
     except (TypeError, ValueError):
         return False
 
+# cancellation signal of the operation run by the current worker thread
+_current_op = local()
+
+# time in seconds a cancel is kept for an operation that has not arrived yet
+_EARLY_CANCEL_TTL = 60.0
+
+
+def cancel_requested() -> bool:
+    """Check whether the operation being run by the calling device or station method was
+    cancelled or timed out. Long running methods should check it regularly and return early
+    once it does, so that their device and station are freed right away.
+
+    Returns:
+        bool: True if the operation should stop, False otherwise.
+    """
+    cancel = getattr(_current_op, "cancel", None)
+    return cancel is not None and cancel.done()
+
+
+def _call_cancellable(cancel: Future, method: Any, args: Dict[str, Any]) -> Any:
+    """Call the method of an operation, exposing its cancellation signal to cancel_requested.
+    Args:
+        cancel (Future): Completed once the operation is cancelled or timed out.
+        method (Any): The method to call.
+        args (Dict[str, Any]): The arguments of the method.
+    Returns:
+        Any: The return value of the method.
+    """
+    _current_op.cancel = cancel
+    try:
+        return method(**args)
+    finally:
+        _current_op.cancel = None
+
+
+class OperationCancelled(Exception):
+    """
+    Raised when an operation is cancelled or times out before its method returned.
+
+    Attributes:
+        running (Optional[Future]): The call of the method if it did not return within the grace
+            period after being signalled, None if it returned.
+    """
+
+    def __init__(self, message: str, running: Optional[Future] = None) -> None:
+        super().__init__(message)
+        self.running = running
+
+    @property
+    def returned(self) -> bool:
+        """Whether the method returned within the grace period after being signalled."""
+        return self.running is None
+
+
 #TODO what is the point of this class
 class operationExecute(BaseModel):
     operation: str
@@ -70,6 +133,8 @@ class StationServer:
         logging_path: str = ".",
         station_ip: str = "0.0.0.0",
         station_port: int = 8000,
+        max_concurrent_ops: int = 1,
+        cancel_grace: float = 5.0,
     ):
         """
         Initialize the StationServer instance.
@@ -81,6 +146,11 @@ class StationServer:
             logging_path (str, optional): Directory path for logging. Defaults to current directory.
             station_ip (str, optional): IP address to bind the server. Defaults to "0.0.0.0".
             station_port (int, optional): Port to run the server on. Defaults to 8000.
+            max_concurrent_ops (int, optional): Maximum number of operations run at the same time, each on a
+                different device. Operations on the same device always run one after the other. Defaults to 1.
+            cancel_grace (float, optional): Time in seconds a cancelled or timed out method is given to return
+                after being signalled. A method still running after it leaves its device, or the station for
+                methods of the station, in error and rejecting operations until it returns. Defaults to 5.0.
         """
         self._logging_path = Path(logging_path).resolve()
         
@@ -93,6 +163,27 @@ class StationServer:
         self._ip = station_ip
         self.port = station_port
         self._devices: dict[str, Device] = {}
+        self._max_concurrent_ops = max_concurrent_ops
+
+        # one worker thread per device keeps drivers that are not thread-safe serialized
+        self._device_workers: dict[str, ThreadPoolExecutor] = {}
+        self._running_ops = 0
+        self._running_ops_lock = Lock()
+
+        # methods of the station itself run on their own worker so that they can time out
+        self._station_worker = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="station"
+        )
+
+        # cancellation signals of the running operations by id, and the time cancels
+        # of operations that have not arrived yet were received
+        self._cancel_grace = cancel_grace
+        self._cancels: dict[str, Future] = {}
+        self._early_cancels: dict[str, float] = {}
+        self._cancels_lock = Lock()
+
+        # devices, or the station, whose worker is still running a stopped method
+        self._stuck: set[str] = set()
 
     def setup(self, lab_ip: Optional[str] = None) -> None:
         """
@@ -118,6 +209,8 @@ class StationServer:
         )
 
         self._router.add_api_route("/process_op", self.process_op, methods=["POST"])
+        self._router.add_api_route("/process_ops", self.process_ops, methods=["POST"])
+        self._router.add_api_route("/cancel_op/{op_id}", self.cancel_op, methods=["POST"])
         self._router.add_api_route("/ping", self.ping, methods=["GET"])
 
         # TODO: Look into the manual adding of routes in fastapi
@@ -154,6 +247,9 @@ class StationServer:
             device_name=device.name,
         )
         self._devices[str(device.id)] = device
+        self._device_workers[str(device.id)] = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"device-{device.name}"
+        )
         if self._station_proxy:
             self._station_proxy.add_device(device)
 
@@ -175,7 +271,13 @@ class StationServer:
             lab_ip (str): ip of the lab server connection.
         """
         self._lab_conn = LabConnection(lab_ip)
-        return Station(self._name, self._type, self._location, self.port)
+        return Station(
+            self._name,
+            self._type,
+            self._location,
+            self.port,
+            max_concurrent_ops=self._max_concurrent_ops,
+        )
 
     async def get_station(self, request: Request) -> HTMLResponse:
         """
@@ -365,6 +467,169 @@ class StationServer:
         Raises:
             HTTPException: If the entity type or device is not found, or if the station is locked by another user.
         """
+        self._execute_op(op)
+
+    def process_ops(self, ops: List[Operation]) -> List[Dict[str, Any]]:
+        """
+        Processes several operations in order, keeping the station busy until the last one is done.
+        Processing stops at the first failing operation, the remaining ones are reported as not run.
+
+        Args:
+            ops (List[Operation]): The operations to be processed.
+
+        Returns:
+            List[Dict[str, Any]]: For every operation its id, its status (COMPLETED if it was run,
+                ASSIGNED if it was rejected before it started, CREATED if it was not reached), the
+                error that stopped the batch, if any, and for completed ones how long they ran in seconds.
+        """
+        reports = []
+        failed = False
+        for i, op in enumerate(ops):
+            if failed:
+                reports.append(
+                    {"id": str(op.id), "status": OperationStatus.CREATED, "error": ""}
+                )
+                continue
+            started = perf_counter()
+            try:
+                self._execute_op(op, release_station=i == len(ops) - 1)
+                reports.append(
+                    {
+                        "id": str(op.id),
+                        "status": OperationStatus.COMPLETED,
+                        "error": "",
+                        "duration": perf_counter() - started,
+                    }
+                )
+            except HTTPException as e:
+                self._logger.error(f"Batch stopped at operation {op.id}: {e.detail}")
+                failed = True
+                reports.append(
+                    {
+                        "id": str(op.id),
+                        # operations rejected before they started are still assigned to the station
+                        "status": OperationStatus.ASSIGNED
+                        if e.status_code < 500
+                        else OperationStatus.COMPLETED,
+                        "error": str(e.detail),
+                    }
+                )
+        return reports
+
+    def cancel_op(self, op_id: str) -> None:
+        """
+        Cancels an operation. A running method is signalled through cancel_requested and the operation
+        fails once the method returned or the grace period is over. An operation that has not arrived
+        yet fails as soon as it does.
+
+        Args:
+            op_id (str): The ID of the operation to cancel.
+        """
+        self._logger.info(f"Cancelling operation {op_id}")
+        with self._cancels_lock:
+            cancel = self._cancels.get(str(op_id))
+            if cancel is None:
+                # the operation has not arrived yet, or already finished
+                self._prune_early_cancels()
+                self._early_cancels[str(op_id)] = time()
+                return
+        self._signal_cancel(cancel, "Operation was cancelled")
+
+    def _register_cancel(self, op_id: str) -> Future:
+        """
+        Creates the cancellation signal of an operation about to run, already completed if the
+        operation was cancelled before it arrived.
+
+        Args:
+            op_id (str): The ID of the operation.
+
+        Returns:
+            Future: Completed, with the reason, once the operation is cancelled or timed out.
+        """
+        cancel = Future()
+        with self._cancels_lock:
+            self._prune_early_cancels()
+            if self._early_cancels.pop(str(op_id), None) is not None:
+                cancel.set_result("Operation was cancelled")
+            self._cancels[str(op_id)] = cancel
+        return cancel
+
+    def _prune_early_cancels(self) -> None:
+        """
+        Forgets the cancels of operations that did not arrive in time, they most likely finished
+        before being cancelled. Called with the cancels lock held.
+        """
+        expired = time() - _EARLY_CANCEL_TTL
+        for op_id in [op_id for op_id, at in self._early_cancels.items() if at < expired]:
+            del self._early_cancels[op_id]
+
+    def _signal_cancel(self, cancel: Future, reason: str) -> None:
+        """
+        Completes a cancellation signal unless it already was.
+
+        Args:
+            cancel (Future): The cancellation signal.
+            reason (str): Why the operation is stopped.
+        """
+        with self._cancels_lock:
+            if not cancel.done():
+                cancel.set_result(reason)
+
+    def _run_method(
+        self, op: Operation, worker: ThreadPoolExecutor, method: Any, cancel: Future
+    ) -> Any:
+        """
+        Runs the method of an operation on a worker until it returns, the operation is cancelled
+        or it times out. A stopped method is signalled and given the grace period to return.
+
+        Args:
+            op (Operation): The operation.
+            worker (ThreadPoolExecutor): The worker of the target entity.
+            method (Any): The method to run.
+            cancel (Future): The cancellation signal of the operation.
+
+        Returns:
+            Any: The return value of the method.
+
+        Raises:
+            OperationCancelled: If the operation was cancelled or timed out.
+        """
+        if cancel.done():
+            raise OperationCancelled(cancel.result())
+
+        future = worker.submit(_call_cancellable, cancel, method, op.args)
+        done, _ = wait([future, cancel], timeout=op.timeout, return_when=FIRST_COMPLETED)
+        if future in done:
+            return future.result()
+
+        self._signal_cancel(cancel, f"Operation timed out after {op.timeout} seconds")
+        self._logger.warning(f"Stopping operation {op.id}: {cancel.result()}")
+        try:
+            future.result(timeout=self._cancel_grace)
+        except FutureTimeoutError:
+            raise OperationCancelled(cancel.result(), running=future)
+        except Exception:
+            pass
+        raise OperationCancelled(cancel.result())
+
+    def _execute_op(self, op: Operation, release_station: bool = True) -> None:
+        """
+        Executes an operation on the target device or station and reports its result to the lab server.
+
+        Args:
+            op (Operation): The operation to be executed.
+            release_station (bool, optional): Whether to set the station idle once the operation is done.
+                Defaults to True.
+
+        Raises:
+            HTTPException: 403 if the station is locked by another user, 404 if the device or method is not
+                found or 409 if the target is still running a stopped method, in which case the operation
+                was not started, or 500 if the operation failed.
+        """
+        started = False
+        stopped: Optional[OperationCancelled] = None
+        device = None
+        cancel = self._register_cancel(op.id)
         try:
             # check if the station is not locked
             if (
@@ -375,13 +640,21 @@ class StationServer:
                     raise HTTPException(403, detail="Station is locked by another user")
 
             if op.entity_type != "station":
-                device = self._devices[str(op.entity_id)]
-                method = getattr(device, op.method)
+                device = self._devices.get(str(op.entity_id))
+                if device is None:
+                    raise HTTPException(404, detail=f"Device {op.entity_id} not found on the station")
+                method = getattr(device, op.method, None)
             else:
-                method = getattr(self._station_proxy, op.method)
+                method = getattr(self._station_proxy, op.method, None)
+            if method is None:
+                raise HTTPException(404, detail=f"Method {op.method} not found on {op.entity_id}")
+            if str(op.entity_id) in self._stuck:
+                # its worker would only run the operation after the stopped method returns
+                raise HTTPException(409, detail=f"{op.entity_id} is still running a stopped operation")
 
             # set status to busy
-            self._station_proxy.status = ActivityStatus.BUSY
+            self._start_station_op()
+            started = True
             if op.entity_type != "station":
                 device.status = ActivityStatus.BUSY
             self._station_proxy.add_operation(op)
@@ -416,7 +689,12 @@ class StationServer:
                     elif op.method == "go_to":
                         device.state = MobileRobotState.NAVIGATING
 
-                result = method(**op.args)
+                worker = (
+                    self._device_workers[str(op.entity_id)]
+                    if op.entity_type != "station"
+                    else self._station_worker
+                )
+                result = self._run_method(op, worker, method, cancel)
 
                 # process result
                 if _is_path(result):
@@ -436,9 +714,29 @@ class StationServer:
                     data_type = str(type(result))
                     data_status = ResultDataStatus.AVAILABLE
 
+            except OperationCancelled as e:
+                # the station is freed, unless its own method is still running
+                stopped = e
+                if not e.returned:
+                    self._stuck.add(str(op.entity_id))
+                    if op.entity_type == "station":
+                        self._station_proxy.status = ActivityStatus.ERROR
+                    else:
+                        device.status = ActivityStatus.ERROR
+                elif op.entity_type != "station":
+                    device.status = ActivityStatus.IDLE
+                    if isinstance(device, MobileRobot):
+                        device.state = MobileRobotState.AVAILABLE
+
+                success = False
+                error = str(e)
+                raise
+
             except Exception as e:
-                # set status to error
-                self._station_proxy.status = ActivityStatus.ERROR
+                # set status to error, a failing device only takes the whole station down
+                # if the station runs one operation at a time
+                if op.entity_type == "station" or self._max_concurrent_ops == 1:
+                    self._station_proxy.status = ActivityStatus.ERROR
                 if op.entity_type != "station":
                     device.status = ActivityStatus.ERROR
 
@@ -479,7 +777,8 @@ class StationServer:
                     )
 
             # set status to idle
-            self._station_proxy.status = ActivityStatus.IDLE
+            started = False
+            self._finish_station_op(release_station)
             if op.entity_type != "station":
                 device.status = ActivityStatus.IDLE
                 if isinstance(device, MobileRobot):
@@ -490,8 +789,74 @@ class StationServer:
                 self._upload_result_data(result, operation_result)
 
         except Exception as e:
+            if isinstance(e, HTTPException) and not started:
+                # rejected before anything changed, the operation is still assigned
+                raise
+            if started:
+                # devices of a station running several operations fail on their own,
+                # stopped operations free the station unless its own method is stuck
+                self._finish_station_op(
+                    release_station=release_station
+                    and (
+                        (stopped is not None and (stopped.returned or op.entity_type != "station"))
+                        or (self._max_concurrent_ops > 1 and op.entity_type != "station")
+                    )
+                )
+            if stopped is not None and not stopped.returned:
+                self._recover_when_returned(op, device, stopped.running)
             raise HTTPException(500, detail=str(e))
 
+        finally:
+            with self._cancels_lock:
+                self._cancels.pop(str(op.id), None)
+
+    def _start_station_op(self) -> None:
+        """
+        Counts an operation as running on the station and marks the station busy.
+        """
+        with self._running_ops_lock:
+            self._running_ops += 1
+        self._station_proxy.status = ActivityStatus.BUSY
+
+    def _finish_station_op(self, release_station: bool) -> None:
+        """
+        Counts an operation as done and marks the station idle once nothing runs on it anymore.
+
+        Args:
+            release_station (bool): Whether the station may be set idle.
+        """
+        with self._running_ops_lock:
+            self._running_ops -= 1
+            idle = self._running_ops == 0
+        if idle and release_station and str(self._station_proxy.id) not in self._stuck:
+            self._station_proxy.status = ActivityStatus.IDLE
+
+    def _recover_when_returned(self, op: Operation, device: Optional[Device], running: Future) -> None:
+        """
+        Makes the device, or the station, of an operation whose method did not return after being
+        stopped available again once the method eventually returns.
+
+        Args:
+            op (Operation): The stopped operation.
+            device (Optional[Device]): The target device, None for methods of the station.
+            running (Future): The call of the method.
+        """
+
+        def returned(_: Future) -> None:
+            self._stuck.discard(str(op.entity_id))
+            self._logger.info(f"Stopped operation {op.id} returned, {op.entity_id} is available again")
+            if device is None:
+                with self._running_ops_lock:
+                    idle = self._running_ops == 0
+                if idle:
+                    self._station_proxy.status = ActivityStatus.IDLE
+            else:
+                device.status = ActivityStatus.IDLE
+                if isinstance(device, MobileRobot):
+                    device.state = MobileRobotState.AVAILABLE
+
+        running.add_done_callback(returned)
+
     def _upload_result_data(self, result: PurePath, operation_result: OperationResult) -> None:
         """
         Uploads result data (file or directory) to the lab server.
@@ -544,6 +909,9 @@ class StationServer:
             if device.inventory != [] or device.inventory is None:
                 device.inventory._cleanup()
             device._cleanup()
+        for worker in self._device_workers.values():
+            worker.shutdown(wait=False)
+        self._station_worker.shutdown(wait=False)
         self._station_proxy.inventory._cleanup()
         self._station_proxy._cleanup()
         os.kill(os.getpid(), signal.SIGTERM)
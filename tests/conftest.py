@@ -0,0 +1,205 @@
+from datetime import datetime
+from threading import Lock, RLock
+from time import perf_counter, sleep
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import functools
+import json
+import uuid
+
+import gridfs
+import mongomock
+import pytest
+
+import ochra.manager.connections.mongo_adapter as mongo_adapter
+from ochra.common.connections.rest_adapter import Result
+from ochra.common.equipment.operation import Operation
+from ochra.common.equipment.operation_result import OperationResult
+from ochra.common.utils.enum import ActivityStatus, OperationStatus
+from ochra.common.utils.singleton_meta import SingletonMeta
+from ochra.manager.connections.db_connection import DbConnection
+
+# mongomock runs a find-and-modify as a separate find and update, serialize the writes
+# so that compare-and-set updates are atomic as they are on a MongoDB server
+_WRITE_LOCK = RLock()
+_WRITES = [
+    "insert_one",
+    "insert_many",
+    "update_one",
+    "update_many",
+    "replace_one",
+    "delete_one",
+    "delete_many",
+    "bulk_write",
+    "find_one_and_update",
+    "find_one_and_replace",
+    "find_one_and_delete",
+]
+
+
+def _serialized(method: Callable) -> Callable:
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with _WRITE_LOCK:
+            return method(*args, **kwargs)
+
+    return wrapper
+
+
+for _name in _WRITES:
+    setattr(mongomock.Collection, _name, _serialized(getattr(mongomock.Collection, _name)))
+
+
+@pytest.fixture
+def db(monkeypatch) -> DbConnection:
+    """
+    A DbConnection to an empty in-memory database, with fresh singletons around it.
+    """
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(mongo_adapter, "connect", lambda db, host, alias: client)
+    monkeypatch.setattr(gridfs, "GridFS", lambda db: None)
+    monkeypatch.setattr(SingletonMeta, "_instances", {})
+    db_conn = DbConnection()
+    db_conn.ensure_indexes()
+    return db_conn
+
+
+def add_station(
+    db_conn: DbConnection, devices: int = 0, max_concurrent_ops: int = 1, device_class: str = "StubDevice"
+) -> Dict[str, Any]:
+    """
+    Stores an idle station and its idle devices, the device IDs are listed under "devices".
+    """
+    station = {
+        "id": str(uuid.uuid4()),
+        "name": f"station-{uuid.uuid4().hex[:8]}",
+        "cls": "Station",
+        "status": ActivityStatus.IDLE,
+        "locked": None,
+        "max_concurrent_ops": max_concurrent_ops,
+        "running_ops": 0,
+        "station_ip": "127.0.0.1",
+        "port": 0,
+    }
+    db_conn.create({"_collection": "stations"}, dict(station))
+    station["devices"] = []
+    for _ in range(devices):
+        device = {
+            "id": str(uuid.uuid4()),
+            "name": f"device-{uuid.uuid4().hex[:8]}",
+            "cls": device_class,
+            "module_path": "tests.conftest",
+            "owner_station": station["id"],
+            "status": ActivityStatus.IDLE,
+        }
+        db_conn.create({"_collection": "devices"}, device)
+        station["devices"].append(device["id"])
+    return station
+
+
+def make_operation(entity_id: str, entity_type: str = "device", method: str = "run", **kwargs) -> Operation:
+    """
+    Builds an operation as the lab service does on submission.
+    """
+    return Operation(
+        caller_id=kwargs.pop("caller_id", "tests"),
+        entity_id=entity_id,
+        entity_type=entity_type,
+        method=method,
+        args={},
+        collection="operations",
+        module_path="ochra.common.equipment.operation",
+        **kwargs,
+    )
+
+
+class StubStation:
+    """
+    Stands in for the connection to a station server: operations are completed in the database
+    after a delay, freeing their device and, on stations running one operation at a time, the station.
+    """
+
+    def __init__(
+        self,
+        db_conn: DbConnection,
+        station: Dict[str, Any],
+        duration: float = 0.0,
+        outcome: Optional[Callable[[Operation], Tuple[bool, Any]]] = None,
+    ):
+        self._db_conn = db_conn
+        self._station = station
+        self._duration = duration
+        # returns whether an operation succeeds and its result data, no result is stored without it
+        self._outcome = outcome
+        self._lock = Lock()
+        self.runs: Dict[str, int] = {}
+        self.operations: Dict[str, Operation] = {}
+
+    def execute_op(self, op: Operation, endpoint: str) -> Result:
+        self._run(op, release_station=True)
+        return Result(200)
+
+    def execute_ops(self, ops: List[Operation], endpoint: str) -> Result:
+        reports = []
+        for i, op in enumerate(ops):
+            started = perf_counter()
+            self._run(op, release_station=i == len(ops) - 1)
+            reports.append(
+                {"id": str(op.id), "status": OperationStatus.COMPLETED, "error": "", "duration": perf_counter() - started}
+            )
+        return Result(200, data=reports)
+
+    def cancel_op(self, op_id: str) -> Result:
+        return Result(200)
+
+    def _run(self, op: Operation, release_station: bool) -> None:
+        with self._lock:
+            self.runs[str(op.id)] = self.runs.get(str(op.id), 0) + 1
+            self.operations[str(op.id)] = op
+        self._set(op, status=OperationStatus.IN_PROGRESS, start_timestamp=datetime.now().isoformat())
+        sleep(self._duration)
+        result = {}
+        if self._outcome is not None:
+            success, result_data = self._outcome(op)
+            stored = OperationResult(
+                success=success,
+                error="" if success else "stub failure",
+                result_data=result_data,
+                collection="operation_results",
+                module_path="ochra.common.equipment.operation_result",
+            )
+            self._db_conn.create({"_collection": "operation_results"}, json.loads(stored.model_dump_json()))
+            result["result"] = str(stored.id)
+        self._set(op, status=OperationStatus.COMPLETED, end_timestamp=datetime.now().isoformat(), **result)
+        if op.entity_type != "station":
+            collection = "robots" if op.entity_type == "robot" else "devices"
+            self._db_conn.find_and_update(
+                {"_collection": collection}, {"id": str(op.entity_id)}, {"status": ActivityStatus.IDLE}
+            )
+        if release_station and self._station["max_concurrent_ops"] <= 1:
+            self._db_conn.find_and_update(
+                {"_collection": "stations"}, {"id": self._station["id"]}, {"status": ActivityStatus.IDLE}
+            )
+
+    def _set(self, op: Operation, **values: Any) -> None:
+        self._db_conn.find_and_update({"_collection": "operations"}, {"id": str(op.id)}, values)
+
+
+def wait_for(condition: Callable[[], bool], timeout: float = 20.0) -> bool:
+    """
+    Polls a condition until it holds or the timeout passes.
+    """
+    for _ in range(int(timeout / 0.02)):
+        if condition():
+            return True
+        sleep(0.02)
+    return condition()
+
+
+def unfinished(db_conn: DbConnection, operation_ids: Optional[List[str]] = None) -> int:
+    """
+    Counts the operations that have not completed yet.
+    """
+    search_params = {"status": {"$ne": OperationStatus.COMPLETED}}
+    if operation_ids is not None:
+        search_params["id"] = {"$in": operation_ids}
+    return db_conn.count({"_collection": "operations"}, search_params)
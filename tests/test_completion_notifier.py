@@ -0,0 +1,92 @@
+import asyncio
+import uuid
+from threading import Timer
+from time import perf_counter
+
+import pytest
+from fastapi import HTTPException
+
+import ochra.manager.lab.routers.operation_router as operation_router
+from ochra.common.utils.enum import OperationStatus
+from ochra.manager.lab.routers.operation_router import OperationRouter
+from ochra.manager.lab.utils.completion_notifier import CompletionNotifier
+from ochra.manager.lab.utils.scheduler import Scheduler
+
+OPERATIONS = {"_collection": "operations"}
+
+
+def stored_operation(db, status, **fields) -> str:
+    op_id = str(uuid.uuid4())
+    db.create(OPERATIONS, {"id": op_id, "status": status, **fields})
+    return op_id
+
+
+def timed_wait(notifier: CompletionNotifier, op_id: str, timeout: float):
+    started = perf_counter()
+    status = asyncio.run(notifier.wait(op_id, timeout))
+    return status, perf_counter() - started
+
+
+def test_completed_operations_return_right_away(db):
+    op_id = stored_operation(db, OperationStatus.COMPLETED)
+
+    status, waited = timed_wait(CompletionNotifier(poll_interval=5.0), op_id, 10.0)
+
+    assert status == OperationStatus.COMPLETED
+    assert waited < 0.5
+
+
+def test_waiters_wake_up_on_notify_before_the_poll_interval(db):
+    notifier = CompletionNotifier(poll_interval=5.0)
+    op_id = stored_operation(db, OperationStatus.IN_PROGRESS)
+
+    def complete() -> None:
+        db.find_and_update(OPERATIONS, {"id": op_id}, {"status": OperationStatus.COMPLETED})
+        notifier.notify(op_id)
+
+    Timer(0.2, complete).start()
+    status, waited = timed_wait(notifier, op_id, 10.0)
+
+    assert status == OperationStatus.COMPLETED
+    assert waited < 2.0
+
+
+def test_waits_end_with_the_current_status_at_the_timeout(db):
+    op_id = stored_operation(db, OperationStatus.CREATED)
+
+    status, waited = timed_wait(CompletionNotifier(poll_interval=0.05), op_id, 0.2)
+
+    assert status == OperationStatus.CREATED
+    assert 0.2 <= waited < 1.0
+
+
+def test_unknown_operations_have_no_status(db):
+    status, _ = timed_wait(CompletionNotifier(poll_interval=5.0), str(uuid.uuid4()), 10.0)
+    assert status is None
+
+
+def test_the_wait_route_returns_the_result_of_completed_operations(db):
+    result_id = str(uuid.uuid4())
+    op_id = stored_operation(db, OperationStatus.COMPLETED, result=result_id)
+    router = OperationRouter(Scheduler())
+
+    assert asyncio.run(router.wait_op(op_id, timeout=10.0)) == {
+        "id": op_id,
+        "status": OperationStatus.COMPLETED,
+        "result": result_id,
+    }
+    with pytest.raises(HTTPException) as missing:
+        asyncio.run(router.wait_op(str(uuid.uuid4()), timeout=10.0))
+    assert missing.value.status_code == 404
+
+
+def test_the_wait_route_caps_the_timeout(db, monkeypatch):
+    monkeypatch.setattr(operation_router, "MAX_WAIT_TIMEOUT", 0.2)
+    op_id = stored_operation(db, OperationStatus.IN_PROGRESS)
+    router = OperationRouter(Scheduler())
+
+    started = perf_counter()
+    waited = asyncio.run(router.wait_op(op_id, timeout=3600.0))
+
+    assert waited == {"id": op_id, "status": OperationStatus.IN_PROGRESS, "result": None}
+    assert perf_counter() - started < 2.0
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import uuid
+from time import perf_counter, sleep
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from ochra.manager.connections.async_db_connection import AsyncDbConnection
+
+DEVICES = {"_collection": "devices"}
+
+
+def test_properties_are_read_in_one_document(db):
+    device_id = str(uuid.uuid4())
+    db.create(DEVICES, {"id": device_id, "name": "pump", "cls": "Pump", "status": "IDLE"})
+
+    assert db.read_properties({**DEVICES, "id": device_id}, ["cls", "status"]) == {"cls": "Pump", "status": "IDLE"}
+
+
+def test_missing_properties_are_read_as_none(db):
+    device_id = str(uuid.uuid4())
+    db.create(DEVICES, {"id": device_id, "cls": "Pump"})
+
+    assert db.read_properties({**DEVICES, "id": device_id}, ["cls", "owner_station"]) == {
+        "cls": "Pump",
+        "owner_station": None,
+    }
+
+
+def test_missing_documents_are_read_as_none(db):
+    assert db.read_properties({**DEVICES, "id": str(uuid.uuid4())}, ["cls"]) is None
+
+
+def test_indexes_are_ensured_idempotently(db, caplog):
+    collection = db.db_adapter._db_client[db.db_adapter._db_name]["operations"]
+    indexes = collection.index_information()
+
+    with caplog.at_level(logging.ERROR):
+        db.ensure_indexes()
+
+    assert collection.index_information() == indexes
+    assert caplog.records == []
+
+
+def test_ids_are_unique(db):
+    device_id = str(uuid.uuid4())
+    db.create(DEVICES, {"id": device_id, "name": "pump"})
+
+    with pytest.raises(DuplicateKeyError):
+        db.create(DEVICES, {"id": device_id, "name": "valve"})
+
+
+def test_names_are_unique_when_set(db):
+    db.create(DEVICES, {"id": str(uuid.uuid4()), "name": "pump"})
+    with pytest.raises(DuplicateKeyError):
+        db.create(DEVICES, {"id": str(uuid.uuid4()), "name": "pump"})
+
+    # objects without a name are not indexed by name
+    db.create(DEVICES, {"id": str(uuid.uuid4())})
+    db.create(DEVICES, {"id": str(uuid.uuid4()), "name": None})
+    assert db.count(DEVICES, {}) == 3
+
+
+def test_awaited_calls_return_what_the_calls_return(db):
+    async_db = AsyncDbConnection()
+    device_id = str(uuid.uuid4())
+
+    async def calls():
+        await async_db.create(DEVICES, {"id": device_id, "name": "pump", "cls": "Pump"})
+        return (
+            await async_db.read({**DEVICES, "id": device_id}),
+            await async_db.read({**DEVICES, "id": device_id}, "cls"),
+            await async_db.read_properties({**DEVICES, "id": device_id}, ["name", "cls"]),
+            await async_db.find(DEVICES, {"name": "pump"}),
+            await async_db.find_all(DEVICES, {}),
+            await async_db.count(DEVICES, {"cls": "Pump"}),
+        )
+
+    assert asyncio.run(calls()) == (
+        db.read({**DEVICES, "id": device_id}),
+        db.read({**DEVICES, "id": device_id}, "cls"),
+        db.read_properties({**DEVICES, "id": device_id}, ["name", "cls"]),
+        db.find(DEVICES, {"name": "pump"}),
+        db.find_all(DEVICES, {}),
+        db.count(DEVICES, {"cls": "Pump"}),
+    )
+
+
+def test_awaited_calls_do_not_block_the_event_loop(db, monkeypatch):
+    async_db = AsyncDbConnection()
+
+    def slow_count(db_data, search_params):
+        sleep(0.3)
+        return 0
+
+    monkeypatch.setattr(db, "count", slow_count)
+
+    async def count_while_ticking():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        counts = await asyncio.gather(*(async_db.count(DEVICES, {}) for _ in range(4)))
+        ticker.cancel()
+        return counts, ticks
+
+    started = perf_counter()
+    counts, ticks = asyncio.run(count_while_ticking())
+
+    assert counts == [0, 0, 0, 0]
+    # the loop kept running during the calls, and the calls ran side by side
+    assert ticks >= 10
+    assert perf_counter() - started < 1.0
@@ -0,0 +1,22 @@
+import asyncio
+
+from conftest import add_station
+from ochra.common.connections.api_models import ObjectPropertyPatchRequest
+from ochra.manager.lab.routers.device_router import DeviceRouter
+from ochra.manager.lab.utils.scheduler import Scheduler
+
+
+def test_status_patches_notify_the_owner_station_without_reading_it(db, monkeypatch):
+    station = add_station(db, devices=1)
+    scheduler = Scheduler()
+    router = DeviceRouter(scheduler)
+
+    def read(*args, **kwargs):
+        raise AssertionError("the owner station is read in the update")
+
+    monkeypatch.setattr(router.lab_service.async_db_conn, "read", read)
+    monkeypatch.setattr(router.lab_service.async_db_conn, "read_properties", read)
+
+    request = ObjectPropertyPatchRequest(property="status", property_value="IDLE", return_document=True)
+    assert asyncio.run(router.modify_device_property(station["devices"][0], request)) == "IDLE"
+    assert scheduler._dirty_stations == {station["id"]}
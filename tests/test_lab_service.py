@@ -0,0 +1,139 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from ochra.common.connections.api_models import (
+    BulkCallRequest,
+    BulkConstructionRequest,
+    ObjectConstructionRequest,
+    ObjectPropertyPatchRequest,
+    OperationCall,
+)
+from ochra.common.utils.enum import PatchType
+from ochra.manager.lab.utils.lab_service import LabService
+
+DEVICES = {"_collection": "devices"}
+
+
+@pytest.fixture
+def service(db) -> LabService:
+    return LabService()
+
+
+def construct(service: LabService, **values) -> str:
+    request = ObjectConstructionRequest(object_json=json.dumps({"id": str(uuid.uuid4()), **values}))
+    return asyncio.run(service.construct_object(request, "devices"))
+
+
+def construct_many(service: LabService, *objects) -> list:
+    request = BulkConstructionRequest(
+        objects_json=[json.dumps({"id": str(uuid.uuid4()), **values}) for values in objects]
+    )
+    return asyncio.run(service.construct_objects(request, "devices"))
+
+
+def test_constructing_an_object_again_keeps_its_id_and_inventory(db, service):
+    device_id = construct(service, name="balance", cls="Balance", inventory={"containers": ["vial"]})
+    assert construct(service, name="balance", cls="Scale", inventory={"containers": []}) == device_id
+
+    stored = db.find_all(DEVICES, {"name": "balance"})
+    assert len(stored) == 1
+    assert stored[0]["id"] == device_id
+    assert stored[0]["cls"] == "Scale"
+    assert stored[0]["inventory"] == {"containers": ["vial"]}
+
+
+def test_an_object_without_inventory_gets_the_new_one(db, service):
+    device_id = construct(service, name="balance", inventory=None)
+    assert construct(service, name="balance", inventory={"containers": ["vial"]}) == device_id
+    assert db.read({**DEVICES, "id": device_id}, "inventory") == {"containers": ["vial"]}
+
+    other_ids = construct_many(service, {"name": "stirrer", "inventory": None})
+    assert construct_many(service, {"name": "stirrer", "inventory": {"containers": []}}) == other_ids
+    assert db.read({**DEVICES, "id": other_ids[0]}, "inventory") == {"containers": []}
+
+
+def test_bulk_construction_keeps_the_ids_and_inventories_of_existing_objects(db, service):
+    balance_id = construct(service, name="balance", inventory={"containers": ["vial"]})
+    ids = construct_many(
+        service,
+        {"name": "balance", "inventory": {"containers": []}},
+        {"name": "stirrer", "inventory": {"containers": ["flask"]}},
+    )
+
+    assert ids[0] == balance_id
+    assert db.read({**DEVICES, "id": balance_id}, "inventory") == {"containers": ["vial"]}
+    assert db.read({**DEVICES, "id": ids[1]}, "inventory") == {"containers": ["flask"]}
+
+
+def test_bulk_calls_are_expanded_over_lists_and_grids(service):
+    call = OperationCall(entity_type="device", entity_id="pump", method="dispense", args={"volume": 1})
+    sweep = OperationCall(entity_type="device", entity_id="stirrer", method="stir", args={"minutes": 5})
+
+    listed = service.expand_bulk_call(
+        BulkCallRequest(caller_id="tests", calls=[call], sweep=sweep, args_list=[{"speed": 1}, {"speed": 2}])
+    )
+    assert [c.method for c in listed] == ["dispense", "stir", "stir"]
+    assert [c.args for c in listed[1:]] == [{"minutes": 5, "speed": 1}, {"minutes": 5, "speed": 2}]
+
+    grid = service.expand_bulk_call(
+        BulkCallRequest(caller_id="tests", sweep=sweep, args_grid={"speed": [1, 2], "minutes": [10, 20]})
+    )
+    assert [c.args for c in grid] == [
+        {"speed": 1, "minutes": 10},
+        {"speed": 1, "minutes": 20},
+        {"speed": 2, "minutes": 10},
+        {"speed": 2, "minutes": 20},
+    ]
+
+
+@pytest.mark.parametrize(
+    "request_args",
+    [{}, {"args_list": [{"speed": 1}]}, {"args_grid": {"speed": [1, 2]}}],
+    ids=["no calls", "list without sweep", "grid without sweep"],
+)
+def test_bulk_calls_without_calls_are_rejected(service, request_args):
+    with pytest.raises(HTTPException) as rejected:
+        service.expand_bulk_call(BulkCallRequest(caller_id="tests", **request_args))
+    assert rejected.value.status_code == 400
+
+
+@pytest.mark.parametrize("return_document", [False, True])
+def test_patching_a_missing_object_is_rejected(db, service, return_document):
+    request = ObjectPropertyPatchRequest(property="status", property_value="IDLE", return_document=return_document)
+
+    with pytest.raises(HTTPException) as missing:
+        asyncio.run(service.patch_object(str(uuid.uuid4()), "devices", request))
+
+    assert missing.value.status_code == 404
+    assert db.count(DEVICES, {}) == 0
+
+
+def test_patches_return_the_new_value_when_asked(db, service):
+    device_id = construct(service, name="pump", log=["built"])
+
+    appended = ObjectPropertyPatchRequest(
+        property="log", property_value="cleaned", patch_type=PatchType.LIST_APPEND, return_document=True
+    )
+    assert asyncio.run(service.patch_object(device_id, "devices", appended)) == ["built", "cleaned"]
+
+    renamed = ObjectPropertyPatchRequest(property="name", property_value="valve")
+    assert asyncio.run(service.patch_object(device_id, "devices", renamed)) is True
+    assert db.read({**DEVICES, "id": device_id}, "name") == "valve"
+
+
+def test_patches_read_other_properties_in_the_same_update(db, service):
+    station_id = str(uuid.uuid4())
+    device_id = construct(service, name="pump", owner_station=station_id)
+    request = ObjectPropertyPatchRequest(property="status", property_value="IDLE")
+
+    patched, read = asyncio.run(
+        service.patch_and_read_object(device_id, "devices", request, ["owner_station", "location"])
+    )
+
+    assert patched is True
+    assert read == {"owner_station": station_id, "location": None}
+    assert db.read({**DEVICES, "id": device_id}, "status") == "IDLE"
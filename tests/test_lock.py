@@ -0,0 +1,40 @@
+import uuid
+from time import sleep
+
+import pytest
+
+from ochra.discovery.utils.lock import Lock, lock
+
+
+class LeasedStation:
+    """
+    Records the lock calls of a station.
+    """
+
+    def __init__(self):
+        self.id = uuid.uuid4()
+        self.leases = []
+        self.unlocked = False
+
+    def lock(self, ttl=60.0):
+        assert not self.unlocked
+        self.leases.append(ttl)
+
+    def unlock(self):
+        self.unlocked = True
+        return True
+
+
+@pytest.mark.parametrize("helper", [lock, Lock])
+def test_locks_are_renewed_while_held(helper):
+    station = LeasedStation()
+    with helper(station, ttl=0.15):
+        sleep(0.4)
+    renewals = len(station.leases)
+    sleep(0.15)
+
+    assert renewals >= 3
+    assert set(station.leases) == {0.15}
+    assert station.unlocked
+    # nothing is renewed after the lock was released
+    assert len(station.leases) == renewals
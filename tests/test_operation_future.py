@@ -0,0 +1,91 @@
+import uuid
+from concurrent.futures import Future
+from threading import Timer
+from time import monotonic, sleep
+
+import pytest
+
+import ochra.common.connections.lab_connection as lab_connection
+from conftest import make_operation
+from ochra.common.connections.lab_connection import LabConnection
+from ochra.common.connections.operation_future import OperationFuture, as_completed, wait_all
+from ochra.common.connections.rest_adapter import LabEngineException
+from ochra.common.utils.singleton_meta import SingletonMeta
+
+
+def pending(count: int):
+    """
+    Futures of operations nobody resolves but the test.
+    """
+    return [OperationFuture(make_operation(uuid.uuid4()), Future(), None) for _ in range(count)]
+
+
+def test_results_and_failures_are_passed_on():
+    succeeded, failed = pending(2)
+    succeeded._future.set_result(succeeded.operation)
+    failed._future.set_exception(LabEngineException("stub failure"))
+
+    assert succeeded.done() and succeeded.result() is succeeded.operation
+    assert succeeded.exception() is None
+    with pytest.raises(LabEngineException, match="stub failure"):
+        failed.result()
+    assert isinstance(failed.exception(), LabEngineException)
+
+
+def test_callbacks_run_once_the_operation_completed():
+    op_future, = pending(1)
+    called = []
+    op_future.add_done_callback(called.append)
+    assert called == []
+
+    op_future._future.set_result(op_future.operation)
+    op_future.add_done_callback(called.append)
+
+    assert called == [op_future, op_future]
+
+
+def test_waits_time_out():
+    op_future, other = pending(2)
+    with pytest.raises(TimeoutError):
+        op_future.result(timeout=0.05)
+
+    other._future.set_result(other.operation)
+    assert wait_all([op_future, other], timeout=0.05) == ({other}, {op_future})
+    with pytest.raises(TimeoutError):
+        list(as_completed([op_future], timeout=0.05))
+
+
+def test_operations_are_yielded_as_they_complete():
+    first, second = pending(2)
+    Timer(0.05, second._future.set_result, [second.operation]).start()
+    Timer(0.15, first._future.set_result, [first.operation]).start()
+
+    assert list(as_completed([first, second], timeout=5.0)) == [second, first]
+    assert wait_all([first, second]) == ({first, second}, set())
+
+
+def test_operations_waiting_for_a_watcher_are_not_starved(monkeypatch):
+    monkeypatch.setattr(SingletonMeta, "_instances", {})
+    monkeypatch.setattr(lab_connection, "WAIT_TIMEOUT", 5.0)
+    monkeypatch.setattr(lab_connection, "WATCH_TURN", 0.05)
+    lab_conn = LabConnection("127.0.0.1:1", max_watchers=2)
+    completed = set()
+
+    def wait_for_operation(operation_id, timeout=None):
+        # the long-poll of the lab engine
+        deadline = monotonic() + timeout
+        while operation_id not in completed and monotonic() < deadline:
+            sleep(0.01)
+        return operation_id in completed
+
+    monkeypatch.setattr(lab_conn, "wait_for_operation", wait_for_operation)
+    monkeypatch.setattr(lab_conn, "get_property", lambda *args: True)
+
+    op_futures = [lab_conn._watch(make_operation(uuid.uuid4())) for _ in range(6)]
+    last = op_futures[-1]
+    completed.add(last.operation_id)
+    try:
+        assert last.result(timeout=1.0) is last.operation
+    finally:
+        completed.update(op_future.operation_id for op_future in op_futures)
+    assert wait_all(op_futures, timeout=5.0)[1] == set()
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from conftest import add_station, make_operation
+from ochra.common.connections.api_models import BulkCallRequest, OperationCall
+from ochra.common.utils.enum import OperationStatus
+from ochra.manager.lab.routers.operation_router import OperationRouter
+from ochra.manager.lab.utils.scheduler import Scheduler
+
+OPERATIONS = {"_collection": "operations"}
+
+
+def sweep(device_id: str, points: int) -> BulkCallRequest:
+    return BulkCallRequest(
+        caller_id="tests",
+        sweep=OperationCall(entity_type="device", entity_id=device_id, method="measure"),
+        args_list=[{"point": i} for i in range(points)],
+    )
+
+
+def test_bulk_calls_are_queued_in_submission_order(db):
+    device_id = add_station(db, devices=1)["devices"][0]
+    router = OperationRouter(Scheduler())
+
+    op_ids = asyncio.run(router.bulk_call(sweep(device_id, 3)))
+
+    ops = {op["id"]: op for op in db.find_all(OPERATIONS, {})}
+    assert [ops[op_id]["args"] for op_id in op_ids] == [{"point": 0}, {"point": 1}, {"point": 2}]
+    assert {op["status"] for op in ops.values()} == {OperationStatus.CREATED}
+
+
+def test_bulk_calls_larger_than_the_queue_limit_are_rejected(db):
+    device_id = add_station(db, devices=1)["devices"][0]
+    router = OperationRouter(Scheduler(max_queued_per_caller=3))
+
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(router.bulk_call(sweep(device_id, 4)))
+
+    assert rejected.value.status_code == 413
+    assert db.count(OPERATIONS, {}) == 0
+
+
+def test_bulk_calls_are_queued_all_or_nothing(db):
+    device_id = add_station(db, devices=1)["devices"][0]
+    scheduler = Scheduler(max_queued=5)
+    scheduler.add_operations([make_operation(device_id) for _ in range(3)])
+    router = OperationRouter(scheduler)
+
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(router.bulk_call(sweep(device_id, 3)))
+    assert rejected.value.status_code == 429
+    assert db.count(OPERATIONS, {}) == 3
+    assert db.count({"_collection": "admissions"}, {}) == 0
+
+    assert len(asyncio.run(router.bulk_call(sweep(device_id, 2)))) == 2
+    assert db.count(OPERATIONS, {}) == 5
@@ -0,0 +1,554 @@
+import json
+import random
+import uuid
+from contextlib import contextmanager
+from threading import Barrier, Event, Lock, Thread
+from time import sleep, time
+from typing import Dict, List
+
+import pytest
+from fastapi import HTTPException
+
+from conftest import StubStation, add_station, make_operation, unfinished, wait_for
+from ochra.common.connections.api_models import WorkflowRequest, WorkflowStep
+from ochra.common.connections.rest_adapter import LabEngineException, Result
+from ochra.common.utils.enum import ActivityStatus, OperationPriority, OperationStatus
+from ochra.manager.lab.utils.scheduler import Scheduler
+from ochra.manager.lab.utils.workflow_engine import WorkflowEngine
+
+
+def start_schedulers(stubs: Dict[str, StubStation], count: int, **kwargs) -> List[Scheduler]:
+    """
+    Starts scheduler instances sharing the database, as the workers of a lab server do.
+    """
+    schedulers = []
+    for _ in range(count):
+        scheduler = Scheduler(**{"idle_timeout": 0.2, **kwargs})
+        scheduler._station_conns.update(stubs)
+        scheduler.run()
+        schedulers.append(scheduler)
+    return schedulers
+
+
+def stop_schedulers(schedulers: List[Scheduler]) -> None:
+    for scheduler in schedulers:
+        scheduler.stop()
+
+
+@contextmanager
+def keep_notifying(scheduler: Scheduler, station_id: str, interval: float = 0.05):
+    """
+    Wakes the scheduler up for a station more often than its idle timeout, as a busy lab does.
+    """
+    stopped = Event()
+
+    def notify() -> None:
+        while not stopped.wait(interval):
+            scheduler.notify(station_id)
+
+    thread = Thread(target=notify, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def test_every_operation_is_dispatched_exactly_once(db):
+    exclusive = [add_station(db, devices=2) for _ in range(4)]
+    concurrent = [add_station(db, devices=3, max_concurrent_ops=3) for _ in range(2)]
+    stubs = {
+        station["id"]: StubStation(db, station, duration=0.002) for station in exclusive + concurrent
+    }
+    schedulers = start_schedulers(stubs, 2, batch_size=1) + start_schedulers(stubs, 2, batch_size=3)
+
+    rng = random.Random(0)
+    submitted = []
+    try:
+        for i in range(300):
+            station = rng.choice(exclusive + concurrent)
+            kind = rng.choice(["station", "device", "pool"])
+            if kind == "station":
+                op, pool = make_operation(station["id"], entity_type="station"), None
+            elif kind == "device":
+                op, pool = make_operation(rng.choice(station["devices"])), None
+            else:
+                op, pool = make_operation(station["devices"][0]), ("StubDevice", None)
+            # every worker receives part of the submissions
+            schedulers[i % len(schedulers)].add_operations([op], [pool])
+            submitted.append(str(op.id))
+
+        assert wait_for(lambda: unfinished(db, submitted) == 0, timeout=60.0)
+    finally:
+        stop_schedulers(schedulers)
+
+    runs: Dict[str, int] = {}
+    for stub in stubs.values():
+        for op_id, count in stub.runs.items():
+            runs[op_id] = runs.get(op_id, 0) + count
+    assert sorted(runs) == sorted(submitted)
+    assert set(runs.values()) == {1}
+
+    # every claim was handed back
+    for station in db.find_all({"_collection": "stations"}, {}):
+        assert station["status"] == ActivityStatus.IDLE
+        assert station["running_ops"] == 0
+    for device in db.find_all({"_collection": "devices"}, {}):
+        assert device["status"] == ActivityStatus.IDLE
+
+
+class CountingStation(StubStation):
+    """
+    A stub station recording how many operations, and which devices, it ran at the same time.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._counter_lock = Lock()
+        self.running: List[str] = []
+        self.most_running = 0
+        self.shared_device = False
+
+    def execute_op(self, op, endpoint):
+        with self._counter_lock:
+            self.shared_device = self.shared_device or str(op.entity_id) in self.running
+            self.running.append(str(op.entity_id))
+            self.most_running = max(self.most_running, len(self.running))
+        try:
+            return super().execute_op(op, endpoint)
+        finally:
+            with self._counter_lock:
+                self.running.remove(str(op.entity_id))
+
+
+def test_operations_on_different_devices_of_a_station_run_concurrently(db):
+    station = add_station(db, devices=3, max_concurrent_ops=2)
+    stub = CountingStation(db, station, duration=0.1)
+    schedulers = start_schedulers({station["id"]: stub}, 2)
+
+    ops = [make_operation(device_id) for device_id in station["devices"] * 3]
+    try:
+        schedulers[0].add_operations(ops)
+        assert wait_for(lambda: unfinished(db) == 0)
+    finally:
+        stop_schedulers(schedulers)
+
+    assert stub.most_running == 2
+    assert not stub.shared_device
+    assert db.find({"_collection": "stations"}, {"id": station["id"]})["running_ops"] == 0
+
+
+def run_order(db, station, ops, **kwargs) -> List[str]:
+    """
+    Queues the operations before a scheduler starts and returns the order in which the station ran them.
+    """
+    stub = StubStation(db, station)
+    scheduler = Scheduler(**kwargs)
+    scheduler._station_conns[station["id"]] = stub
+    for op in ops:
+        scheduler.add_operations([op])
+    scheduler.run()
+    try:
+        assert wait_for(lambda: unfinished(db) == 0)
+    finally:
+        scheduler.stop()
+    return list(stub.runs)
+
+
+def test_operations_are_dispatched_by_priority_class(db):
+    station = add_station(db, devices=1)
+    device_id = station["devices"][0]
+    bulk, normal, urgent = (
+        make_operation(device_id, priority=priority)
+        for priority in [OperationPriority.BULK, OperationPriority.NORMAL, OperationPriority.URGENT]
+    )
+
+    assert run_order(db, station, [bulk, normal, urgent]) == [str(urgent.id), str(normal.id), str(bulk.id)]
+
+
+def test_callers_share_a_station_fairly(db):
+    station = add_station(db, devices=1)
+    device_id = station["devices"][0]
+    sweep = [make_operation(device_id, caller_id="sweep") for _ in range(6)]
+    single = [make_operation(device_id, caller_id="single") for _ in range(3)]
+    callers = {str(op.id): op.caller_id for op in sweep + single}
+
+    order = [callers[op_id] for op_id in run_order(db, station, sweep + single)]
+
+    # the operations queued later do not wait for the whole sweep
+    assert order == ["sweep", "single"] * 3 + ["sweep"] * 3
+
+
+class UnreachableStation:
+    def execute_op(self, op, endpoint):
+        raise LabEngineException("Request Failed: connection refused")
+
+    def execute_ops(self, ops, endpoint):
+        raise LabEngineException("Request Failed: connection refused")
+
+
+def test_operations_that_cannot_be_sent_are_failed(db):
+    station = add_station(db)
+    schedulers = start_schedulers({station["id"]: UnreachableStation()}, 1, batch_size=2)
+    completed = []
+    schedulers[0].add_completion_listener(completed.extend)
+
+    ops = [make_operation(station["id"], entity_type="station") for _ in range(2)]
+    try:
+        schedulers[0].add_operations(ops)
+        assert wait_for(lambda: unfinished(db) == 0)
+    finally:
+        stop_schedulers(schedulers)
+
+    for op in ops:
+        doc = db.find({"_collection": "operations"}, {"id": str(op.id)})
+        result = db.find({"_collection": "operation_results"}, {"id": doc["result"]})
+        assert result["success"] is False
+        assert "connection refused" in result["error"]
+    assert sorted(str(op.id) for op in completed) == sorted(str(op.id) for op in ops)
+    assert db.find({"_collection": "stations"}, {"id": station["id"]})["status"] == ActivityStatus.IDLE
+
+
+def claimed(db, station, dispatcher, status=OperationStatus.ASSIGNED, entity=None, **fields):
+    """
+    Stores an operation claimed by the given scheduler.
+    """
+    op = make_operation(entity or station["id"], entity_type="station" if entity is None else "device")
+    doc = json.loads(op.model_dump_json())
+    doc.update(
+        {
+            "status": status,
+            "station_id": station["id"],
+            "queued_at": time() - 60.0,
+            "dispatched_at": time() - 50.0,
+            "dispatcher": dispatcher,
+            **fields,
+        }
+    )
+    db.create({"_collection": "operations"}, doc)
+    return doc["id"]
+
+
+def heartbeat(db, dispatcher, age):
+    db.create({"_collection": "schedulers"}, {"id": dispatcher, "heartbeat_at": time() - age})
+
+
+def status_of(db, collection, identifier):
+    return db.find({"_collection": collection}, {"id": identifier})["status"]
+
+
+def test_recovery_leaves_claims_of_live_schedulers_alone(db):
+    station = add_station(db)
+    db.find_and_update({"_collection": "stations"}, {"id": station["id"]}, {"status": ActivityStatus.BUSY})
+    heartbeat(db, "live", age=1.0)
+    op_id = claimed(db, station, "live")
+
+    Scheduler()._recover()
+
+    assert status_of(db, "operations", op_id) == OperationStatus.ASSIGNED
+    assert status_of(db, "stations", station["id"]) == ActivityStatus.BUSY
+
+
+def test_recovery_requeues_claims_of_stopped_schedulers_on_busy_stations(db):
+    station = add_station(db)
+    db.find_and_update(
+        {"_collection": "stations"},
+        {"id": station["id"]},
+        {"status": ActivityStatus.BUSY, "dispatcher": "stopped"},
+    )
+    heartbeat(db, "stopped", age=120.0)
+    op_id = claimed(db, station, "stopped")
+
+    Scheduler()._recover()
+
+    assert status_of(db, "operations", op_id) == OperationStatus.CREATED
+    assert status_of(db, "stations", station["id"]) == ActivityStatus.IDLE
+
+
+def test_recovery_trusts_busy_stations_only_for_operations_in_progress(db):
+    running, interrupted = add_station(db), add_station(db)
+    db.find_and_update({"_collection": "stations"}, {"id": running["id"]}, {"status": ActivityStatus.BUSY})
+    running_id = claimed(db, running, None, status=OperationStatus.IN_PROGRESS)
+    interrupted_id = claimed(db, interrupted, None, status=OperationStatus.IN_PROGRESS)
+
+    Scheduler()._recover()
+
+    assert status_of(db, "operations", running_id) == OperationStatus.IN_PROGRESS
+    assert status_of(db, "operations", interrupted_id) == OperationStatus.COMPLETED
+
+
+def test_recovery_hands_back_slots_of_stopped_schedulers_only(db):
+    station = add_station(db, devices=3, max_concurrent_ops=3)
+    heartbeat(db, "live", age=1.0)
+    heartbeat(db, "stopped", age=120.0)
+    for device_id in station["devices"]:
+        db.find_and_update({"_collection": "devices"}, {"id": device_id}, {"status": ActivityStatus.BUSY})
+    db.find_and_update({"_collection": "stations"}, {"id": station["id"]}, {"running_ops": 3})
+    live_id = claimed(db, station, "live", entity=station["devices"][0], holds_slots=1)
+    stopped_id = claimed(db, station, "stopped", entity=station["devices"][1], holds_slots=1)
+    done_id = claimed(
+        db, station, "stopped", status=OperationStatus.COMPLETED, entity=station["devices"][2], holds_slots=1
+    )
+
+    scheduler = Scheduler()
+    scheduler._recover()
+    # a second pass, e.g. by another worker, changes nothing
+    scheduler._recover()
+
+    assert db.find({"_collection": "stations"}, {"id": station["id"]})["running_ops"] == 1
+    assert status_of(db, "operations", live_id) == OperationStatus.ASSIGNED
+    assert status_of(db, "operations", stopped_id) == OperationStatus.CREATED
+    assert status_of(db, "operations", done_id) == OperationStatus.COMPLETED
+    assert status_of(db, "devices", station["devices"][0]) == ActivityStatus.BUSY
+    assert status_of(db, "devices", station["devices"][1]) == ActivityStatus.IDLE
+
+
+class RejectingStation:
+    def execute_ops(self, ops, endpoint):
+        return Result(
+            200,
+            data=[
+                {"id": str(ops[0].id), "status": OperationStatus.ASSIGNED, "error": "Station is locked by another user"},
+                {"id": str(ops[1].id), "status": OperationStatus.CREATED, "error": ""},
+            ],
+        )
+
+
+def test_claims_of_stopped_schedulers_are_recovered_on_a_busy_lab(db):
+    station, busy = add_station(db), add_station(db)
+    schedulers = start_schedulers({station["id"]: StubStation(db, station)}, 1, dispatcher_timeout=0.6)
+    try:
+        with keep_notifying(schedulers[0], busy["id"]):
+            sleep(0.2)
+            db.find_and_update(
+                {"_collection": "stations"},
+                {"id": station["id"]},
+                {"status": ActivityStatus.BUSY, "dispatcher": "stopped"},
+            )
+            heartbeat(db, "stopped", age=120.0)
+            op_id = claimed(db, station, "stopped")
+
+            assert wait_for(lambda: status_of(db, "operations", op_id) == OperationStatus.COMPLETED, timeout=3.0)
+    finally:
+        stop_schedulers(schedulers)
+
+
+def test_queue_deadlines_are_enforced_on_a_busy_lab(db):
+    station, busy = add_station(db), add_station(db)
+    db.find_and_update({"_collection": "stations"}, {"id": station["id"]}, {"status": ActivityStatus.BUSY})
+    schedulers = start_schedulers({}, 1, idle_timeout=0.3)
+    op = make_operation(station["id"], entity_type="station", queue_timeout=0.2)
+    try:
+        with keep_notifying(schedulers[0], busy["id"]):
+            schedulers[0].add_operations([op])
+
+            assert wait_for(lambda: status_of(db, "operations", str(op.id)) == OperationStatus.COMPLETED, timeout=3.0)
+    finally:
+        stop_schedulers(schedulers)
+
+    result_id = db.find({"_collection": "operations"}, {"id": str(op.id)})["result"]
+    result = db.find({"_collection": "operation_results"}, {"id": result_id})
+    assert result["success"] is False
+    assert "expired" in result["error"]
+
+
+def test_batch_operations_rejected_before_starting_are_failed(db):
+    station = add_station(db)
+    db.find_and_update({"_collection": "stations"}, {"id": station["id"]}, {"status": ActivityStatus.BUSY})
+    scheduler = Scheduler()
+    scheduler._station_conns[station["id"]] = RejectingStation()
+    op_ids = [claimed(db, station, scheduler._worker_id) for _ in range(2)]
+
+    ops = [scheduler._to_operation(db.find({"_collection": "operations"}, {"id": op_id})) for op_id in op_ids]
+    scheduler._run_batch(ops, station["id"])
+
+    rejected = db.find({"_collection": "operations"}, {"id": op_ids[0]})
+    assert rejected["status"] == OperationStatus.COMPLETED
+    assert db.find({"_collection": "operation_results"}, {"id": rejected["result"]})["success"] is False
+    assert status_of(db, "operations", op_ids[1]) == OperationStatus.CREATED
+    assert status_of(db, "stations", station["id"]) == ActivityStatus.IDLE
+
+
+def test_robot_pools_are_dispatched_to_their_stations(db):
+    station = add_station(db)
+    robot_id = str(uuid.uuid4())
+    db.create(
+        {"_collection": "robots"},
+        {"id": robot_id, "cls": "StubRobot", "owner_station": station["id"], "status": ActivityStatus.IDLE},
+    )
+    stub = StubStation(db, station)
+    schedulers = start_schedulers({station["id"]: stub}, 1)
+
+    op = make_operation(robot_id, entity_type="robot")
+    try:
+        schedulers[0].add_operations([op], [("StubRobot", None)])
+        assert wait_for(lambda: unfinished(db) == 0)
+    finally:
+        stop_schedulers(schedulers)
+
+    assert stub.runs == {str(op.id): 1}
+
+
+def reserve(db, scheduler: Scheduler, station, dependency_station) -> List[str]:
+    """
+    Holds a workflow step for the station behind an operation running on another station for about
+    5 s, and queues a long and then a short operation on the station.
+    """
+    for method, duration in [("run", 5.0), ("long", 10.0), ("short", 0.1)]:
+        scheduler._durations.observe("StubDevice", method, duration)
+    dependency_id = claimed(
+        db,
+        dependency_station,
+        scheduler._worker_id,
+        status=OperationStatus.IN_PROGRESS,
+        entity=dependency_station["devices"][0],
+        dispatched_at=time(),
+    )
+    step = json.loads(make_operation(station["devices"][0]).model_dump_json())
+    step.update(held=True, planned_station_id=station["id"], depends_on_ops=[dependency_id])
+    db.create({"_collection": "operations"}, step)
+
+    queued = [make_operation(station["devices"][0], method=method) for method in ["long", "short"]]
+    scheduler.add_operations(queued)
+    return [str(op.id) for op in queued]
+
+
+def test_reserved_stations_only_backfill_operations_done_in_time(db):
+    station, elsewhere = add_station(db, devices=1), add_station(db, devices=1)
+    stub = StubStation(db, station)
+    scheduler = Scheduler(batch_size=2)
+    scheduler._station_conns[station["id"]] = stub
+    long_id, short_id = reserve(db, scheduler, station, elsewhere)
+
+    scheduler._dispatch_station(station["id"])
+
+    assert wait_for(lambda: unfinished(db, [short_id]) == 0)
+    assert stub.runs == {short_id: 1}
+    assert status_of(db, "operations", long_id) == OperationStatus.CREATED
+
+
+def test_without_backfill_operations_are_run_in_order(db):
+    station, elsewhere = add_station(db, devices=1), add_station(db, devices=1)
+    stub = StubStation(db, station)
+    scheduler = Scheduler(batch_size=1, backfill=False)
+    scheduler._station_conns[station["id"]] = stub
+    long_id, short_id = reserve(db, scheduler, station, elsewhere)
+
+    scheduler._dispatch_station(station["id"])
+
+    assert wait_for(lambda: unfinished(db, [long_id]) == 0)
+    assert stub.runs == {long_id: 1}
+
+
+def test_durations_of_batch_operations_are_recorded(db):
+    station = add_station(db, devices=1)
+    db.find_and_update({"_collection": "stations"}, {"id": station["id"]}, {"status": ActivityStatus.BUSY})
+    scheduler = Scheduler()
+    scheduler._station_conns[station["id"]] = StubStation(db, station, duration=0.01)
+    op_ids = [claimed(db, station, scheduler._worker_id, entity=station["devices"][0]) for _ in range(3)]
+
+    ops = [scheduler._to_operation(db.find({"_collection": "operations"}, {"id": op_id})) for op_id in op_ids]
+    scheduler._run_batch(ops, station["id"])
+
+    stats = scheduler.duration_stats()["StubDevice.run"]
+    assert stats["samples"] == 3
+    assert 0.01 <= stats["p50"] < 1.0
+
+
+def test_workflow_steps_record_the_station_they_reserve(db):
+    prep, analyzer = add_station(db, devices=1), add_station(db, devices=1)
+    engine = WorkflowEngine(Scheduler())
+
+    workflow = engine.submit(
+        WorkflowRequest(
+            caller_id="tests",
+            steps=[
+                WorkflowStep(name="prepare", entity_type="device", entity_id=prep["devices"][0], method="run"),
+                WorkflowStep(
+                    name="measure",
+                    entity_type="device",
+                    entity_id=analyzer["devices"][0],
+                    method="run",
+                    depends_on=["prepare"],
+                ),
+            ],
+        )
+    )
+
+    step = db.find({"_collection": "operations"}, {"id": workflow["operations"]["measure"]})
+    assert step["planned_station_id"] == analyzer["id"]
+    assert step["depends_on_ops"] == [workflow["operations"]["prepare"]]
+
+
+def test_operations_on_devices_in_error_wait_for_them_to_recover(db):
+    station = add_station(db, devices=2)
+    failed, working = station["devices"]
+    db.find_and_update({"_collection": "devices"}, {"id": failed}, {"status": ActivityStatus.ERROR})
+    stub = StubStation(db, station)
+    scheduler = Scheduler(batch_size=2)
+    scheduler._station_conns[station["id"]] = stub
+    waiting, runnable = make_operation(failed), make_operation(working)
+    scheduler.add_operations([waiting, runnable])
+
+    scheduler._dispatch_station(station["id"])
+
+    assert wait_for(lambda: unfinished(db, [str(runnable.id)]) == 0)
+    assert stub.runs == {str(runnable.id): 1}
+    assert status_of(db, "operations", str(waiting.id)) == OperationStatus.CREATED
+
+
+def test_queue_limits_hold_across_concurrent_submissions(db):
+    station = add_station(db)
+    schedulers = [Scheduler(max_queued=10) for _ in range(4)]
+    start = Barrier(40)
+    rejected = []
+
+    def submit(i: int) -> None:
+        scheduler = schedulers[i % len(schedulers)]
+        start.wait()
+        try:
+            ticket = scheduler.admit("tests")
+        except HTTPException as e:
+            rejected.append(e.status_code)
+            return
+        try:
+            scheduler.add_operations([make_operation(station["id"], entity_type="station")])
+        finally:
+            scheduler.release_admission(ticket)
+
+    threads = [Thread(target=submit, args=(i,)) for i in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert 0 < unfinished(db) <= 10
+    assert set(rejected) == {429}
+    assert db.count({"_collection": "admissions"}, {}) == 0
+
+
+def test_unreleased_admissions_count_until_they_expire(db):
+    scheduler = Scheduler(max_queued_per_caller=2, admission_ttl=0.1)
+    scheduler.admit("tests", 2)
+    with pytest.raises(HTTPException) as rejected:
+        scheduler.admit("tests")
+    assert rejected.value.status_code == 429
+
+    sleep(0.15)
+    scheduler._expire_admissions()
+    assert db.count({"_collection": "admissions"}, {}) == 0
+    assert scheduler.admit("tests") is not None
+
+
+def test_unreleased_admissions_expire_on_a_busy_lab(db):
+    busy = add_station(db)
+    schedulers = start_schedulers({}, 1, max_queued_per_caller=2, admission_ttl=0.2)
+    try:
+        with keep_notifying(schedulers[0], busy["id"]):
+            schedulers[0].admit("tests", 2)
+
+            assert wait_for(lambda: db.count({"_collection": "admissions"}, {}) == 0, timeout=3.0)
+            assert schedulers[0].admit("tests") is not None
+    finally:
+        stop_schedulers(schedulers)
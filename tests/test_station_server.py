@@ -0,0 +1,108 @@
+import uuid
+from threading import Event
+
+import pytest
+from fastapi import HTTPException
+
+from conftest import make_operation, wait_for
+import ochra.manager.station.station_server as station_server
+from ochra.common.equipment.device import Device
+from ochra.common.equipment.operation_result import OperationResult
+from ochra.common.spaces.location import Location
+from ochra.common.utils.enum import ActivityStatus, StationType
+from ochra.manager.station.station_server import StationServer
+
+# lets the stuck method of a test return
+_release = Event()
+
+
+class HangingDevice(Device):
+    def hang(self):
+        _release.wait()
+
+    def run(self):
+        return "done"
+
+
+class StationProxy:
+    """
+    Stands in for the station model kept in sync with the lab server.
+    """
+
+    def __init__(self):
+        self.id = uuid.uuid4()
+        self.locked = None
+        self.status = ActivityStatus.IDLE
+
+    def add_operation(self, op):
+        pass
+
+    def add_device(self, device):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """
+    A station server without a lab server, its results are not stored anywhere.
+    """
+    _release.clear()
+    monkeypatch.setattr(station_server, "OperationResult", OperationResult)
+    server = StationServer(
+        "station", Location(lab="tests"), StationType.WORK_STATION, logging_path=tmp_path, cancel_grace=0.05
+    )
+    server._station_proxy = StationProxy()
+    server._lab_conn = None
+    yield server
+    _release.set()
+
+
+def test_devices_stay_unavailable_until_their_stopped_method_returns(server):
+    device = HangingDevice(name="hanging")
+    server.add_device(device)
+
+    with pytest.raises(HTTPException) as stopped:
+        server.process_op(make_operation(str(device.id), method="hang", timeout=0.05))
+    assert stopped.value.status_code == 500
+    assert device.status == ActivityStatus.ERROR
+    # the station is free for the other devices
+    assert server._station_proxy.status == ActivityStatus.IDLE
+
+    with pytest.raises(HTTPException) as rejected:
+        server.process_op(make_operation(str(device.id)))
+    assert rejected.value.status_code == 409
+
+    _release.set()
+    assert wait_for(lambda: device.status == ActivityStatus.IDLE, timeout=5.0)
+    server.process_op(make_operation(str(device.id)))
+
+
+def test_the_station_stays_in_error_until_its_stopped_method_returns(server):
+    server._station_proxy.hang = HangingDevice(name="station").hang
+    station_id = str(server._station_proxy.id)
+
+    with pytest.raises(HTTPException):
+        server.process_op(make_operation(station_id, entity_type="station", method="hang", timeout=0.05))
+    assert server._station_proxy.status == ActivityStatus.ERROR
+
+    _release.set()
+    assert wait_for(lambda: server._station_proxy.status == ActivityStatus.IDLE, timeout=5.0)
+
+
+def test_cancels_are_only_kept_for_operations_yet_to_arrive(server):
+    device = HangingDevice(name="device")
+    server.add_device(device)
+    op = make_operation(str(device.id))
+
+    server.cancel_op(str(op.id))
+    with pytest.raises(HTTPException) as cancelled:
+        server.process_op(op)
+    assert "cancelled" in cancelled.value.detail
+
+    # cancels of finished or unknown operations are forgotten
+    server.process_op(make_operation(str(device.id)))
+    server.cancel_op(str(op.id))
+    server._early_cancels[str(op.id)] -= 120.0
+    server.cancel_op(str(uuid.uuid4()))
+    assert server._cancels == {}
+    assert str(op.id) not in server._early_cancels
@@ -0,0 +1,141 @@
+from typing import Any, Dict, List, Tuple
+
+import pytest
+from fastapi import HTTPException
+
+from conftest import StubStation, add_station, unfinished, wait_for
+from ochra.common.connections.api_models import WorkflowRequest, WorkflowStep
+from ochra.common.equipment.operation import Operation
+from ochra.common.utils.enum import OperationStatus
+from ochra.manager.lab.utils.scheduler import Scheduler
+from ochra.manager.lab.utils.workflow_engine import WorkflowEngine
+
+
+def outcome(op: Operation) -> Tuple[bool, Any]:
+    """
+    Steps whose method is fail fail, every other step returns the name of its method.
+    """
+    return op.method != "fail", op.method
+
+
+def step(name: str, device_id: str, method: str = "run", **kwargs) -> WorkflowStep:
+    return WorkflowStep(name=name, entity_type="device", entity_id=device_id, method=method, **kwargs)
+
+
+@pytest.fixture
+def lab(db):
+    """
+    A station with one device and a workflow engine on a scheduler that is not started yet.
+    """
+    station = add_station(db, devices=1)
+    stub = StubStation(db, station, outcome=outcome)
+    scheduler = Scheduler(idle_timeout=0.2)
+    scheduler._station_conns[station["id"]] = stub
+    yield WorkflowEngine(scheduler), scheduler, stub, station["devices"][0]
+    if hasattr(scheduler, "thread"):
+        scheduler.stop()
+
+
+def run(db, engine: WorkflowEngine, scheduler: Scheduler, steps: List[WorkflowStep]) -> Dict[str, Any]:
+    """
+    Submits a workflow, runs it to completion and returns it with the status of every step.
+    """
+    workflow = engine.submit(WorkflowRequest(caller_id="tests", steps=steps))
+    scheduler.run()
+    assert wait_for(lambda: unfinished(db) == 0)
+    assert wait_for(lambda: engine.get_workflow(workflow["id"])["status"] == OperationStatus.COMPLETED)
+    return {**engine.get_workflow(workflow["id"]), "operations": workflow["operations"]}
+
+
+def test_steps_are_released_once_their_dependencies_succeeded(db, lab):
+    engine, scheduler, stub, device_id = lab
+    workflow = engine.submit(
+        WorkflowRequest(
+            caller_id="tests",
+            steps=[
+                step("prepare", device_id, method="prepare"),
+                step("measure", device_id, depends_on=["prepare"], arg_refs={"sample": "prepare"}),
+            ],
+        )
+    )
+    prepare_id, measure_id = workflow["operations"]["prepare"], workflow["operations"]["measure"]
+    held = db.find({"_collection": "operations"}, {"id": measure_id})
+    assert held["held"] is True
+
+    scheduler.run()
+    assert wait_for(lambda: unfinished(db) == 0)
+
+    assert list(stub.runs) == [prepare_id, measure_id]
+    assert stub.operations[measure_id].args["sample"] == "prepare"
+    assert wait_for(lambda: engine.get_workflow(workflow["id"])["status"] == OperationStatus.COMPLETED)
+    completed = engine.get_workflow(workflow["id"])
+    assert completed["success"] is True
+    assert [s["result_data"] for s in completed["steps"]] == ["prepare", "run"]
+
+
+def test_failures_are_passed_on_to_every_dependent(db, lab):
+    engine, scheduler, stub, device_id = lab
+    workflow = run(
+        db,
+        engine,
+        scheduler,
+        [
+            step("prepare", device_id, method="fail"),
+            step("measure", device_id, depends_on=["prepare"]),
+            step("report", device_id, depends_on=["measure"]),
+            step("clean", device_id),
+        ],
+    )
+
+    steps = {s["name"]: s for s in workflow["steps"]}
+    assert sorted(stub.runs) == sorted([workflow["operations"]["prepare"], workflow["operations"]["clean"]])
+    assert steps["clean"]["success"] is True
+    assert steps["measure"]["success"] is False
+    assert "Step prepare" in steps["measure"]["error"]
+    assert steps["report"]["success"] is False
+    assert "Step measure" in steps["report"]["error"]
+    assert workflow["success"] is False
+
+
+def test_held_steps_count_towards_the_queue_limits(db):
+    device_id = add_station(db, devices=1)["devices"][0]
+    scheduler = Scheduler(max_queued_per_caller=3)
+    engine = WorkflowEngine(scheduler)
+    engine.submit(
+        WorkflowRequest(
+            caller_id="tests",
+            steps=[
+                step("prepare", device_id),
+                step("measure", device_id, depends_on=["prepare"]),
+                step("report", device_id, depends_on=["measure"]),
+            ],
+        )
+    )
+    assert db.count({"_collection": "operations"}, {"held": True}) == 2
+
+    with pytest.raises(HTTPException) as rejected:
+        scheduler.admit("tests")
+    assert rejected.value.status_code == 429
+
+
+@pytest.mark.parametrize(
+    "steps",
+    [
+        [("a", ["b"]), ("b", ["a"])],
+        [("a", []), ("b", ["c"])],
+        [("a", []), ("a", [])],
+    ],
+    ids=["cycle", "unknown dependency", "duplicate name"],
+)
+def test_invalid_workflows_are_rejected(db, lab, steps):
+    engine, _, _, device_id = lab
+    with pytest.raises(HTTPException) as rejected:
+        engine.submit(
+            WorkflowRequest(
+                caller_id="tests",
+                steps=[step(name, device_id, depends_on=depends_on) for name, depends_on in steps],
+            )
+        )
+    assert rejected.value.status_code == 400
+    assert db.count({"_collection": "operations"}, {}) == 0
+    assert db.count({"_collection": "workflows"}, {}) == 0